@@ -0,0 +1,146 @@
+"""
+Benchmarks the main `tt` commands end to end against the offline mock in
+benchmarks/mock.py, for synthetic accounts of several sizes. Reports wall
+time, the number of API requests, stream subscriptions and streamed events,
+and peak memory.
+
+Usage: python benchmarks/commands.py [--sizes 10,100,1000] [--runs N]
+       [--latency MS] [--warm] [--json PATH] [command names...]
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+MOCK = os.path.join(os.path.dirname(os.path.abspath(__file__)), "mock.py")
+# answers for any prompts: don't close, modify or pick anything
+STDIN = "n\n" * 4
+# the mock counts REST requests by method and route, e.g. "GET /accounts"
+METHODS = {"GET", "POST", "PUT", "PATCH", "DELETE"}
+
+# name -> tt arguments; {size} is replaced with the account size
+COMMANDS: dict[str, list[str]] = {
+    "positions": ["pf", "positions"],
+    "chain": ["option", "chain", "SPY", "--strikes", "{size}"],
+    "live": ["order", "live"],
+    "history": ["pf", "history"],
+    "orders": ["order", "history"],
+    "watchlist": ["wl", "private"],
+    "plot": ["plot", "stock", "SPY"],
+}
+
+
+def run(name: str, size: int, latency: float, home: str) -> dict:
+    argv = [arg.format(size=size) for arg in COMMANDS[name]]
+    with tempfile.NamedTemporaryFile(suffix=".json") as stats:
+        start = time.perf_counter()
+        res = subprocess.run(
+            [
+                sys.executable,
+                MOCK,
+                "--positions",
+                str(size),
+                "--strikes",
+                str(max(size, 20)),
+                "--latency",
+                str(latency),
+                "--stats",
+                stats.name,
+                "--home",
+                home,
+                "--",
+                *argv,
+            ],
+            input=STDIN,
+            capture_output=True,
+            text=True,
+            env={**os.environ, "COLUMNS": "200"},
+        )
+        elapsed = time.perf_counter() - start
+        try:
+            with open(stats.name) as f:
+                result = json.load(f)
+        except (OSError, ValueError):
+            result = {"ok": False, "requests": {}, "peak_rss_kb": 0}
+    if res.returncode != 0 or not result["ok"]:
+        result["ok"] = False
+        result["error"] = (res.stderr.strip().splitlines() or ["?"])[-1]
+    result["wall"] = elapsed
+    return result
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "names", nargs="*", help=f"Commands to run, out of {', '.join(COMMANDS)}."
+    )
+    parser.add_argument("--sizes", default="10,100,1000")
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument(
+        "--latency", type=float, default=20, help="Simulated latency in ms."
+    )
+    parser.add_argument(
+        "--warm",
+        action="store_true",
+        help="Run each command once first, so sessions and caches are populated.",
+    )
+    parser.add_argument("--json", help="Also write the results to this file.")
+    args = parser.parse_args()
+    names = args.names or list(COMMANDS)
+    unknown = [n for n in names if n not in COMMANDS]
+    if unknown:
+        parser.error(f"unknown commands: {', '.join(unknown)}")
+    sizes = [int(s) for s in args.sizes.split(",")]
+    results = []
+    failed = False
+    print(
+        f"{'command':<10} {'size':>5} {'wall':>9} {'command':>9} "
+        f"{'requests':>8} {'streams':>7} {'events':>7} {'peak mem':>9}"
+    )
+    for name in names:
+        for size in sizes:
+            runs = []
+            for _ in range(args.runs):
+                with tempfile.TemporaryDirectory(prefix="ttcli-bench-") as home:
+                    if args.warm:
+                        run(name, size, args.latency, home)
+                    runs.append(run(name, size, args.latency, home))
+            if not all(r["ok"] for r in runs):
+                error = next(r["error"] for r in runs if not r["ok"])
+                print(f"{name:<10} {size:>5}  failed: {error}")
+                failed = True
+                continue
+            requests = runs[-1]["requests"]
+            rest = sum(v for k, v in requests.items() if k.split()[0] in METHODS)
+            streams = sum(v for k, v in requests.items() if k.startswith("SUBSCRIBE"))
+            events = sum(v for k, v in requests.items() if k.endswith(" events"))
+            result = {
+                "command": name,
+                "size": size,
+                "wall_ms": statistics.median(r["wall"] for r in runs) * 1000,
+                "command_ms": statistics.median(r["seconds"] for r in runs) * 1000,
+                "requests": rest,
+                "streams": streams,
+                "events": events,
+                "peak_rss_mb": max(r["peak_rss_kb"] for r in runs) / 1024,
+                "endpoints": requests,
+            }
+            results.append(result)
+            print(
+                f"{name:<10} {size:>5} {result['wall_ms']:7.0f}ms "
+                f"{result['command_ms']:7.0f}ms {result['requests']:>8} "
+                f"{streams:>7} {events:>7} {result['peak_rss_mb']:7.1f}MB"
+            )
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
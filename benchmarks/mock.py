@@ -0,0 +1,908 @@
+"""
+Runs a `tt` command against an offline stand-in for the tastytrade REST API
+and DXLink streamer, serving a synthetic account of the requested size. Each
+request and subscription is delayed by the given latency, and request counts
+and peak memory are written to --stats as JSON.
+
+Usage: python benchmarks/mock.py [--positions N] [--strikes N] [--latency MS]
+       [--rate-limit N] [--stats PATH] [--home DIR] -- <tt arguments>
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import os
+import re
+import resource
+import sys
+import tempfile
+import time
+import zlib
+from collections import Counter, defaultdict, deque
+from datetime import date, datetime, timedelta, timezone
+from functools import partial
+from typing import Any, AsyncIterator, Callable, Iterable, Self
+
+import httpx
+from anyio import sleep
+
+ACCOUNT_NUMBER = "5WT00001"
+OPTION_RE = re.compile(r"^\.?([A-Z]+)\s*(\d{6})([CP])([\d.]+)$")
+INTERVAL_RE = re.compile(r"^(\d+)(s|m|h|d|w|mo|y)$")
+INTERVALS = {
+    "s": 1,
+    "m": 60,
+    "h": 3600,
+    "d": 86400,
+    "w": 604800,
+    "mo": 2592000,
+    "y": 31536000,
+}
+
+Handler = Callable[[httpx.Request, re.Match[str]], Any]
+
+
+def price_of(symbol: str) -> float:
+    """
+    Deterministic price for an underlying, so every run sees the same data.
+    """
+    return 20 + zlib.crc32(symbol.encode()) % 480
+
+
+def ticker(i: int) -> str:
+    # option symbols can't tell digits in the root from the expiration
+    return "".join(chr(65 + i // 26**n % 26) for n in reversed(range(4)))
+
+
+def strike_step(price: float) -> int:
+    return 1 if price < 100 else 5
+
+
+def occ_symbol(root: str, expiration: date, call: bool, strike: int) -> str:
+    kind = "C" if call else "P"
+    return f"{root:<6}{expiration:%y%m%d}{kind}{strike * 1000:08d}"
+
+
+def streamer_symbol(symbol: str) -> str:
+    match = OPTION_RE.match(symbol)
+    assert match
+    root, expiration, kind, strike = match.groups()
+    return f".{root}{expiration}{kind}{int(strike) // 1000}"
+
+
+def option_price(symbol: str) -> tuple[float, float, float, float]:
+    """
+    Rough price, delta, theta and vega for an option streamer symbol.
+    """
+    match = OPTION_RE.match(symbol)
+    assert match
+    root, expiration, kind, strike = match.groups()
+    spot, strike_price = price_of(root), float(strike)
+    years = max((datetime.strptime(expiration, "%y%m%d").date() - date.today()).days, 1)
+    years /= 365
+    vol_time = 0.3 * math.sqrt(years)
+    d1 = math.log(spot / strike_price) / vol_time + vol_time / 2
+    delta = 0.5 * (1 + math.erf(d1 / math.sqrt(2)))
+    density = math.exp(-d1 * d1 / 2) / math.sqrt(2 * math.pi)
+    intrinsic = spot - strike_price if kind == "C" else strike_price - spot
+    price = max(intrinsic, 0) + spot * vol_time * density
+    if kind == "P":
+        delta -= 1
+    theta = -spot * density * 0.3 / (2 * math.sqrt(years)) / 365
+    return price, delta, theta, spot * density * math.sqrt(years) / 100
+
+
+def expirations() -> list[date]:
+    today = date.today()
+    friday = today + timedelta(days=(4 - today.weekday()) % 7 or 7)
+    return [friday + timedelta(weeks=i) for i in range(12)]
+
+
+class Backend:
+    """
+    Synthetic tastytrade account made of equities and equity options spread
+    over `positions // 10` underlyings.
+    """
+
+    def __init__(
+        self,
+        positions: int,
+        strikes: int,
+        latency: float,
+        transactions: int,
+        orders: int,
+        rate_limit: int = 0,
+    ):
+        self.latency = latency
+        self.rate_limit = rate_limit
+        self.recent: deque[float] = deque()
+        self.strikes = strikes
+        self.transactions = transactions
+        self.orders = orders
+        self.requests: Counter[str] = Counter()
+        self.placed = 0
+        self.now = datetime.now(timezone.utc).isoformat()
+        self.today = date.today().isoformat()
+        self.underlyings = [ticker(i) for i in range(max(positions // 10, 1))]
+        # each underlying holds shares plus up to nine options around the money
+        self.positions: list[str] = []
+        for i in range(positions):
+            root = self.underlyings[i % len(self.underlyings)]
+            k = i // len(self.underlyings)
+            if k == 0:
+                self.positions.append(root)
+                continue
+            price = price_of(root)
+            step = strike_step(price)
+            strike = int(price // step) * step + step * ((k // 2) % 5 - 2)
+            expiration = expirations()[k % 4]
+            self.positions.append(occ_symbol(root, expiration, k % 2 == 0, strike))
+        routes: dict[str, Handler] = {
+            "POST /oauth/token": self.token,
+            "GET /customers/me/accounts": self.accounts,
+            "GET /accounts/{n}/positions": self.get_positions,
+            "GET /accounts/{n}/transactions": self.get_transactions,
+            "GET /accounts/{n}/orders/live": self.live_orders,
+            "GET /accounts/{n}/orders/{id}": self.get_order,
+            "DELETE /accounts/{n}/orders/{id}": self.get_order,
+            "PUT /accounts/{n}/orders/{id}": self.replace_order,
+            "GET /accounts/{n}/orders": self.order_history,
+            "POST /accounts/{n}/orders/dry-run": self.place_order,
+            "POST /accounts/{n}/orders": self.place_order,
+            "GET /accounts/{n}/balances/{currency}": self.balances,
+            "GET /margin/accounts/{n}/requirements": self.margin,
+            "GET /instruments/equities/{symbol}": self.equity,
+            "GET /instruments/equities": self.equities,
+            "GET /instruments/equity-options": self.options,
+            "GET /instruments/{type}": self.empty,
+            "GET /option-chains/{symbol}/nested": self.chain,
+            "GET /market-data/by-type": self.market_data,
+            "GET /market-metrics": self.metrics,
+            "GET /watchlists": self.watchlists,
+            "GET /public-watchlists": self.watchlists,
+        }
+        self.routes = [
+            (route, re.compile(re.sub(r"{\w+}", "([^/]+)", route)), handler)
+            for route, handler in routes.items()
+        ]
+
+    def limited(self) -> bool:
+        # a sliding one second window, like the API's per-second limit
+        now = time.monotonic()
+        while self.recent and now - self.recent[0] > 1:
+            self.recent.popleft()
+        if len(self.recent) >= self.rate_limit:
+            return True
+        self.recent.append(now)
+        return False
+
+    async def handle(self, request: httpx.Request) -> httpx.Response:
+        await sleep(self.latency)
+        if self.rate_limit and self.limited():
+            self.requests[f"{request.method} <rate limited>"] += 1
+            error = {"code": "rate_limit_exceeded", "message": "Too many requests"}
+            return httpx.Response(429, json={"error": error})
+        for route, pattern, handler in self.routes:
+            match = pattern.fullmatch(f"{request.method} {request.url.path}")
+            if match:
+                self.requests[route] += 1
+                return httpx.Response(200, json=handler(request, match))
+        self.requests[f"{request.method} <unhandled>"] += 1
+        error = {"code": "not_found", "message": f"No mock for {request.url.path}"}
+        return httpx.Response(404, json={"error": error})
+
+    def paginate(self, request: httpx.Request, items: list[Any]) -> dict[str, Any]:
+        per_page = int(request.url.params.get("per-page", 250))
+        offset = int(request.url.params.get("page-offset", 0))
+        return {
+            "data": {"items": items[offset * per_page : (offset + 1) * per_page]},
+            "pagination": {
+                "page-offset": offset,
+                "total-pages": max(math.ceil(len(items) / per_page), 1),
+            },
+        }
+
+    def token(self, *_: Any) -> dict[str, Any]:
+        return {"access_token": "mock", "expires_in": 900}
+
+    def accounts(self, *_: Any) -> dict[str, Any]:
+        account = {
+            "account-number": ACCOUNT_NUMBER,
+            "opened-at": self.now,
+            "nickname": "Benchmark",
+            "account-type-name": "Individual",
+            "is-closed": False,
+            "day-trader-status": False,
+            "is-firm-error": False,
+            "is-firm-proprietary": False,
+            "is-futures-approved": False,
+            "margin-or-cash": "Margin",
+            "is-foreign": False,
+            "created-at": self.now,
+        }
+        return {"data": {"items": [{"account": account, "authority-level": "owner"}]}}
+
+    def get_positions(self, *_: Any) -> dict[str, Any]:
+        items = []
+        for i, symbol in enumerate(self.positions):
+            match = OPTION_RE.match(symbol)
+            root = match.group(1) if match else symbol
+            price = (
+                option_price(streamer_symbol(symbol))[0] if match else price_of(root)
+            )
+            items.append(
+                {
+                    "account-number": ACCOUNT_NUMBER,
+                    "symbol": symbol,
+                    "instrument-type": "Equity Option" if match else "Equity",
+                    "underlying-symbol": root,
+                    "quantity": 1 + i % 3 if match else 100,
+                    "quantity-direction": "Short" if i % 2 else "Long",
+                    "close-price": f"{price:.2f}",
+                    "average-open-price": f"{price * 0.9:.2f}",
+                    "multiplier": 100 if match else 1,
+                    "cost-effect": "Credit" if i % 2 else "Debit",
+                    "is-suppressed": False,
+                    "is-frozen": False,
+                    "realized-day-gain": "0",
+                    "realized-today": "0",
+                    "mark": f"{price * (100 if match else 1):.2f}",
+                    "mark-price": f"{price:.2f}",
+                    "created-at": self.now,
+                    "updated-at": self.now,
+                }
+            )
+        return {"data": {"items": items}}
+
+    def get_transactions(self, request: httpx.Request, _: Any) -> dict[str, Any]:
+        # the newest transaction is an hour old, and ids grow with time
+        start_at = request.url.params.get("start-at")
+        oldest = datetime.now(timezone.utc) - timedelta(hours=self.transactions)
+        if start_at:
+            oldest = max(oldest, datetime.fromisoformat(start_at))
+        items = []
+        for i in range(self.transactions):
+            symbol = self.positions[i % len(self.positions)]
+            match = OPTION_RE.match(symbol)
+            executed = datetime.now(timezone.utc) - timedelta(hours=i + 1)
+            if executed < oldest:
+                break
+            items.append(
+                {
+                    "id": self.transactions - i,
+                    "account-number": ACCOUNT_NUMBER,
+                    "symbol": symbol,
+                    "instrument-type": "Equity Option" if match else "Equity",
+                    "underlying-symbol": match.group(1) if match else symbol,
+                    "transaction-type": "Trade",
+                    "transaction-sub-type": "Buy to Open",
+                    "description": f"Bought 1 {symbol}",
+                    "executed-at": executed.isoformat(),
+                    "transaction-date": executed.date().isoformat(),
+                    "value": f"{-(i % 50) - 1}.00",
+                    "net-value": f"{-(i % 50) - 2}.15",
+                    "commission": "1.00",
+                    "clearing-fees": "0.10",
+                    "regulatory-fees": "0.05",
+                    "is-estimated-fee": False,
+                }
+            )
+        if request.url.params.get("sort") == "Asc":
+            items.reverse()
+        return self.paginate(request, items)
+
+    def order(self, i: int, status: str) -> dict[str, Any]:
+        symbol = self.positions[i % len(self.positions)]
+        match = OPTION_RE.match(symbol)
+        return {
+            "id": i + 1,
+            "account-number": ACCOUNT_NUMBER,
+            "time-in-force": "Day",
+            "order-type": "Limit",
+            "size": 1,
+            "underlying-symbol": match.group(1) if match else symbol,
+            "underlying-instrument-type": "Equity",
+            "price": "1.05",
+            "price-effect": "Debit",
+            "status": status,
+            "cancellable": status == "Live",
+            "editable": status == "Live",
+            "edited": False,
+            "updated-at": (
+                datetime.now(timezone.utc) - timedelta(minutes=i)
+            ).isoformat(),
+            "legs": [
+                {
+                    "instrument-type": "Equity Option" if match else "Equity",
+                    "symbol": symbol,
+                    "quantity": 1,
+                    "remaining-quantity": 1,
+                    "action": "Buy to Open",
+                    "fills": [],
+                }
+            ],
+        }
+
+    def order_status(self, i: int) -> str:
+        # the newest orders are still working
+        if i < max(len(self.positions) // 10, 1):
+            return "Live"
+        return ["Filled", "Cancelled", "Expired", "Rejected"][i % 4]
+
+    def live_orders(self, *_: Any) -> dict[str, Any]:
+        count = max(len(self.positions) // 10, 1)
+        return {"data": {"items": [self.order(i, "Live") for i in range(count)]}}
+
+    def get_order(self, _: httpx.Request, match: re.Match[str]) -> dict[str, Any]:
+        i = int(match.group(2)) - 1
+        return {"data": self.order(i, self.order_status(i))}
+
+    def replace_order(
+        self, request: httpx.Request, match: re.Match[str]
+    ) -> dict[str, Any]:
+        order = self.get_order(request, match)["data"]
+        return {"data": {**order, **json.loads(request.content)}}
+
+    def order_history(self, request: httpx.Request, _: Any) -> dict[str, Any]:
+        items = [self.order(i, self.order_status(i)) for i in range(self.orders)]
+        start_at = request.url.params.get("start-at")
+        if start_at:
+            oldest = datetime.fromisoformat(start_at)
+            items = [
+                o for o in items if datetime.fromisoformat(o["updated-at"]) >= oldest
+            ]
+        if request.url.params.get("sort") == "Asc":
+            items.reverse()
+        return self.paginate(request, items)
+
+    def place_order(self, request: httpx.Request, _: Any) -> dict[str, Any]:
+        new = json.loads(request.content)
+        self.placed += 1
+        legs = [
+            {**leg, "remaining-quantity": leg["quantity"], "fills": []}
+            for leg in new["legs"]
+        ]
+        match = OPTION_RE.match(legs[0]["symbol"])
+        size = sum(float(leg["quantity"]) for leg in legs)
+        # buying power moves by the order's cost, plus a margin for options
+        cost = float(new.get("price", 0)) * size * (100 if match else 1)
+        fees = 0.65 * size if match else 0
+        effect = {
+            "change-in-margin-requirement": f"{cost:.2f}",
+            "change-in-buying-power": f"{cost:.2f}",
+            "change-in-buying-power-effect": "Debit",
+            "current-buying-power": "100000",
+            "new-buying-power": f"{100000 - cost:.2f}",
+            "isolated-order-margin-requirement": f"{cost:.2f}",
+            "is-spread": len(legs) > 1,
+            "impact": f"{cost:.2f}",
+            "effect": "Debit",
+        }
+        order = {
+            **new,
+            "id": self.orders + self.placed,
+            "account-number": ACCOUNT_NUMBER,
+            "size": size,
+            "underlying-symbol": match.group(1) if match else legs[0]["symbol"],
+            "underlying-instrument-type": "Equity",
+            "status": "Received",
+            "cancellable": True,
+            "editable": True,
+            "edited": False,
+            "updated-at": self.now,
+            "legs": legs,
+        }
+        return {
+            "data": {
+                "order": order,
+                "buying-power-effect": effect,
+                "fee-calculation": {
+                    "regulatory-fees": "0",
+                    "clearing-fees": "0",
+                    "commission": f"{fees:.2f}",
+                    "proprietary-index-option-fees": "0",
+                    "total-fees": f"{fees:.2f}",
+                    "total-fees-effect": "Debit",
+                },
+                "warnings": [],
+            }
+        }
+
+    def equity_json(self, symbol: str) -> dict[str, Any]:
+        return {
+            "id": zlib.crc32(symbol.encode()),
+            "symbol": symbol,
+            "instrument-type": "Equity",
+            "is-index": False,
+            "description": f"{symbol} Synthetic Inc.",
+            "lendability": "Easy To Borrow",
+            "market-time-instrument-collection": "Equity",
+            "is-closing-only": False,
+            "is-options-closing-only": False,
+            "active": True,
+            "is-illiquid": False,
+            "is-etf": symbol == "SPY",
+            "streamer-symbol": symbol,
+            "tick-sizes": [{"value": "0.01"}],
+            "option-tick-sizes": [
+                {"value": "0.01", "threshold": "3"},
+                {"value": "0.05"},
+            ],
+        }
+
+    def equity(self, _: httpx.Request, match: re.Match[str]) -> dict[str, Any]:
+        return {"data": self.equity_json(match.group(1))}
+
+    def equities(self, request: httpx.Request, _: Any) -> dict[str, Any]:
+        symbols = request.url.params.get_list("symbol[]")
+        return self.paginate(request, [self.equity_json(s) for s in symbols])
+
+    def option_json(self, symbol: str) -> dict[str, Any]:
+        match = OPTION_RE.match(symbol)
+        assert match
+        root, expiration, kind, _ = match.groups()
+        expires = datetime.strptime(expiration, "%y%m%d").date()
+        stops = datetime.combine(expires, datetime.min.time()) + timedelta(hours=20)
+        return {
+            "symbol": symbol,
+            "instrument-type": "Equity Option",
+            "active": True,
+            "strike-price": str(int(symbol[-8:]) / 1000),
+            "root-symbol": root,
+            "underlying-symbol": root,
+            "expiration-date": expires.isoformat(),
+            "exercise-style": "American",
+            "shares-per-contract": 100,
+            "option-type": kind,
+            "option-chain-type": "Standard",
+            "expiration-type": "Regular",
+            "settlement-type": "PM",
+            "stops-trading-at": stops.replace(tzinfo=timezone.utc).isoformat(),
+            "expires-at": stops.replace(tzinfo=timezone.utc).isoformat(),
+            "market-time-instrument-collection": "Equity Option",
+            "days-to-expiration": (expires - date.today()).days,
+            "is-closing-only": False,
+            "streamer-symbol": streamer_symbol(symbol),
+        }
+
+    def options(self, request: httpx.Request, _: Any) -> dict[str, Any]:
+        symbols = request.url.params.get_list("symbol[]")
+        return {"data": {"items": [self.option_json(s) for s in symbols]}}
+
+    def balances(self, *_: Any) -> dict[str, Any]:
+        from tastytrade.account import AccountBalance
+
+        # every required field is zero except the ones ttcli shows
+        fields = {
+            name.replace("_", "-"): "0"
+            for name, field in AccountBalance.model_fields.items()
+            if field.is_required()
+        }
+        net_liq = 100 * sum(price_of(root) for root in self.underlyings)
+        fields |= {
+            "cash-balance": f"{net_liq / 2:.2f}",
+            "net-liquidating-value": f"{net_liq:.2f}",
+            "margin-equity": f"{net_liq:.2f}",
+            "derivative-buying-power": f"{net_liq / 3:.2f}",
+            "maintenance-requirement": f"{net_liq / 4:.2f}",
+        }
+        return {
+            "data": {
+                "account-number": ACCOUNT_NUMBER,
+                "snapshot-date": self.today,
+                "updated-at": self.now,
+                **fields,
+            }
+        }
+
+    def margin(self, *_: Any) -> dict[str, Any]:
+        groups = [
+            {
+                "description": root,
+                "code": root,
+                "underlying-symbol": root,
+                "underlying-type": "Equity",
+                "buying-power": f"{-price_of(root) * 20:.2f}",
+                "margin-calculation-type": "Reg T",
+                "margin-requirement": f"{price_of(root) * 20:.2f}",
+            }
+            for root in self.underlyings
+        ]
+        equity = 100 * sum(price_of(root) for root in self.underlyings)
+        report = dict.fromkeys(
+            [
+                "margin-requirement",
+                "maintenance-requirement",
+                "option-buying-power",
+                "reg-t-margin-requirement",
+                "reg-t-option-buying-power",
+                "maintenance-excess",
+            ],
+            "0",
+        )
+        return {
+            "data": {
+                "account-number": ACCOUNT_NUMBER,
+                "description": "Benchmark",
+                "margin-calculation-type": "Reg T",
+                "option-level": "No Restrictions",
+                "margin-equity": f"{equity:.2f}",
+                "last-state-timestamp": 0,
+                "groups": groups,
+                **report,
+            }
+        }
+
+    def empty(self, *_: Any) -> dict[str, Any]:
+        return {"data": {"items": []}}
+
+    def chain(self, _: httpx.Request, match: re.Match[str]) -> dict[str, Any]:
+        root = match.group(1)
+        price = price_of(root)
+        step = strike_step(price)
+        first = max(int(price // step) - self.strikes // 2, 1) * step
+        strikes = [first + i * step for i in range(self.strikes)]
+        chain = {
+            "underlying-symbol": root,
+            "root-symbol": root,
+            "option-chain-type": "Standard",
+            "shares-per-contract": 100,
+            "tick-sizes": [{"value": "0.01", "threshold": "3"}, {"value": "0.05"}],
+            "expirations": [
+                {
+                    "expiration-type": "Regular" if 15 <= exp.day <= 21 else "Weekly",
+                    "expiration-date": exp.isoformat(),
+                    "days-to-expiration": (exp - date.today()).days,
+                    "settlement-type": "PM",
+                    "strikes": [
+                        {
+                            "strike-price": str(strike),
+                            "call": (call := occ_symbol(root, exp, True, strike)),
+                            "put": (put := occ_symbol(root, exp, False, strike)),
+                            "call-streamer-symbol": streamer_symbol(call),
+                            "put-streamer-symbol": streamer_symbol(put),
+                        }
+                        for strike in strikes
+                    ],
+                }
+                for exp in expirations()
+            ],
+        }
+        return {"data": {"items": [chain]}}
+
+    def market_data(self, request: httpx.Request, _: Any) -> dict[str, Any]:
+        items = []
+        types = {"equity": "Equity", "index": "Index", "equity-option": "Equity Option"}
+        for key, instrument_type in types.items():
+            for symbol in request.url.params.get_list(key):
+                match = OPTION_RE.match(symbol)
+                price = (
+                    option_price(streamer_symbol(symbol))[0]
+                    if match
+                    else price_of(symbol)
+                )
+                items.append(
+                    {
+                        "symbol": symbol,
+                        "instrument-type": instrument_type,
+                        "updated-at": self.now,
+                        "bid": f"{price * 0.999:.2f}",
+                        "ask": f"{price * 1.001:.2f}",
+                        "bid-size": "10",
+                        "ask-size": "10",
+                        "mark": f"{price:.2f}",
+                        "last": f"{price:.2f}",
+                        "prev-close": f"{price * 0.99:.2f}",
+                        "volume": "123456",
+                        "close-price-type": "Regular",
+                        "summary-date": self.today,
+                        "prev-close-date": self.today,
+                        "prev-close-price-type": "Regular",
+                        "halt-start-time": -1,
+                        "halt-end-time": -1,
+                    }
+                )
+        return {"data": {"items": items}}
+
+    def metrics(self, request: httpx.Request, _: Any) -> dict[str, Any]:
+        symbols = request.url.params.get("symbols", "").split(",")
+        items = [
+            {
+                "symbol": symbol,
+                "updated-at": self.now,
+                "market-cap": "1000000000",
+                "beta": "1.1",
+                "implied-volatility-index-rank": "0.35",
+                "implied-volatility-index": "0.3",
+                "dividend-yield": "0.012",
+                "option-expiration-implied-volatilities": [
+                    {
+                        "expiration-date": exp.isoformat(),
+                        "settlement-type": "PM",
+                        "option-chain-type": "Standard",
+                        "implied-volatility": "0.3",
+                    }
+                    for exp in expirations()
+                ],
+            }
+            for symbol in symbols
+            if symbol
+        ]
+        return {"data": {"items": items}}
+
+    def watchlists(self, *_: Any) -> dict[str, Any]:
+        entries = [{"symbol": s, "instrument-type": "Equity"} for s in self.underlyings]
+        watchlist = {"name": "Benchmark", "watchlist-entries": entries}
+        return {"data": {"items": [watchlist]}}
+
+
+class MockStreamer:
+    """
+    Stand-in for :class:`DXLinkStreamer` that answers every subscription with
+    one synthetic event per symbol after the backend's latency.
+    """
+
+    backend: Backend
+
+    def __init__(self, *_: Any, **__: Any):
+        self.queues: dict[str, asyncio.Queue[Any]] = defaultdict(asyncio.Queue)
+
+    async def __aenter__(self) -> Self:
+        self.backend.requests["STREAMER connect"] += 1
+        await sleep(self.backend.latency)
+        return self
+
+    async def __aexit__(self, *_: Any) -> None:
+        pass
+
+    def publish(self, event_class: type, events: list[Any]) -> None:
+        queue = self.queues[event_class.__name__]
+        for event in events:
+            queue.put_nowait(event)
+
+    async def subscribe(
+        self, event_class: type, symbols: Iterable[str], *_: Any, **__: Any
+    ) -> None:
+        self.backend.requests[f"SUBSCRIBE {event_class.__name__}"] += 1
+        events = [self.event(event_class, s) for s in symbols]
+        loop = asyncio.get_running_loop()
+        loop.call_later(self.backend.latency, self.publish, event_class, events)
+
+    async def unsubscribe(self, *_: Any, **__: Any) -> None:
+        pass
+
+    async def subscribe_candle(
+        self,
+        symbols: Iterable[str],
+        interval: str,
+        start_time: datetime | None = None,
+        *_: Any,
+        **__: Any,
+    ) -> None:
+        from tastytrade.dxfeed import Candle
+
+        self.backend.requests["SUBSCRIBE Candle"] += 1
+        match = INTERVAL_RE.match(interval)
+        step = int(match.group(1)) * INTERVALS[match.group(2)] if match else 1800
+        start = round(start_time.timestamp()) if start_time else 1_000_000
+        count = max((round(time.time()) - start) // step, 0) + 1
+        events = []
+        for symbol in symbols:
+            price = price_of(symbol.lstrip("/"))
+            # DXLink sends the newest candle first
+            for i in reversed(range(count)):
+                wobble = math.sin(i / 7) * price * 0.02
+                events.append(
+                    Candle.model_validate(
+                        {
+                            "event_symbol": f"{symbol}{{={interval}}}",
+                            "event_time": 0,
+                            "event_flags": 0,
+                            "index": i,
+                            "time": (start + i * step) * 1000,
+                            "sequence": 0,
+                            "count": 1,
+                            "volume": 1000,
+                            "open": round(price + wobble, 2),
+                            "high": round(price + abs(wobble) + 1, 2),
+                            "low": round(price - abs(wobble) - 1, 2),
+                            "close": round(price - wobble, 2),
+                        }
+                    )
+                )
+        self.backend.requests["Candle events"] += len(events)
+        loop = asyncio.get_running_loop()
+        loop.call_later(self.backend.latency, self.publish, Candle, events)
+
+    def event(self, event_class: type, symbol: str) -> Any:
+        from tastytrade.dxfeed import Greeks, Quote, Summary, Trade
+
+        if OPTION_RE.match(symbol):
+            price, delta, theta, vega = option_price(symbol)
+        else:
+            price, delta, theta, vega = price_of(symbol), 1.0, 0.0, 0.0
+        common = {"event_symbol": symbol, "event_time": 0}
+        if event_class is Quote:
+            return Quote.model_validate(
+                {
+                    **common,
+                    "sequence": 0,
+                    "time_nano_part": 0,
+                    "bid_time": 0,
+                    "bid_exchange_code": "Q",
+                    "ask_time": 0,
+                    "ask_exchange_code": "Q",
+                    "bid_price": round(price * 0.98, 2),
+                    "ask_price": round(price * 1.02, 2),
+                    "bid_size": 10,
+                    "ask_size": 10,
+                }
+            )
+        if event_class is Greeks:
+            return Greeks.model_validate(
+                {
+                    **common,
+                    "event_flags": 0,
+                    "index": 0,
+                    "time": 0,
+                    "sequence": 0,
+                    "price": round(price, 4),
+                    "volatility": 0.3,
+                    "delta": round(delta, 4),
+                    "gamma": 0.01,
+                    "theta": round(theta, 4),
+                    "rho": 0.01,
+                    "vega": round(vega, 4),
+                }
+            )
+        if event_class is Summary:
+            return Summary.model_validate(
+                {
+                    **common,
+                    "day_id": 0,
+                    "day_close_price_type": "Regular",
+                    "prev_day_id": 0,
+                    "prev_day_close_price_type": "Regular",
+                    "open_interest": 1000,
+                    "prev_day_close_price": round(price, 2),
+                }
+            )
+        if event_class is Trade:
+            return Trade.model_validate(
+                {
+                    **common,
+                    "time": 0,
+                    "time_nano_part": 0,
+                    "sequence": 0,
+                    "exchange_code": "Q",
+                    "day_id": 0,
+                    "tick_direction": "UP",
+                    "extended_trading_hours": False,
+                    "price": round(price, 2),
+                    "size": 1,
+                    "day_volume": 5000,
+                }
+            )
+        raise ValueError(f"No mock events for {event_class.__name__}!")
+
+    async def listen(self, event_class: type) -> AsyncIterator[Any]:
+        queue = self.queues[event_class.__name__]
+        while True:
+            yield await queue.get()
+
+    async def get_event(self, event_class: type) -> Any:
+        return await self.queues[event_class.__name__].get()
+
+
+class MockAlertStreamer:
+    """
+    Stand-in for :class:`AlertStreamer` that fills the account's live orders
+    one at a time, a second apart.
+    """
+
+    backend: Backend
+
+    def __init__(self, *_: Any, **__: Any):
+        self.queue: asyncio.Queue[Any] = asyncio.Queue()
+
+    async def __aenter__(self) -> Self:
+        await sleep(self.backend.latency)
+        return self
+
+    async def __aexit__(self, *_: Any) -> None:
+        pass
+
+    async def subscribe_accounts(self, *_: Any) -> None:
+        from tastytrade.order import PlacedOrder
+
+        self.backend.requests["SUBSCRIBE Account"] += 1
+        loop = asyncio.get_running_loop()
+        live = self.backend.live_orders()["data"]["items"]
+        for i, order in enumerate(live):
+            filled = PlacedOrder.model_validate(
+                {
+                    **order,
+                    "status": "Filled",
+                    "updated-at": datetime.now(timezone.utc).isoformat(),
+                }
+            )
+            loop.call_later(1 + i, self.queue.put_nowait, filled)
+
+    async def listen(self, *_: Any) -> AsyncIterator[Any]:
+        while True:
+            yield await self.queue.get()
+
+
+def install(backend: Backend) -> None:
+    """
+    Points tastytrade at the backend; must run before ttcli is imported.
+    """
+    import tastytrade
+    import tastytrade.session
+    import tastytrade.streamer
+
+    client = partial(httpx.AsyncClient, transport=httpx.MockTransport(backend.handle))
+    tastytrade.session.AsyncClient = client  # type: ignore
+    MockStreamer.backend = backend
+    tastytrade.DXLinkStreamer = MockStreamer  # type: ignore
+    tastytrade.streamer.DXLinkStreamer = MockStreamer  # type: ignore
+    MockAlertStreamer.backend = backend
+    tastytrade.AlertStreamer = MockAlertStreamer  # type: ignore
+    tastytrade.streamer.AlertStreamer = MockAlertStreamer  # type: ignore
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--positions", type=int, default=100)
+    parser.add_argument("--strikes", type=int, default=100)
+    parser.add_argument("--transactions", type=int, help="Defaults to 5x positions.")
+    parser.add_argument("--orders", type=int, help="Defaults to 2x positions.")
+    parser.add_argument("--latency", type=float, default=0, help="Per request, in ms.")
+    parser.add_argument(
+        "--rate-limit", type=int, default=0, help="Requests per second; 0 for none."
+    )
+    parser.add_argument("--stats", help="Write request counts and memory here.")
+    parser.add_argument("--home", help="Home directory to run in; fresh by default.")
+    parser.add_argument("argv", nargs=argparse.REMAINDER)
+    args = parser.parse_args()
+    argv = args.argv[1:] if args.argv[:1] == ["--"] else args.argv
+    backend = Backend(
+        args.positions,
+        args.strikes,
+        args.latency / 1000,
+        args.transactions if args.transactions is not None else args.positions * 5,
+        args.orders if args.orders is not None else args.positions * 2,
+        args.rate_limit,
+    )
+    os.environ.setdefault("TT_SECRET", "mock")
+    os.environ.setdefault("TT_REFRESH", "mock")
+    # never touch the real config, session or caches
+    os.environ["HOME"] = args.home or tempfile.mkdtemp(prefix="ttcli-bench-")
+    install(backend)
+    from ttcli.app import cli
+
+    start = time.perf_counter()
+    code = 0
+    try:
+        cli(argv, prog_name="tt", standalone_mode=False)
+    except Exception as e:
+        print(f"{type(e).__name__}: {e}", file=sys.stderr)
+        code = 1
+    elapsed = time.perf_counter() - start
+    if args.stats:
+        with open(args.stats, "w") as f:
+            json.dump(
+                {
+                    "ok": code == 0,
+                    "seconds": elapsed,
+                    "requests": dict(backend.requests),
+                    "peak_rss_kb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+                },
+                f,
+            )
+    return code
+
+
+if __name__ == "__main__":
+    sys.exit(main())
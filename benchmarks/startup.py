@@ -0,0 +1,75 @@
+"""
+Measures cold startup time of the `tt` entry point, and makes sure cheap
+commands don't import the heavy dependencies behind the subcommands.
+
+Usage: python benchmarks/startup.py [--runs N] [--max-ms MS]
+"""
+
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+import time
+
+# each case is (argv, modules that must not be imported to serve it)
+CASES: list[tuple[list[str], list[str]]] = [
+    (["--version"], ["ttcli.utils", "tastytrade", "yaspin", "pygnuplot", "pandas"]),
+    (["--help"], ["ttcli.utils", "tastytrade", "yaspin", "pygnuplot", "pandas"]),
+    (["pf", "--help"], ["ttcli.option", "ttcli.plot", "pygnuplot"]),
+]
+
+RUNNER = """
+import json, sys
+sys.argv = ["tt", *json.loads(sys.argv[1])]
+from ttcli.app import cli
+try:
+    cli()
+except SystemExit:
+    pass
+finally:
+    sys.stderr.write(json.dumps(sorted(sys.modules)))
+"""
+
+
+def run(argv: list[str]) -> tuple[float, set[str]]:
+    start = time.perf_counter()
+    res = subprocess.run(
+        [sys.executable, "-c", RUNNER, json.dumps(argv)],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    elapsed = time.perf_counter() - start
+    return elapsed * 1000, set(json.loads(res.stderr.splitlines()[-1]))
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument(
+        "--max-ms", type=float, help="Fail if any median is above this many ms."
+    )
+    args = parser.parse_args()
+    failed = False
+    for argv, forbidden in CASES:
+        timings: list[float] = []
+        modules: set[str] = set()
+        for _ in range(args.runs):
+            elapsed, modules = run(argv)
+            timings.append(elapsed)
+        cmd = " ".join(["tt", *argv])
+        median = statistics.median(timings)
+        print(f"{cmd:<20} median {median:7.1f}ms  min {min(timings):7.1f}ms")
+        imported = [m for m in forbidden if m in modules]
+        if imported:
+            print(f"  imports {', '.join(imported)}, which it shouldn't!")
+            failed = True
+        if args.max_ms is not None and median > args.max_ms:
+            print(f"  slower than the {args.max_ms:g}ms budget!")
+            failed = True
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
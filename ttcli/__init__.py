@@ -1,8 +1,13 @@
 import logging
+import os
 
 logger = logging.getLogger(__name__)
 
 CUSTOM_CONFIG_PATH = ".config/ttcli/ttcli.cfg"
 TOKEN_PATH = ".config/ttcli/.session"
+DAEMON_PATH = ".config/ttcli/daemon.sock"
+CACHE_PATH = ".config/ttcli/cache"
 VERSION = "1.4.1"
 __version__ = VERSION
+
+config_path = os.path.join(os.path.expanduser("~"), CUSTOM_CONFIG_PATH)
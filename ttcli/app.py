@@ -1,20 +1,60 @@
 import os
 import shutil
+from importlib import import_module
 from importlib.resources import as_file, files
 from typing import Annotated
 
+from click import Command, Context, HelpFormatter
 from typer import Exit, Option, Typer, echo
+from typer.core import TyperGroup
+from typer.main import get_group
 
-from ttcli import VERSION
-from ttcli.option import option
-from ttcli.order import order
-from ttcli.plot import plot
-from ttcli.portfolio import portfolio
-from ttcli.trade import trade
-from ttcli.utils import config_path
-from ttcli.watchlist import watchlist
+from ttcli import VERSION, config_path
 
-cli = Typer(no_args_is_help=True, pretty_exceptions_show_locals=False)
+# subcommands are imported on demand, since each one pulls in tastytrade and
+# friends; the help text lives here so `tt --help` can be shown without them
+LAZY_COMMANDS: dict[str, tuple[str, str]] = {
+    "option": ("ttcli.option", "Buy, sell, and analyze options."),
+    "order": ("ttcli.order", "List, adjust, or cancel orders."),
+    "plot": ("ttcli.plot", "Plot candle charts for any symbol."),
+    "pf": ("ttcli.portfolio", "View positions and stats for your portfolio."),
+    "trade": ("ttcli.trade", "Buy or sell stocks/ETFs, crypto, and futures."),
+    "wl": ("ttcli.watchlist", "Show prices and metrics for symbols in a watchlist."),
+    "daemon": (
+        "ttcli.daemon",
+        "Keep a warm session in the background to speed up commands.",
+    ),
+}
+
+
+class LazyGroup(TyperGroup):
+    """
+    Group that only imports the module for the subcommand actually invoked.
+    """
+
+    _formatting_help = False
+
+    def list_commands(self, ctx: Context) -> list[str]:
+        return super().list_commands(ctx) + list(LAZY_COMMANDS)
+
+    def get_command(self, ctx: Context, cmd_name: str) -> Command | None:
+        if cmd_name not in LAZY_COMMANDS:
+            return super().get_command(ctx, cmd_name)
+        module, help = LAZY_COMMANDS[cmd_name]
+        if self._formatting_help:  # only the name and help text are needed
+            return TyperGroup(name=cmd_name, help=help)
+        app: Typer = getattr(import_module(module), module.split(".")[-1])
+        return get_group(app)
+
+    def format_help(self, ctx: Context, formatter: HelpFormatter) -> None:
+        self._formatting_help = True
+        try:
+            return super().format_help(ctx, formatter)
+        finally:
+            self._formatting_help = False
+
+
+cli = Typer(cls=LazyGroup, no_args_is_help=True, pretty_exceptions_show_locals=False)
 
 
 @cli.callback(invoke_without_command=True, no_args_is_help=True)
@@ -35,13 +75,5 @@ def main(
         raise Exit()
 
 
-cli.add_typer(option, name="option")
-cli.add_typer(order, name="order")
-cli.add_typer(plot, name="plot")
-cli.add_typer(portfolio, name="pf")
-cli.add_typer(trade, name="trade")
-cli.add_typer(watchlist, name="wl")
-
-
 if __name__ == "__main__":
     cli()
@@ -0,0 +1,72 @@
+import os
+import pickle
+import tempfile
+import time
+from typing import Any, Awaitable, Callable, TypeVar
+
+from tastytrade import __version__ as tastytrade_version
+
+from ttcli import CACHE_PATH, VERSION, logger
+
+T = TypeVar("T")
+
+cache_dir = os.path.join(os.path.expanduser("~"), CACHE_PATH)
+# entries written by other versions may hold incompatible models
+CACHE_VERSION = f"{VERSION}-{tastytrade_version}"
+
+
+def cache_file(namespace: str, key: str) -> str:
+    key = key.replace("/", "_")
+    return os.path.join(cache_dir, namespace, f"{key}.pickle")
+
+
+def load_cached(namespace: str, key: str, ttl: float) -> Any | None:
+    """
+    Returns the cached object, or None if it's missing, stale or was written by
+    a different version.
+
+    :param ttl: maximum age of the entry in seconds
+    """
+    path = cache_file(namespace, key)
+    try:
+        if time.time() - os.path.getmtime(path) > ttl:
+            return None
+        with open(path, "rb") as f:
+            version, obj = pickle.load(f)
+    except (OSError, EOFError, pickle.UnpicklingError, ValueError):
+        return None
+    return obj if version == CACHE_VERSION else None
+
+
+def store_cached(namespace: str, key: str, obj: Any) -> None:
+    path = cache_file(namespace, key)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    # write then rename, so concurrent runs never see a partial file
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path))
+    with os.fdopen(fd, "wb") as f:
+        pickle.dump((CACHE_VERSION, obj), f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp, path)
+
+
+async def cached(
+    namespace: str,
+    key: str,
+    ttl: float,
+    fetch: Callable[[], Awaitable[T]],
+    refresh: bool = False,
+) -> T:
+    """
+    Returns the cached object if it's fresh, otherwise fetches and caches it.
+
+    :param ttl: maximum age of the entry in seconds; 0 disables caching
+    :param refresh: whether to ignore any existing entry
+    """
+    if ttl > 0 and not refresh:
+        obj = load_cached(namespace, key, ttl)
+        if obj is not None:
+            logger.debug(f"Loaded {namespace}/{key} from cache.")
+            return obj
+    obj = await fetch()
+    if ttl > 0:
+        store_cached(namespace, key, obj)
+    return obj
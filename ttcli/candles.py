@@ -0,0 +1,255 @@
+import os
+import tempfile
+from collections import defaultdict
+from datetime import datetime
+from urllib.parse import quote
+
+import numpy as np
+from anyio import current_time, move_on_after
+from tastytrade import DXLinkStreamer
+from tastytrade.dxfeed import Candle
+from tastytrade.utils import TZ
+
+from ttcli.cache import cache_dir
+from ttcli.trace import span
+from ttcli.utils import RenewableSession, gather, print_warning
+
+# candles are kept in memory and on disk as rows of epoch milliseconds and OHLC
+CANDLE_DTYPE = np.dtype(
+    [
+        ("time", "<i8"),
+        ("open", "<f8"),
+        ("high", "<f8"),
+        ("low", "<f8"),
+        ("close", "<f8"),
+    ]
+)
+
+# candle widths that are built from minute candles, in seconds; wider ones are
+# built from daily candles by calendar day, month or year
+INTRADAY_WIDTHS = {"1m": 60, "5m": 300, "10m": 600, "15m": 900, "30m": 1800, "1h": 3600}
+CALENDAR_UNITS = {"1d": "D", "1mo": "M", "1y": "Y"}
+
+store_dir = os.path.join(cache_dir, "candles")
+
+
+def _path(symbol: str, width: str) -> str:
+    return os.path.join(store_dir, f"{quote(symbol, safe='')}-{width}.npy")
+
+
+def load_candles(symbol: str, width: str) -> np.ndarray:
+    """
+    Returns the stored candles for the streamer symbol and width, oldest first.
+    """
+    try:
+        candles = np.load(_path(symbol, width))
+    except (OSError, ValueError):
+        return np.empty(0, CANDLE_DTYPE)
+    return candles if candles.dtype == CANDLE_DTYPE else np.empty(0, CANDLE_DTYPE)
+
+
+def save_candles(symbol: str, width: str, candles: np.ndarray) -> None:
+    os.makedirs(store_dir, exist_ok=True)
+    # write then rename, so concurrent runs never see a partial file
+    fd, tmp = tempfile.mkstemp(dir=store_dir)
+    with os.fdopen(fd, "wb") as f:
+        np.save(f, candles)
+    os.replace(tmp, _path(symbol, width))
+
+
+def latest_by_time(candles: np.ndarray) -> np.ndarray:
+    """
+    Sorts candles by time with a single stable argsort, keeping only the last
+    of any that share a timestamp, since later updates to a bar win.
+    """
+    if not len(candles):
+        return candles
+    candles = candles[np.argsort(candles["time"], kind="stable")]
+    times = candles["time"]
+    return candles[np.append(times[1:] != times[:-1], True)]
+
+
+def merge_candles(old: np.ndarray, new: np.ndarray) -> np.ndarray:
+    """
+    Merges two sets of candles by time, preferring the new ones, which may
+    update a bar that was still open.
+    """
+    return latest_by_time(np.concatenate([old, new]))
+
+
+class CandleBuffer:
+    """
+    Collects streamed candles into a preallocated array, doubling it when full.
+    """
+
+    def __init__(self, capacity: int = 1024):
+        self.data = np.empty(capacity, CANDLE_DTYPE)
+        self.size = 0
+
+    def append(self, candle: Candle) -> None:
+        if self.size == len(self.data):
+            data = np.empty(len(self.data) * 2, CANDLE_DTYPE)
+            data[: self.size] = self.data
+            self.data = data
+        self.data[self.size] = (
+            candle.time,
+            candle.open or 0,
+            candle.high or 0,
+            candle.low or 0,
+            candle.close,
+        )
+        self.size += 1
+
+    def candles(self) -> np.ndarray:
+        return latest_by_time(self.data[: self.size])
+
+
+async def stream_candles(
+    sesh: RenewableSession, starts: dict[str, int], width: str, timeout: float = 3
+) -> dict[str, np.ndarray]:
+    """
+    Streams candles for several symbols over one connection, each back to its
+    own start time. Gives up on symbols still streaming once no candle has
+    arrived for the timeout, warning about them and keeping what arrived.
+    """
+    buffers = {symbol: CandleBuffer() for symbol in starts}
+    pending = set(starts)
+    # symbols starting at the same time share a subscription
+    groups: dict[int, list[str]] = defaultdict(list)
+    for symbol, start in starts.items():
+        groups[start].append(symbol)
+    async with DXLinkStreamer(sesh) as streamer:
+        await gather(
+            *[
+                streamer.subscribe_candle(
+                    symbols, width, datetime.fromtimestamp(start / 1000, TZ)
+                )
+                for start, symbols in groups.items()
+            ]
+        )
+        # each symbol's newest candle comes first, back to the one at its start
+        with move_on_after(timeout) as scope:
+            async for candle in streamer.listen(Candle):
+                symbol = candle.event_symbol.split("{")[0]
+                if symbol not in buffers:
+                    continue
+                scope.deadline = current_time() + timeout
+                if candle.close:
+                    buffers[symbol].append(candle)
+                if candle.time <= starts[symbol]:
+                    pending.discard(symbol)
+                    if not pending:
+                        break
+    if pending:
+        print_warning(
+            f"Timed out streaming candles for {', '.join(sorted(pending))}, "
+            "some may be missing."
+        )
+    return {symbol: buffer.candles() for symbol, buffer in buffers.items()}
+
+
+async def fetch_many_candles(
+    sesh: RenewableSession,
+    symbols: list[str],
+    width: str,
+    start_time: datetime,
+    keep_time: datetime | None = None,
+    timeout: float = 3,
+) -> dict[str, np.ndarray]:
+    """
+    Returns candles for each streamer symbol since the start time, oldest first.
+    Stored candles are served from disk, and only the ones from each symbol's
+    last stored bar onwards are streamed, since that bar may still have been
+    open. All of the symbols share one streamer connection. Stored bars older
+    than the keep time, which defaults to the start time, are dropped.
+    """
+    start = round(start_time.timestamp() * 1000)
+    keep = min(round((keep_time or start_time).timestamp() * 1000), start)
+    with span("load candles", "cache"):
+        stored = {symbol: load_candles(symbol, width) for symbol in symbols}
+    starts = {}
+    for symbol, candles in stored.items():
+        starts[symbol] = start
+        if len(candles) and candles["time"][0] <= start:
+            starts[symbol] = max(int(candles["time"][-1]), start)
+    with span("stream candles", "stream"):
+        fetched = await stream_candles(sesh, starts, width, timeout)
+    result = {}
+    with span("save candles", "cache"):
+        for symbol in symbols:
+            candles = merge_candles(stored[symbol], fetched[symbol])
+            # bars that have fallen out of the window aren't needed again
+            save_candles(symbol, width, candles[candles["time"] >= keep])
+            result[symbol] = candles[candles["time"] >= start]
+    return result
+
+
+async def fetch_candles(
+    sesh: RenewableSession, symbol: str, width: str, start_time: datetime
+) -> np.ndarray:
+    """
+    Returns candles for the streamer symbol since the start time, oldest first.
+    """
+    candles = await fetch_many_candles(sesh, [symbol], width, start_time)
+    return candles[symbol]
+
+
+def local_seconds(times: np.ndarray) -> np.ndarray:
+    """
+    Converts epoch milliseconds to seconds in New York time. Offsets are looked
+    up once per day.
+    """
+    days, inverse = np.unique(times // 86_400_000, return_inverse=True)
+    offsets = np.array(
+        [
+            datetime.fromtimestamp(day * 86_400 + 43_200, TZ)
+            .utcoffset()
+            .total_seconds()  # type: ignore
+            for day in days
+        ]
+    )
+    return times / 1000 + offsets[inverse]
+
+
+def aggregate(candles: np.ndarray, keys: np.ndarray) -> np.ndarray:
+    """
+    Merges each run of sorted candles sharing a key into one bar, with the
+    first open, the last close, and the highest high and lowest low.
+    """
+    if not len(candles):
+        return candles
+    starts = np.flatnonzero(np.append(True, keys[1:] != keys[:-1]))
+    ends = np.append(starts[1:], len(candles)) - 1
+    bars = np.empty(len(starts), CANDLE_DTYPE)
+    bars["time"] = candles["time"][starts]
+    bars["open"] = candles["open"][starts]
+    bars["high"] = np.maximum.reduceat(candles["high"], starts)
+    bars["low"] = np.minimum.reduceat(candles["low"], starts)
+    bars["close"] = candles["close"][ends]
+    return bars
+
+
+def resample(candles: np.ndarray, width: str) -> np.ndarray:
+    """
+    Builds bars of the given width from finer candles: intraday widths from
+    minute candles, aligned to the clock, and days, months and years from
+    daily candles, by their date in New York.
+    """
+    if width in INTRADAY_WIDTHS:
+        step = INTRADAY_WIDTHS[width] * 1000
+        bars = aggregate(candles, candles["time"] // step)
+        bars["time"] -= bars["time"] % step
+        return bars
+    dates = (local_seconds(candles["time"]) * 1000).astype("datetime64[ms]")
+    return aggregate(candles, dates.astype(f"datetime64[{CALENDAR_UNITS[width]}]"))
+
+
+def downsample(candles: np.ndarray, count: int) -> np.ndarray:
+    """
+    Merges neighbouring candles so there are at most `count` of them, keeping
+    each bar's range intact.
+    """
+    if len(candles) <= count:
+        return candles
+    size = -(-len(candles) // count)
+    return aggregate(candles, np.arange(len(candles)) // size)
@@ -0,0 +1,296 @@
+import asyncio
+import math
+import os
+import signal
+import subprocess
+import sys
+import time
+from collections import defaultdict
+
+from anyio import (
+    TASK_STATUS_IGNORED,
+    BrokenResourceError,
+    CancelScope,
+    EndOfStream,
+    IncompleteRead,
+    create_memory_object_stream,
+    create_task_group,
+    create_unix_listener,
+    move_on_after,
+    open_signal_receiver,
+    sleep,
+    sleep_forever,
+)
+from anyio.abc import SocketStream, TaskGroup, TaskStatus
+from anyio.streams.memory import MemoryObjectSendStream
+from rich import print as rich_print
+from tastytrade import DXLinkStreamer
+from tastytrade.dxfeed import Event
+from tastytrade.streamer import MAP_EVENTS
+from yaspin import yaspin
+
+from ttcli import logger
+from ttcli.utils import (
+    AsyncTyper,
+    DaemonConnection,
+    RateLimited,
+    RenewableSession,
+    daemon_path,
+    ping_daemon,
+    print_error,
+    print_warning,
+)
+
+# seconds to wait before reconnecting a dropped streamer
+RECONNECT_DELAY = 5
+
+daemon = AsyncTyper(
+    help="Keep a warm session in the background to speed up commands.",
+    no_args_is_help=True,
+)
+
+
+class EventHub:
+    """
+    Keeps the latest event for every subscribed symbol on the daemon's
+    streamer, and fans new events out to listening clients. The streamer is
+    reconnected with a fresh token whenever it drops, and everything that was
+    subscribed is subscribed again.
+    """
+
+    def __init__(self, sesh: RenewableSession):
+        self.sesh = sesh
+        self.streamer: DXLinkStreamer | None = None
+        self.tg: TaskGroup | None = None
+        self.latest: dict[str, dict[str, Event]] = defaultdict(dict)
+        self.subscribed: dict[str, set[str]] = defaultdict(set)
+        self.listeners: dict[
+            str, list[tuple[set[str], MemoryObjectSendStream[Event]]]
+        ] = defaultdict(list)
+
+    async def run(self, *, task_status: TaskStatus[None] = TASK_STATUS_IGNORED):
+        started = False
+        while True:
+            try:
+                await self.sesh.refresh()
+                async with (
+                    DXLinkStreamer(self.sesh) as streamer,
+                    create_task_group() as tg,
+                ):
+                    self.streamer, self.tg = streamer, tg
+                    for event, symbols in list(self.subscribed.items()):
+                        tg.start_soon(self._pump, streamer, MAP_EVENTS[event])
+                        await streamer.subscribe(MAP_EVENTS[event], set(symbols))
+                    if not started:
+                        started = True
+                        task_status.started()
+                    await sleep_forever()
+            except Exception as e:
+                if not started:
+                    raise
+                logger.exception(e)
+            finally:
+                self.streamer = self.tg = None
+                # nothing cached is current any more, so none of it is replayed
+                self.latest.clear()
+            await sleep(RECONNECT_DELAY)
+
+    async def subscribe(self, event: str, symbols: list[str]) -> None:
+        cls = MAP_EVENTS[event]
+        first = event not in self.subscribed
+        new = set(symbols) - self.subscribed[event]
+        self.subscribed[event].update(new)
+        # while disconnected, symbols are subscribed once the streamer is back
+        if self.streamer is None or self.tg is None:
+            return
+        if first:
+            self.tg.start_soon(self._pump, self.streamer, cls)
+        if new:
+            await self.streamer.subscribe(cls, new)
+
+    async def _pump(self, streamer: DXLinkStreamer, cls: type[Event]) -> None:
+        name = cls.__name__
+        async for event in streamer.listen(cls):
+            self.latest[name][event.event_symbol] = event
+            for symbols, send in self.listeners[name]:
+                if event.event_symbol in symbols:
+                    send.send_nowait(event)
+
+    async def listen(self, conn: DaemonConnection, event: str, symbols: list[str]):
+        await self.subscribe(event, symbols)
+        send, receive = create_memory_object_stream[Event](math.inf)
+        listener = (set(symbols), send)
+        self.listeners[event].append(listener)
+
+        async def watch(scope: CancelScope) -> None:
+            # clients send nothing after subscribing, so this only returns once
+            # they've gone, even if none of their symbols ever update
+            try:
+                await conn.receive()
+            except (BrokenResourceError, EndOfStream, IncompleteRead):
+                pass
+            scope.cancel()
+
+        try:
+            async with create_task_group() as tg:
+                tg.start_soon(watch, tg.cancel_scope)
+                # replay what we already know, then stream new events
+                for symbol in listener[0]:
+                    if symbol in self.latest[event]:
+                        latest = self.latest[event][symbol]
+                        await conn.send(latest.model_dump(mode="json"))
+                async for e in receive:
+                    await conn.send(e.model_dump(mode="json"))
+        finally:
+            self.listeners[event].remove(listener)
+            send.close()
+            receive.close()
+
+
+class DaemonServer:
+    """
+    Serves requests from CLI invocations over a Unix socket, using a single
+    long-lived session and streamer.
+    """
+
+    def __init__(self, sesh: RenewableSession, hub: EventHub, scope: CancelScope):
+        self.sesh = sesh
+        self.hub = hub
+        self.scope = scope
+        self.started = time.time()
+
+    async def handle(self, stream: SocketStream) -> None:
+        async with DaemonConnection(stream) as conn:
+            try:
+                message = await conn.receive()
+                op = message["op"]
+                if op == "ping":
+                    await conn.send(
+                        {
+                            "pid": os.getpid(),
+                            "uptime": time.time() - self.started,
+                            "subscriptions": {
+                                k: len(v) for k, v in self.hub.subscribed.items()
+                            },
+                        }
+                    )
+                elif op == "request":
+                    await conn.send(await self.forward(message))
+                elif op == "token":
+                    await self.sesh.refresh()
+                    await conn.send(
+                        {
+                            "session_token": self.sesh.session_token,
+                            "session_expiration": self.sesh.session_expiration,
+                        }
+                    )
+                elif op == "listen":
+                    await self.hub.listen(conn, message["event"], message["symbols"])
+                elif op == "stop":
+                    await conn.send({})
+                    self.scope.cancel()
+            except (BrokenResourceError, EndOfStream, IncompleteRead):
+                pass  # client went away
+            except Exception as e:
+                logger.exception(e)
+
+    async def forward(self, message: dict) -> dict:
+        await self.sesh.refresh()
+        try:
+            response = await self.sesh._client.request(
+                message["method"], message["path"], content=message["body"] or None
+            )
+        except RateLimited as e:  # pass the 429 on so the client can retry
+            response = e.response
+        content_type = response.headers.get("content-type", "application/json")
+        return {
+            "status": response.status_code,
+            "headers": {"content-type": content_type},
+            "body": response.text,
+        }
+
+
+async def serve() -> None:
+    if await ping_daemon() is not None:
+        print_warning("The daemon is already running!")
+        return
+    if os.path.exists(daemon_path):  # left behind by a daemon that crashed
+        os.unlink(daemon_path)
+    sesh = await RenewableSession()
+    async with create_task_group() as tg:
+        hub = EventHub(sesh)
+        await tg.start(hub.run)
+        server = DaemonServer(sesh, hub, tg.cancel_scope)
+        listener = await create_unix_listener(daemon_path, mode=0o600)
+        tg.start_soon(handle_signals, tg.cancel_scope)
+        try:
+            await listener.serve(server.handle, task_group=tg)
+        finally:
+            os.unlink(daemon_path)
+
+
+async def handle_signals(scope: CancelScope) -> None:
+    with open_signal_receiver(signal.SIGINT, signal.SIGTERM) as signals:
+        async for _ in signals:
+            scope.cancel()
+            return
+
+
+@daemon.command(help="Start the daemon in the background.")
+async def start():
+    if sys.platform == "win32":
+        print_error("The daemon requires Unix sockets, which aren't available here.")
+        return
+    if await ping_daemon() is not None:
+        print_warning("The daemon is already running!")
+        return
+    subprocess.Popen(
+        [sys.executable, "-m", "ttcli.daemon"],
+        stdin=subprocess.DEVNULL,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+        start_new_session=True,
+    )
+    with yaspin(color="green", text="Starting daemon..."):
+        with move_on_after(15):
+            while await ping_daemon() is None:
+                await sleep(0.1)
+    status = await ping_daemon()
+    if status is None:
+        print_error("The daemon failed to start, try `tt daemon run` to see why.")
+    else:
+        rich_print(f"Daemon started with PID {status['pid']}.")
+
+
+@daemon.command(help="Run the daemon in the foreground.")
+async def run():
+    await serve()
+
+
+@daemon.command(help="Stop the running daemon.")
+async def stop():
+    if await ping_daemon() is None:
+        print_warning("The daemon isn't running.")
+        return
+    async with await DaemonConnection.open() as conn:
+        await conn.send({"op": "stop"})
+        await conn.receive()
+    rich_print("Daemon stopped.")
+
+
+@daemon.command(help="Show whether the daemon is running.")
+async def status():
+    status = await ping_daemon()
+    if status is None:
+        rich_print("Daemon is not running.")
+        return
+    subscriptions = ", ".join(f"{k} ({v})" for k, v in status["subscriptions"].items())
+    rich_print(
+        f"Daemon is running with PID {status['pid']}, up for "
+        f"{status['uptime'] / 60:.0f} minutes.\n"
+        f"Subscriptions: {subscriptions or 'none'}"
+    )
+
+
+if __name__ == "__main__":
+    asyncio.run(serve())
@@ -0,0 +1,178 @@
+from math import sqrt
+from typing import NamedTuple
+
+import numpy as np
+from numpy.typing import ArrayLike, NDArray
+
+SQRT_2PI = sqrt(2 * np.pi)
+
+
+class ModelGreeks(NamedTuple):
+    """
+    Greeks for a batch of options, one array element per option. Theta is per
+    calendar day and vega is per point of volatility, matching DXLink.
+    """
+
+    delta: NDArray[np.float64]
+    gamma: NDArray[np.float64]
+    theta: NDArray[np.float64]
+    vega: NDArray[np.float64]
+
+
+def _erf(x: NDArray[np.float64]) -> NDArray[np.float64]:
+    # Abramowitz & Stegun 7.1.26, accurate to ~1.5e-7
+    t = 1 / (1 + 0.3275911 * np.abs(x))
+    poly = t * (
+        0.254829592
+        + t * (-0.284496736 + t * (1.421413741 + t * (-1.453152027 + t * 1.061405429)))
+    )
+    return np.sign(x) * (1 - poly * np.exp(-x * x))
+
+
+def _cdf(x: NDArray[np.float64]) -> NDArray[np.float64]:
+    return 0.5 * (1 + _erf(x / sqrt(2)))
+
+
+def _pdf(x: NDArray[np.float64]) -> NDArray[np.float64]:
+    return np.exp(-0.5 * x * x) / SQRT_2PI
+
+
+def _d1_d2(
+    spot: NDArray[np.float64],
+    strike: NDArray[np.float64],
+    years: NDArray[np.float64],
+    volatility: NDArray[np.float64],
+    rate: float,
+    dividend: float,
+) -> tuple[NDArray[np.float64], NDArray[np.float64]]:
+    vol_time = volatility * np.sqrt(years)
+    d1 = (
+        np.log(spot / strike) + (rate - dividend + 0.5 * volatility**2) * years
+    ) / vol_time
+    return d1, d1 - vol_time
+
+
+def _price(
+    spot: NDArray[np.float64],
+    strike: NDArray[np.float64],
+    years: NDArray[np.float64],
+    volatility: NDArray[np.float64],
+    is_call: NDArray[np.bool_],
+    rate: float,
+    dividend: float,
+) -> NDArray[np.float64]:
+    d1, d2 = _d1_d2(spot, strike, years, volatility, rate, dividend)
+    sign = np.where(is_call, 1.0, -1.0)
+    return sign * (
+        spot * np.exp(-dividend * years) * _cdf(sign * d1)
+        - strike * np.exp(-rate * years) * _cdf(sign * d2)
+    )
+
+
+def _greeks(
+    spot: NDArray[np.float64],
+    strike: NDArray[np.float64],
+    years: NDArray[np.float64],
+    volatility: NDArray[np.float64],
+    is_call: NDArray[np.bool_],
+    rate: float,
+    dividend: float,
+) -> ModelGreeks:
+    d1, d2 = _d1_d2(spot, strike, years, volatility, rate, dividend)
+    sign = np.where(is_call, 1.0, -1.0)
+    carry = np.exp(-dividend * years)
+    discount = np.exp(-rate * years)
+    density = _pdf(d1)
+    delta = sign * carry * _cdf(sign * d1)
+    gamma = carry * density / (spot * volatility * np.sqrt(years))
+    theta = (
+        -spot * carry * density * volatility / (2 * np.sqrt(years))
+        - sign * rate * strike * discount * _cdf(sign * d2)
+        + sign * dividend * spot * carry * _cdf(sign * d1)
+    )
+    vega = spot * carry * density * np.sqrt(years)
+    return ModelGreeks(delta, gamma, theta / 365, vega / 100)
+
+
+def _broadcast(*args: ArrayLike) -> list[NDArray[np.float64]]:
+    return [np.asarray(a, dtype=np.float64) for a in np.broadcast_arrays(*args)]
+
+
+def black_scholes(
+    spot: ArrayLike,
+    strike: ArrayLike,
+    years: ArrayLike,
+    volatility: ArrayLike,
+    is_call: ArrayLike,
+    rate: float = 0.0,
+    dividend: float = 0.0,
+) -> ModelGreeks:
+    """
+    Greeks for equity options under Black-Scholes(-Merton).
+    """
+    spot, strike, years, volatility, calls = _broadcast(
+        spot, strike, years, volatility, is_call
+    )
+    return _greeks(spot, strike, years, volatility, calls.astype(bool), rate, dividend)
+
+
+def black_76(
+    forward: ArrayLike,
+    strike: ArrayLike,
+    years: ArrayLike,
+    volatility: ArrayLike,
+    is_call: ArrayLike,
+    rate: float = 0.0,
+) -> ModelGreeks:
+    """
+    Greeks for options on futures under Black-76.
+    """
+    forward, strike, years, volatility, calls = _broadcast(
+        forward, strike, years, volatility, is_call
+    )
+    # Black-76 is Black-Scholes with the underlying's carry equal to the rate
+    return _greeks(forward, strike, years, volatility, calls.astype(bool), rate, rate)
+
+
+def implied_volatility(
+    price: ArrayLike,
+    underlying: ArrayLike,
+    strike: ArrayLike,
+    years: ArrayLike,
+    is_call: ArrayLike,
+    rate: float = 0.0,
+    futures: bool = False,
+    iterations: int = 50,
+) -> NDArray[np.float64]:
+    """
+    Solves for implied volatility with a vectorized Newton's method, falling
+    back to bisection where Newton steps leave the bracket. Prices outside of
+    the no-arbitrage bounds give NaN.
+    """
+    price, spot, strike, years, calls = _broadcast(
+        price, underlying, strike, years, is_call
+    )
+    calls = calls.astype(bool)
+    dividend = rate if futures else 0.0
+    low = np.full_like(price, 1e-4)
+    high = np.full_like(price, 5.0)
+    vol = np.full_like(price, 0.3)
+    for _ in range(iterations):
+        diff = _price(spot, strike, years, vol, calls, rate, dividend) - price
+        # the price is increasing in volatility, so shrink the bracket
+        high = np.where(diff > 0, vol, high)
+        low = np.where(diff <= 0, vol, low)
+        vega = (
+            spot
+            * np.exp(-dividend * years)
+            * _pdf(_d1_d2(spot, strike, years, vol, rate, dividend)[0])
+        )
+        vega *= np.sqrt(years)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            step = vol - diff / vega
+        vol = np.where((step > low) & (step < high), step, (low + high) / 2)
+        if np.all(np.abs(diff) < 1e-6):
+            break
+    lower = _price(spot, strike, years, np.full_like(vol, 1e-4), calls, rate, dividend)
+    upper = _price(spot, strike, years, np.full_like(vol, 5.0), calls, rate, dividend)
+    return np.where((price >= lower) & (price <= upper), vol, np.nan)
@@ -0,0 +1,328 @@
+import os
+import sqlite3
+from datetime import date, datetime, timedelta, timezone
+from typing import Any, Iterator
+
+from anyio import CapacityLimiter
+from tastytrade.account import Account, Transaction
+from tastytrade.order import InstrumentType, OrderStatus, PlacedOrder
+from tastytrade.utils import TZ
+
+from ttcli.cache import cache_dir
+from ttcli.trace import span
+from ttcli.utils import RenewableSession, gather
+
+# transactions per request, and per batch read back from the store
+PAGE_SIZE = 250
+# the order history endpoint allows fewer results per page
+ORDER_PAGE_SIZE = 200
+# number of single-order requests allowed in flight at once
+MAX_CONCURRENCY = 4
+# orders in these states can't change any more
+FINAL_STATUSES = {
+    OrderStatus.CANCELLED,
+    OrderStatus.EXPIRED,
+    OrderStatus.FILLED,
+    OrderStatus.REJECTED,
+    OrderStatus.REMOVED,
+    OrderStatus.PARTIALLY_REMOVED,
+}
+
+store_path = os.path.join(cache_dir, "history.db")
+
+_db: sqlite3.Connection | None = None
+
+
+def _store() -> sqlite3.Connection:
+    global _db
+    if _db is None:
+        os.makedirs(cache_dir, exist_ok=True)
+        _db = sqlite3.connect(store_path, timeout=5)
+        _db.execute("PRAGMA journal_mode=WAL")
+        # history is stored as JSON rather than pickles, so the store survives
+        # upgrades and never has to be downloaded again from scratch
+        _db.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS transactions (
+                account TEXT NOT NULL,
+                id INTEGER NOT NULL,
+                executed_at REAL NOT NULL,
+                transaction_date TEXT NOT NULL,
+                symbol TEXT,
+                underlying_symbol TEXT,
+                instrument_type TEXT,
+                data TEXT NOT NULL,
+                PRIMARY KEY (account, id)
+            );
+            CREATE INDEX IF NOT EXISTS transactions_executed_at
+                ON transactions (account, executed_at);
+            CREATE TABLE IF NOT EXISTS orders (
+                account TEXT NOT NULL,
+                id INTEGER NOT NULL,
+                updated_at REAL NOT NULL,
+                updated_date TEXT NOT NULL,
+                status TEXT NOT NULL,
+                underlying_symbol TEXT,
+                underlying_instrument_type TEXT,
+                data TEXT NOT NULL,
+                PRIMARY KEY (account, id)
+            );
+            CREATE INDEX IF NOT EXISTS orders_updated_at
+                ON orders (account, updated_at);
+            CREATE INDEX IF NOT EXISTS orders_status ON orders (account, status);
+            """
+        )
+    return _db
+
+
+def _save(account: str, transactions: list[Transaction]) -> None:
+    db = _store()
+    with db:
+        db.executemany(
+            "INSERT OR REPLACE INTO transactions VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            [
+                (
+                    account,
+                    txn.id,
+                    txn.executed_at.timestamp(),
+                    txn.transaction_date.isoformat(),
+                    txn.symbol,
+                    txn.underlying_symbol,
+                    txn.instrument_type.value if txn.instrument_type else None,
+                    txn.model_dump_json(by_alias=True, exclude_none=True),
+                )
+                for txn in transactions
+            ],
+        )
+
+
+def _save_orders(account: str, orders: list[PlacedOrder]) -> None:
+    db = _store()
+    with db:
+        # a snapshot never replaces a newer one, so statuses only move forward
+        db.executemany(
+            """
+            INSERT INTO orders VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT (account, id) DO UPDATE SET
+                updated_at = excluded.updated_at,
+                updated_date = excluded.updated_date,
+                status = excluded.status,
+                data = excluded.data
+            WHERE excluded.updated_at >= orders.updated_at
+            """,
+            [
+                (
+                    account,
+                    order.id,
+                    order.updated_at.timestamp(),
+                    order.updated_at.astimezone(TZ).date().isoformat(),
+                    order.status.value,
+                    order.underlying_symbol,
+                    order.underlying_instrument_type.value,
+                    order.model_dump_json(by_alias=True, exclude_none=True),
+                )
+                for order in orders
+            ],
+        )
+
+
+def clear_transactions(account: str) -> None:
+    db = _store()
+    with db:
+        db.execute("DELETE FROM transactions WHERE account = ?", (account,))
+
+
+def clear_orders(account: str) -> None:
+    db = _store()
+    with db:
+        db.execute("DELETE FROM orders WHERE account = ?", (account,))
+
+
+async def sync_transactions(sesh: RenewableSession, acc: Account) -> int:
+    """
+    Downloads transactions newer than the latest stored one, a page at a time,
+    returning how many were fetched. The first sync downloads everything.
+    """
+    db = _store()
+    (latest,) = db.execute(
+        "SELECT MAX(executed_at) FROM transactions WHERE account = ?",
+        (acc.account_number,),
+    ).fetchone()
+    start_at = None
+    if latest is not None:
+        # late postings and adjustments can land a little before the newest
+        # transaction we've seen, so the overlap is fetched again
+        overlap = sesh.config.getfloat(
+            "portfolio.history", "sync-overlap-days", fallback=3
+        )
+        start_at = datetime.fromtimestamp(latest, timezone.utc) - timedelta(
+            days=overlap
+        )
+    fetched = 0
+    offset = 0
+    with span("sync transactions", "cache"):
+        while True:
+            page = await acc.get_history(
+                sesh,
+                per_page=PAGE_SIZE,
+                page_offset=offset,
+                sort="Asc",
+                start_at=start_at,
+            )
+            _save(acc.account_number, page)
+            fetched += len(page)
+            if len(page) < PAGE_SIZE:
+                return fetched
+            offset += 1
+
+
+async def sync_orders(sesh: RenewableSession, acc: Account) -> int:
+    """
+    Downloads orders updated since the last sync, then re-fetches any stored
+    order that was still working and hasn't been seen since, so its status is
+    current. Returns how many orders were fetched; the first sync downloads
+    everything.
+    """
+    db = _store()
+    (latest,) = db.execute(
+        "SELECT MAX(updated_at) FROM orders WHERE account = ?",
+        (acc.account_number,),
+    ).fetchone()
+    start_at = None
+    if latest is not None:
+        overlap = sesh.config.getfloat(
+            "order.history", "sync-overlap-minutes", fallback=10
+        )
+        start_at = datetime.fromtimestamp(latest, timezone.utc) - timedelta(
+            minutes=overlap
+        )
+    fetched = 0
+    offset = 0
+    with span("sync orders", "cache"):
+        while True:
+            page = await acc.get_order_history(
+                sesh,
+                per_page=ORDER_PAGE_SIZE,
+                page_offset=offset,
+                sort="Asc",
+                start_at=start_at,
+            )
+            _save_orders(acc.account_number, page)
+            fetched += len(page)
+            if len(page) < ORDER_PAGE_SIZE:
+                break
+            offset += 1
+        if start_at is None:
+            return fetched
+        # orders that were working at the last sync may have filled, expired or
+        # been cancelled without showing up above. the ones still working come
+        # back in a single request, and any others are fetched one by one
+        working = [
+            order_id
+            for (order_id,) in db.execute(
+                f"SELECT id FROM orders WHERE account = ? AND updated_at < ? "
+                f"AND status NOT IN ({','.join('?' * len(FINAL_STATUSES))})",
+                (acc.account_number, start_at.timestamp(), *FINAL_STATUSES),
+            )
+        ]
+        if not working:
+            return fetched
+        live = await acc.get_live_orders(sesh)
+        _save_orders(acc.account_number, live)
+        seen = {o.id for o in live}
+        limiter = CapacityLimiter(MAX_CONCURRENCY)
+
+        async def fetch_order(order_id: int) -> PlacedOrder:
+            async with limiter:
+                return await acc.get_order(sesh, order_id)
+
+        stale = [order_id for order_id in working if order_id not in seen]
+        orders = await gather(*[fetch_order(order_id) for order_id in stale])
+        _save_orders(acc.account_number, list(orders))
+    return fetched + len(live) + len(orders)
+
+
+def _symbol_clause(
+    symbol: str | None, clauses: list[str], params: list[Any], *columns: str
+) -> None:
+    if symbol and symbol[0] == "/":
+        # futures symbols match any contract month, e.g. /ES for /ESZ5
+        clauses.append(f"({' OR '.join(f'{c} LIKE ?' for c in columns)})")
+        params.extend([f"{symbol}%"] * len(columns))
+    elif symbol:
+        clauses.append(f"{columns[0]} = ?")
+        params.append(symbol)
+
+
+def iter_transactions(
+    account: str,
+    start_date: date | None = None,
+    end_date: date | None = None,
+    symbol: str | None = None,
+    instrument_type: InstrumentType | None = None,
+    asc: bool = False,
+) -> Iterator[Transaction]:
+    """
+    Yields stored transactions matching the filters, reading them from disk in
+    batches instead of loading them all at once.
+    """
+    clauses = ["account = ?"]
+    params: list[Any] = [account]
+    if start_date:
+        clauses.append("transaction_date >= ?")
+        params.append(start_date.isoformat())
+    if end_date:
+        clauses.append("transaction_date <= ?")
+        params.append(end_date.isoformat())
+    _symbol_clause(symbol, clauses, params, "underlying_symbol", "symbol")
+    if instrument_type:
+        clauses.append("instrument_type = ?")
+        params.append(instrument_type.value)
+    order = "ASC" if asc else "DESC"
+    cursor = _store().execute(
+        f"SELECT data FROM transactions WHERE {' AND '.join(clauses)} "
+        f"ORDER BY executed_at {order}, id {order}",
+        params,
+    )
+    while rows := cursor.fetchmany(PAGE_SIZE):
+        for (data,) in rows:
+            yield Transaction.model_validate_json(data)
+
+
+def iter_orders(
+    account: str,
+    start_date: date | None = None,
+    end_date: date | None = None,
+    symbol: str | None = None,
+    instrument_type: InstrumentType | None = None,
+    statuses: list[OrderStatus] | None = None,
+    asc: bool = False,
+) -> Iterator[PlacedOrder]:
+    """
+    Yields stored orders matching the filters, by the time they were last
+    updated.
+    """
+    clauses = ["account = ?"]
+    params: list[Any] = [account]
+    if start_date:
+        clauses.append("updated_date >= ?")
+        params.append(start_date.isoformat())
+    if end_date:
+        clauses.append("updated_date <= ?")
+        params.append(end_date.isoformat())
+    _symbol_clause(symbol, clauses, params, "underlying_symbol")
+    if instrument_type:
+        clauses.append("underlying_instrument_type = ?")
+        params.append(instrument_type.value)
+    if statuses:
+        clauses.append(f"status IN ({','.join('?' * len(statuses))})")
+        params.extend(s.value for s in statuses)
+    order = "ASC" if asc else "DESC"
+    cursor = _store().execute(
+        f"SELECT data FROM orders WHERE {' AND '.join(clauses)} "
+        f"ORDER BY updated_at {order}, id {order}",
+        params,
+    )
+    while rows := cursor.fetchmany(ORDER_PAGE_SIZE):
+        for (data,) in rows:
+            yield PlacedOrder.model_validate_json(data)
@@ -0,0 +1,278 @@
+import os
+import pickle
+import sqlite3
+import time
+from collections import defaultdict
+from datetime import timedelta
+from typing import Any, Awaitable, Callable, Iterable, TypeVar
+
+from anyio import CapacityLimiter
+from tastytrade.instruments import (
+    Cryptocurrency,
+    Equity,
+    Future,
+    FutureOption,
+    FutureProduct,
+)
+from tastytrade.instruments import Option as TastytradeOption
+from tastytrade.utils import TastytradeData
+
+from ttcli.cache import CACHE_VERSION, cache_dir
+from ttcli.trace import span
+from ttcli.utils import RenewableSession, batched, gather
+
+T = TypeVar("T", bound=TastytradeData)
+
+
+class ActiveFuture(Future):
+    """
+    The active month contract of a future product. It's stored under the
+    product's root symbol, apart from the contracts themselves, since it
+    changes with every roll.
+    """
+
+
+# symbols per request; keeps the query string well under URL length limits
+CHUNK_SIZE = 100
+# number of instrument requests allowed in flight at once
+MAX_CONCURRENCY = 4
+# how long each kind of instrument is served from the local store; options and
+# futures are also dropped as soon as they expire
+MAX_AGE: dict[type, timedelta] = {
+    ActiveFuture: timedelta(days=1),
+    Cryptocurrency: timedelta(days=7),
+    Equity: timedelta(days=1),
+    Future: timedelta(days=7),
+    FutureOption: timedelta(days=7),
+    FutureProduct: timedelta(days=1),
+    TastytradeOption: timedelta(days=7),
+}
+
+store_path = os.path.join(cache_dir, "instruments.db")
+
+# instruments resolved so far in this run, by class and symbol
+_memo: dict[type, dict[str, Any]] = defaultdict(dict)
+_db: sqlite3.Connection | None = None
+
+
+def _store() -> sqlite3.Connection:
+    global _db
+    if _db is None:
+        os.makedirs(cache_dir, exist_ok=True)
+        _db = sqlite3.connect(store_path, timeout=5)
+        _db.execute("PRAGMA journal_mode=WAL")
+        _db.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+            CREATE TABLE IF NOT EXISTS instruments (
+                type TEXT NOT NULL,
+                symbol TEXT NOT NULL,
+                streamer_symbol TEXT,
+                expires_at REAL NOT NULL,
+                data BLOB NOT NULL,
+                PRIMARY KEY (type, symbol)
+            );
+            CREATE INDEX IF NOT EXISTS instruments_streamer_symbol
+                ON instruments (streamer_symbol);
+            """
+        )
+        row = _db.execute("SELECT value FROM meta WHERE key = 'version'").fetchone()
+        if row is None or row[0] != CACHE_VERSION:
+            # pickled models from other versions may not load correctly
+            with _db:
+                _db.execute("DELETE FROM instruments")
+                _db.execute("DELETE FROM meta")
+                _db.execute("INSERT INTO meta VALUES ('version', ?)", (CACHE_VERSION,))
+    return _db
+
+
+def _expires_at(item: TastytradeData) -> float:
+    expiry = time.time() + MAX_AGE[type(item)].total_seconds()
+    if isinstance(item, (Future, FutureOption, TastytradeOption)) and item.expires_at:
+        expiry = min(expiry, item.expires_at.timestamp())
+    return expiry
+
+
+def _load(cls: type[T], keys: list[str]) -> dict[str, T]:
+    res: dict[str, T] = {}
+    db = _store()
+    for chunk in batched(keys, 500):  # stay under SQLite's variable limit
+        rows = db.execute(
+            f"SELECT symbol, data FROM instruments WHERE type = ? AND "
+            f"expires_at > ? AND symbol IN ({','.join('?' * len(chunk))})",
+            (cls.__name__, time.time(), *chunk),
+        )
+        res.update({symbol: pickle.loads(data) for symbol, data in rows})
+    return res
+
+
+def _save(items: dict[str, TastytradeData]) -> None:
+    db = _store()
+    with db:
+        db.executemany(
+            "INSERT OR REPLACE INTO instruments VALUES (?, ?, ?, ?, ?)",
+            [
+                (
+                    type(item).__name__,
+                    key,
+                    getattr(item, "streamer_symbol", None),
+                    _expires_at(item),
+                    pickle.dumps(item, protocol=pickle.HIGHEST_PROTOCOL),
+                )
+                for key, item in items.items()
+            ],
+        )
+
+
+async def _resolve(
+    cls: type[T],
+    symbols: Iterable[str],
+    fetch: Callable[[list[str]], Awaitable[list[T]]],
+    key: Callable[[T], str] = lambda item: item.symbol,  # type: ignore
+    chunk_size: int | None = CHUNK_SIZE,
+) -> dict[str, T]:
+    # look in this run's memo, then the local store, then the API. without a
+    # chunk size, everything missing is fetched in a single call
+    memo: dict[str, T] = _memo[cls]
+    symbols = list(dict.fromkeys(symbols))
+    missing = [s for s in symbols if s not in memo]
+    if missing:
+        with span(f"load {cls.__name__}", "cache"):
+            memo.update(_load(cls, missing))
+        missing = [s for s in missing if s not in memo]
+    if missing:
+        limiter = CapacityLimiter(MAX_CONCURRENCY)
+        fetched: dict[str, T] = {}
+
+        async def fetch_chunk(chunk: list[str]) -> None:
+            async with limiter:
+                for item in await fetch(chunk):
+                    fetched[key(item)] = item
+
+        chunks = batched(missing, chunk_size) if chunk_size else [missing]
+        await gather(*[fetch_chunk(chunk) for chunk in chunks])
+        memo.update(fetched)
+        with span(f"save {cls.__name__}", "cache"):
+            _save(fetched)  # type: ignore
+    return {s: memo[s] for s in symbols if s in memo}
+
+
+async def get_options(
+    sesh: RenewableSession, symbols: Iterable[str]
+) -> dict[str, TastytradeOption]:
+    """
+    Fetches equity options in batches, returning a dict keyed by symbol.
+    """
+
+    async def fetch(chunk: list[str]) -> list[TastytradeOption]:
+        data = await sesh._get(
+            "/instruments/equity-options", params={"symbol[]": chunk}
+        )
+        return [TastytradeOption(**i) for i in data["items"]]
+
+    return await _resolve(TastytradeOption, symbols, fetch)
+
+
+async def get_future_options(
+    sesh: RenewableSession, symbols: Iterable[str]
+) -> dict[str, FutureOption]:
+    """
+    Fetches future options in batches, returning a dict keyed by symbol.
+    """
+
+    async def fetch(chunk: list[str]) -> list[FutureOption]:
+        data = await sesh._get(
+            "/instruments/future-options", params={"symbol[]": chunk}
+        )
+        return [FutureOption(**i) for i in data["items"]]
+
+    return await _resolve(FutureOption, symbols, fetch)
+
+
+async def get_equities(
+    sesh: RenewableSession, symbols: Iterable[str]
+) -> dict[str, Equity]:
+    """
+    Fetches equities in batches, returning a dict keyed by symbol.
+    """
+    return await _resolve(Equity, symbols, lambda chunk: Equity.get(sesh, chunk))
+
+
+async def get_futures(
+    sesh: RenewableSession, symbols: Iterable[str]
+) -> dict[str, Future]:
+    """
+    Fetches futures in batches, returning a dict keyed by symbol.
+    """
+    return await _resolve(Future, symbols, lambda chunk: Future.get(sesh, chunk))
+
+
+async def get_cryptos(
+    sesh: RenewableSession, symbols: Iterable[str]
+) -> dict[str, Cryptocurrency]:
+    """
+    Fetches cryptocurrencies in batches, returning a dict keyed by symbol.
+    """
+    return await _resolve(
+        Cryptocurrency, symbols, lambda chunk: Cryptocurrency.get(sesh, chunk)
+    )
+
+
+async def get_equity(sesh: RenewableSession, symbol: str) -> Equity:
+    equities = await get_equities(sesh, [symbol])
+    # the single-symbol endpoint raises a helpful error for unknown symbols
+    return equities.get(symbol) or await Equity.get(sesh, symbol)
+
+
+async def get_future(sesh: RenewableSession, symbol: str) -> Future:
+    symbol = "/" + symbol.lstrip("/")
+    futures = await get_futures(sesh, [symbol])
+    return futures.get(symbol) or await Future.get(sesh, symbol)
+
+
+async def get_crypto(sesh: RenewableSession, symbol: str) -> Cryptocurrency:
+    cryptos = await get_cryptos(sesh, [symbol])
+    return cryptos.get(symbol) or await Cryptocurrency.get(sesh, symbol)
+
+
+async def get_future_products(
+    sesh: RenewableSession, codes: Iterable[str]
+) -> dict[str, FutureProduct]:
+    """
+    Fetches future products, returning a dict keyed by root symbol, e.g. '/ES'.
+    """
+
+    async def fetch(_: list[str]) -> list[FutureProduct]:
+        # the API returns the whole catalog in one go, and all of it is stored
+        return await FutureProduct.get(sesh)
+
+    codes = ["/" + code.lstrip("/") for code in codes]
+    return await _resolve(
+        FutureProduct, codes, fetch, key=lambda p: p.root_symbol, chunk_size=None
+    )
+
+
+async def get_active_futures(
+    sesh: RenewableSession, codes: Iterable[str]
+) -> dict[str, ActiveFuture]:
+    """
+    Fetches the active month contract of each future product, returning a dict
+    keyed by root symbol, e.g. '/ES'.
+    """
+
+    async def fetch(chunk: list[str]) -> list[ActiveFuture]:
+        data = await sesh._get(
+            "/instruments/futures",
+            params={"product-code[]": [code.lstrip("/") for code in chunk]},
+        )
+        return [ActiveFuture(**i) for i in data["items"] if i["active-month"]]
+
+    codes = ["/" + code.lstrip("/") for code in codes]
+    return await _resolve(
+        ActiveFuture, codes, fetch, key=lambda f: "/" + f.product_code
+    )
+
+
+async def get_future_product(sesh: RenewableSession, code: str) -> FutureProduct:
+    products = await get_future_products(sesh, [code])
+    return products.get("/" + code.lstrip("/")) or await FutureProduct.get(sesh, code)
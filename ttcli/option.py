@@ -1,25 +1,31 @@
-import asyncio
-from datetime import datetime
+import re
+import sys
+from bisect import bisect_left
+from collections import defaultdict
+from datetime import datetime, time
 from decimal import Decimal
-from typing import Annotated
+from typing import Annotated, Any, NamedTuple
 
+import numpy as np
+from anyio import create_task_group, sleep
 from rich.console import Console
+from rich.live import Live
 from rich.table import Table
-from tastytrade import DXLinkStreamer
-from tastytrade.dxfeed import Greeks, Quote, Summary, Trade
+from tastytrade.account import Account, AccountBalance
+from tastytrade.dxfeed import Event, Greeks, Quote, Summary, Trade
 from tastytrade.instruments import (
-    Equity,
-    Future,
     FutureOption,
     NestedFutureOptionChain,
     NestedFutureOptionChainExpiration,
     NestedOptionChain,
     NestedOptionChainExpiration,
+    Strike,
 )
 from tastytrade.instruments import (
     Option as TastytradeOption,
 )
-from tastytrade.market_data import get_market_data_by_type
+from tastytrade.market_data import MarketData, get_market_data_by_type
+from tastytrade.metrics import get_market_metrics
 from tastytrade.order import (
     InstrumentType,
     NewOrder,
@@ -27,20 +33,39 @@ from tastytrade.order import (
     OrderTimeInForce,
     OrderType,
 )
-from tastytrade.utils import TastytradeError, get_tasty_monthly
-from typer import Option
+from tastytrade.utils import (
+    TZ,
+    TastytradeError,
+    get_tasty_monthly,
+    now_in_new_york,
+    today_in_new_york,
+)
+from typer import Argument, Option
 from yaspin import yaspin
 
+from ttcli.cache import cached
+from ttcli.greeks import black_76, black_scholes, implied_volatility
+from ttcli.instruments import (
+    get_equity,
+    get_future,
+    get_future_options,
+    get_options,
+)
+from ttcli.output import FormatOption, OutputFormat, record_writer, spinner
+from ttcli.strikes import StrikeIndex
+from ttcli.trace import span
 from ttcli.utils import (
     ZERO,
     AsyncTyper,
     RenewableSession,
+    batched,
+    collect_events,
     conditional_color,
     decimalify,
     gather,
+    get_choice,
     get_confirmation,
     is_monthly,
-    listen_events,
     print_error,
     print_warning,
     round_to_tick_size,
@@ -71,15 +96,12 @@ def choose_expiration(
     for i, exp in enumerate(exps):
         if exp.expiration_date == tasty_monthly:
             default = exp
-            print(f"{i + 1}) {exp.expiration_date} (default)")
+            print(f"{i + 1}) {exp.expiration_date} (default)", file=sys.stderr)
         else:
-            print(f"{i + 1}) {exp.expiration_date}")
+            print(f"{i + 1}) {exp.expiration_date}", file=sys.stderr)
     choice = 0
     while choice not in range(1, len(exps) + 1):
-        try:
-            raw = input("Please choose an expiration: ")
-            choice = int(raw)
-        except ValueError:
+        if (choice := get_choice("Please choose an expiration: ")) is None:
             return default
 
     return exps[choice - 1]
@@ -106,148 +128,409 @@ def choose_futures_expiration(
     default = min(exps, key=lambda e: abs(e.days_to_expiration - 45))
     for i, exp in enumerate(exps):
         if exp == default:
-            print(f"{i + 1}) {exp.expiration_date} [{exp.underlying_symbol}] (default)")
+            print(
+                f"{i + 1}) {exp.expiration_date} [{exp.underlying_symbol}] (default)",
+                file=sys.stderr,
+            )
         else:
-            print(f"{i + 1}) {exp.expiration_date} [{exp.underlying_symbol}]")
+            print(
+                f"{i + 1}) {exp.expiration_date} [{exp.underlying_symbol}]",
+                file=sys.stderr,
+            )
     choice = 0
     while choice not in range(1, len(exps) + 1):
-        try:
-            raw = input("Please choose an expiration: ")
-            choice = int(raw)
-        except ValueError:
+        if (choice := get_choice("Please choose an expiration: ")) is None:
             return default
 
     return exps[choice - 1]
 
 
-option = AsyncTyper(help="Buy, sell, and analyze options.", no_args_is_help=True)
+def chain_cache_ttl(sesh: RenewableSession) -> float:
+    ttl = sesh.config.getfloat("option", "chain-cache-minutes", fallback=240) * 60
+    # chains cached before today may still list expirations that have passed
+    midnight = datetime.combine(today_in_new_york(), time(), TZ)
+    return min(ttl, (now_in_new_york() - midnight).total_seconds())
 
 
-@option.command(
-    help="Buy or sell calls with the given parameters.",
-    context_settings={"ignore_unknown_options": True},
-    no_args_is_help=True,
+async def get_option_chain(
+    sesh: RenewableSession, symbol: str, refresh: bool = False
+) -> NestedOptionChain:
+    chains = await cached(
+        "chains",
+        symbol,
+        chain_cache_ttl(sesh),
+        lambda: NestedOptionChain.get(sesh, symbol),
+        refresh,
+    )
+    return chains[0]
+
+
+async def get_future_option_chain(
+    sesh: RenewableSession, symbol: str, refresh: bool = False
+) -> NestedFutureOptionChain:
+    return await cached(
+        "chains",
+        symbol,
+        chain_cache_ttl(sesh),
+        lambda: NestedFutureOptionChain.get(sesh, symbol),
+        refresh,
+    )
+
+
+async def resolve_options(
+    sesh: RenewableSession, symbols: list[str], is_future: bool
+) -> list[TastytradeOption | FutureOption]:
+    if is_future:
+        return list((await get_future_options(sesh, symbols)).values())
+    return list((await get_options(sesh, symbols)).values())
+
+
+async def get_order_inputs(
+    sesh: RenewableSession, acc: Account, symbols: list[str], is_future: bool
+) -> tuple[
+    dict[str, MarketData], list[TastytradeOption | FutureOption], AccountBalance
+]:
+    """
+    Fetches the quotes and instruments for an order's legs along with the
+    account's balances. None of them depend on each other or on the price, so
+    they're fetched at once, before the user is asked for it.
+    """
+    data, options, balances = await gather(
+        get_market_data_by_type(
+            sesh,
+            options=symbols if not is_future else None,
+            future_options=symbols if is_future else None,
+        ),
+        resolve_options(sesh, symbols, is_future),
+        acc.get_balances(sesh),
+    )
+    return {d.symbol: d for d in data}, options, balances  # type: ignore
+
+
+async def get_underlying_mark(
+    sesh: RenewableSession,
+    symbol: str,
+    subchain: NestedOptionChainExpiration | NestedFutureOptionChainExpiration,
+    is_future: bool,
+) -> Decimal:
+    if is_future:  # futures options
+        future = await get_future(sesh, subchain.underlying_symbol)  # type: ignore
+        return (await get_market_data_by_type(sesh, futures=[future.symbol]))[
+            0
+        ].last or ZERO
+    else:
+        equity = await get_equity(sesh, symbol)
+        return (
+            await get_market_data_by_type(
+                sesh,
+                equities=[equity.symbol]
+                if equity.instrument_type == InstrumentType.EQUITY
+                else None,
+                indices=[equity.symbol]
+                if equity.instrument_type == InstrumentType.INDEX
+                else None,
+            )
+        )[0].last or ZERO
+
+
+async def get_model_greeks(
+    sesh: RenewableSession,
+    symbol: str,
+    subchain: NestedOptionChainExpiration | NestedFutureOptionChainExpiration,
+    index: StrikeIndex,
+    dxfeeds: list[str],
+    is_future: bool,
+) -> dict[str, Greeks]:
+    """
+    Computes greeks locally from the underlying mark, using Black-76 for
+    futures options. Each strike's implied volatility is solved from its
+    quote, all at once, and the expiration's volatility is only used for
+    strikes without a usable quote.
+    """
+    strikes = [index.by_call.get(s) or index.by_put[s] for s in dxfeeds]
+    is_call = [s in index.by_call for s in dxfeeds]
+    symbols = [s.call if c else s.put for s, c in zip(strikes, is_call)]
+    strike_prices = [float(s.strike_price) for s in strikes]
+
+    data: dict[str, MarketData] = {}
+
+    async def get_quotes(chunk: list[str]) -> None:
+        quotes = await get_market_data_by_type(
+            sesh,
+            future_options=chunk if is_future else None,
+            options=chunk if not is_future else None,
+        )
+        data.update({d.symbol: d for d in quotes})
+
+    # the quotes are fetched alongside the mark and the expiration's volatility
+    mark, metrics, _ = await gather(
+        get_underlying_mark(sesh, symbol, subchain, is_future),
+        get_market_metrics(sesh, [symbol]),
+        gather(*[get_quotes(chunk) for chunk in batched(symbols, 100)]),
+    )
+    spot = float(mark)  # type: ignore
+    expiry = datetime.combine(subchain.expiration_date, time(16), TZ)
+    seconds = max((expiry - now_in_new_york()).total_seconds(), 60)
+    years = seconds / (365 * 24 * 60 * 60)
+    rate = sesh.config.getfloat("option", "risk-free-rate", fallback=4) / 100
+    prices = []
+    for s in symbols:
+        d = data.get(s)
+        # a one-sided quote has no meaningful mid
+        prices.append(float((d.bid + d.ask) / 2) if d and d.bid and d.ask else np.nan)
+    with span("implied volatility"):
+        volatility = implied_volatility(
+            prices,
+            spot,
+            strike_prices,
+            years,
+            is_call,
+            rate,
+            is_future,
+        )
+    expirations = metrics[0].option_expiration_implied_volatilities if metrics else None  # type: ignore
+    flat = next(
+        (
+            float(e.implied_volatility)
+            for e in expirations or []
+            if e.expiration_date == subchain.expiration_date and e.implied_volatility
+        ),
+        None,
+    )
+    solved = ~np.isnan(volatility)
+    if flat is None and solved.any():  # the solved strike nearest the money
+        atm = min(np.flatnonzero(solved), key=lambda i: abs(strike_prices[i] - spot))
+        flat = volatility[atm]
+    if flat is None:
+        return {}
+    volatility = np.where(solved, volatility, flat)
+
+    model = black_76 if is_future else black_scholes
+    with span("model greeks"):
+        res = model(
+            spot,
+            strike_prices,
+            years,
+            volatility,
+            is_call,
+            rate,
+        )
+    return {
+        symbol: Greeks.model_construct(
+            event_symbol=symbol,
+            volatility=Decimal(f"{volatility[i]:.4f}"),
+            delta=Decimal(f"{res.delta[i]:.4f}"),
+            gamma=Decimal(f"{res.gamma[i]:.4f}"),
+            theta=Decimal(f"{res.theta[i]:.4f}"),
+            vega=Decimal(f"{res.vega[i]:.4f}"),
+        )
+        for i, symbol in enumerate(dxfeeds)
+    }
+
+
+async def get_greeks(
+    sesh: RenewableSession,
+    symbol: str,
+    expirations: list[
+        tuple[
+            NestedOptionChainExpiration | NestedFutureOptionChainExpiration,
+            StrikeIndex,
+            list[str],
+        ]
+    ],
+    is_future: bool,
+) -> list[dict[str, Greeks | None]]:
+    """
+    Fetches greeks for the given symbols of each expiration from one streamer
+    subscription, or computes them locally if `option.greeks-source` is
+    "model". Symbols the streamer doesn't report in time are also computed
+    locally.
+    """
+    if not expirations:
+        return []
+    streamed: dict[str, Greeks | None] = {}
+    if sesh.config.get("option", "greeks-source", fallback="stream") != "model":
+        with yaspin(color="green", text="Fetching greeks..."):
+            async with sesh.streamer() as streamer:
+                snapshot = await collect_events(
+                    streamer,
+                    {Greeks: [s for _, _, dxfeeds in expirations for s in dxfeeds]},
+                    sesh.config.getfloat("general", "stream-timeout", fallback=3),
+                )
+        streamed = snapshot.get(Greeks)
+
+    async def complete(
+        subchain: NestedOptionChainExpiration | NestedFutureOptionChainExpiration,
+        index: StrikeIndex,
+        dxfeeds: list[str],
+    ) -> dict[str, Greeks | None]:
+        greeks = {s: streamed.get(s) for s in dxfeeds}
+        missing = [s for s in dxfeeds if greeks[s] is None]
+        if missing:
+            greeks.update(
+                await get_model_greeks(
+                    sesh, symbol, subchain, index, missing, is_future
+                )
+            )
+        return greeks
+
+    return list(await gather(*[complete(*e) for e in expirations]))
+
+
+class LegSpec(NamedTuple):
+    """
+    One leg of a strategy: contracts per unit of the order (negative to sell),
+    whether it's a put, and how its strike is chosen, either at a price, by
+    delta, or at an offset from the previous leg's strike. Legs without their
+    own `dte` use the order's expiration.
+    """
+
+    ratio: int
+    put: bool
+    strike: Decimal | None = None
+    delta: int | None = None
+    offset: Decimal | None = None
+    dte: int | None = None
+
+
+# legs as written for `tt option strategy`, e.g. -1Pd30, 2Cs450 or C+5@60
+LEG_RE = re.compile(
+    r"^([+-]?\d*)([CP])(?:D(\d+)|S(\d+(?:\.\d+)?)|([+-]\d+(?:\.\d+)?))(?:@(\d+))?$",
+    re.IGNORECASE,
 )
-async def call(
+
+
+def parse_leg(text: str) -> LegSpec | None:
+    match = LEG_RE.match(text)
+    if match is None:
+        return None
+    ratio, kind, delta, strike, offset, dte = match.groups()
+    return LegSpec(
+        int(ratio + "1" if ratio in ("", "+", "-") else ratio),
+        kind.upper() == "P",
+        strike=Decimal(strike) if strike else None,
+        delta=int(delta) if delta else None,
+        offset=Decimal(offset) if offset else None,
+        dte=int(dte) if dte else None,
+    )
+
+
+async def enter_strategy(
     symbol: str,
     quantity: int,
-    strike: Annotated[
-        Decimal | None,
-        Option(
-            "--strike",
-            "-s",
-            help="The chosen strike for the option.",
-            parser=decimalify,
-        ),
-    ] = None,
-    width: Annotated[
-        int | None,
-        Option(
-            "--width", "-w", help="Turns the order into a spread with the given width."
-        ),
-    ] = None,
-    gtc: Annotated[
-        bool, Option("--gtc", help="Place a GTC order instead of a day order.")
-    ] = False,
-    delta: Annotated[
-        int | None, Option("--delta", "-d", help="The chosen delta for the option.")
-    ] = None,
-    weeklies: Annotated[
-        bool, Option("--weeklies", help="Show all expirations, not just monthlies.")
-    ] = False,
-    dte: Annotated[
-        int | None, Option("--dte", help="Days to expiration for the option.")
-    ] = None,
+    specs: list[LegSpec],
+    name: str,
+    gtc: bool,
+    weeklies: bool,
+    dte: int | None,
+    refresh: bool,
 ):
-    if strike is not None and delta is not None:
-        print_error("Must specify either delta or strike, but not both.")
-        return
-    elif not strike and not delta:
-        print_error("Please specify either delta or strike for the option.")
-        return
-    elif delta is not None and abs(delta) > 99:
-        print_error("Delta value is too high, -99 <= delta <= 99")
-        return
-
+    """
+    Prices, reviews and places an order made of any number of option legs.
+    The chain is fetched once, greeks are streamed once per expiration, and
+    quotes, instruments and balances are fetched together.
+    """
     sesh = await RenewableSession()
     if dte is None:
         dte = sesh.config.getint("option", "default-dte", fallback=None)
     symbol = symbol.upper()
     is_future = symbol[0] == "/"
+    leg_dtes = [spec.dte if spec.dte is not None else dte for spec in specs]
+    subchains: dict[
+        int | None, NestedOptionChainExpiration | NestedFutureOptionChainExpiration
+    ] = {}
     if is_future:  # futures options
-        chain = await NestedFutureOptionChain.get(sesh, symbol)
-        subchain = choose_futures_expiration(chain, dte, weeklies)
-        ticks = subchain.tick_sizes
+        chain = await get_future_option_chain(sesh, symbol, refresh)
+        for leg_dte in leg_dtes:
+            if leg_dte not in subchains:
+                subchains[leg_dte] = choose_futures_expiration(chain, leg_dte, weeklies)
+        ticks = subchains[leg_dtes[0]].tick_sizes  # type: ignore
     else:
-        chain = (await NestedOptionChain.get(sesh, symbol))[0]
-        subchain = choose_expiration(chain, dte, weeklies)
+        chain = await get_option_chain(sesh, symbol, refresh)
+        for leg_dte in leg_dtes:
+            if leg_dte not in subchains:
+                subchains[leg_dte] = choose_expiration(chain, leg_dte, weeklies)
         ticks = chain.tick_sizes
     fmt = lambda x: round_to_tick_size(x, ticks)
+    indexes = {d: StrikeIndex(subchain.strikes) for d, subchain in subchains.items()}
 
-    dxfeeds = [s.call_streamer_symbol for s in subchain.strikes]
-    greeks_dict: dict[str, Greeks] = {}
+    # only the sides of each expiration that pick strikes by delta are streamed
+    by_delta: dict[int | None, set[bool]] = defaultdict(set)
+    for spec, leg_dte in zip(specs, leg_dtes):
+        if spec.delta is not None:
+            by_delta[leg_dte].add(spec.put)
 
-    if not strike:
-        with yaspin(color="green", text="Fetching greeks..."):
-            async with DXLinkStreamer(sesh) as streamer:
-                await streamer.subscribe(Greeks, dxfeeds)
-                async for greek in streamer.listen(Greeks):
-                    greeks_dict[greek.event_symbol] = greek
-                    if len(greeks_dict) == len(dxfeeds):
-                        break
-        greeks = list(greeks_dict.values())
-        selected = min(greeks, key=lambda g: abs(g.delta * 100 - Decimal(delta or 0)))
-        # set strike with the closest delta
-        strike = next(
-            s.strike_price
-            for s in subchain.strikes
-            if s.call_streamer_symbol == selected.event_symbol
-        )
+    def delta_feeds(d: int | None) -> list[str]:
+        sides = by_delta[d]
+        dxfeeds = [s.put_streamer_symbol for s in subchains[d].strikes if True in sides]
+        dxfeeds += [
+            s.call_streamer_symbol for s in subchains[d].strikes if False in sides
+        ]
+        return dxfeeds
 
-    strike_symbol = next(s.call for s in subchain.strikes if s.strike_price == strike)
-    if width:
-        try:
-            spread_strike = next(
-                s for s in subchain.strikes if s.strike_price == strike + width
-            )
-        except StopIteration:
-            print_error(f"Unable to locate option at strike {strike + width}!")
-            return
-        dxfeeds = [strike_symbol, spread_strike.call]
-        data = await get_market_data_by_type(
-            sesh,
-            options=dxfeeds if not is_future else None,
-            future_options=dxfeeds if is_future else None,
-        )
-        data_dict = {d.symbol: d for d in data}
-        bid = data_dict[strike_symbol].bid - data_dict[spread_strike.call].ask  # type: ignore
-        ask = data_dict[strike_symbol].ask - data_dict[spread_strike.call].bid  # type: ignore
-    else:
-        data = (
-            await get_market_data_by_type(
-                sesh,
-                future_options=[strike_symbol] if is_future else None,
-                options=[strike_symbol] if not is_future else None,
+    # every expiration's greeks come from the same streamer subscription
+    expirations = [(subchains[d], indexes[d], delta_feeds(d)) for d in by_delta]
+    greeks = dict(zip(by_delta, await get_greeks(sesh, symbol, expirations, is_future)))
+
+    strikes: list[Strike] = []
+    for spec, leg_dte in zip(specs, leg_dtes):
+        index = indexes[leg_dte]
+        if spec.delta is not None:
+            selected = index.nearest_delta(
+                greeks[leg_dte], Decimal(spec.delta), put=spec.put
             )
-        )[0]
-        bid = data.bid or 0
-        ask = data.ask or 0
+            if selected is None:
+                print_error("Unable to fetch greeks to select a strike by delta!")
+                return
+        elif spec.strike is not None:
+            selected = index.get(spec.strike)
+            if selected is None:
+                nearest = index.nearest(spec.strike).strike_price
+                print_error(
+                    f"Unable to locate option at strike {spec.strike}, try {nearest}!"
+                )
+                return
+        else:
+            price = strikes[-1].strike_price + (spec.offset or ZERO)
+            selected = index.get(price)
+            if selected is None:
+                print_error(f"Unable to locate option at strike {price}!")
+                return
+        strikes.append(selected)
+    symbols = [s.put if spec.put else s.call for s, spec in zip(strikes, specs)]
+
+    acc = sesh.get_account()
+    data_dict, options, balances = await get_order_inputs(
+        sesh, acc, list(dict.fromkeys(symbols)), is_future
+    )
+    instruments = {o.symbol: o for o in options}
+    # the bid of a bought leg adds to the strategy's bid, and its ask to the
+    # strategy's ask; sold legs take away from the opposite side
+    bid = ask = ZERO
+    for spec, s in zip(specs, symbols):
+        leg_bid, leg_ask = data_dict[s].bid or ZERO, data_dict[s].ask or ZERO
+        if spec.ratio > 0:
+            bid += spec.ratio * leg_bid
+            ask += spec.ratio * leg_ask
+        else:
+            bid += spec.ratio * leg_ask
+            ask += spec.ratio * leg_bid
     mid = fmt((bid + ask) / Decimal(2))
-    console = Console()
-    if width:
-        table = Table(
-            show_header=True,
-            header_style="bold",
-            title_style="bold",
-            title=f"Quote for {symbol} call spread {subchain.expiration_date}",
-        )
+    expirations = "/".join(
+        str(e) for e in dict.fromkeys(subchains[d].expiration_date for d in leg_dtes)
+    )
+    if len(specs) == 1:
+        description = f"{strikes[0].strike_price}{'P' if specs[0].put else 'C'}"
     else:
-        table = Table(
-            show_header=True,
-            header_style="bold",
-            title_style="bold",
-            title=f"Quote for {symbol} {strike}C {subchain.expiration_date}",
-        )
+        prices = dict.fromkeys(str(s.strike_price) for s in strikes)
+        description = f"{'/'.join(prices)} {name}"
+    console = Console()
+    table = Table(
+        show_header=True,
+        header_style="bold",
+        title_style="bold",
+        title=f"Quote for {symbol} {description} {expirations}",
+    )
     table.add_column("Bid", style="green", justify="center")
     table.add_column("Mid", justify="center")
     table.add_column("Ask", style="red", justify="center")
@@ -257,33 +540,15 @@ async def call(
     price = input("Please enter a limit price per quantity (default mid): ")
     price = mid if not price else Decimal(price)
 
-    short_symbol = next(s.call for s in subchain.strikes if s.strike_price == strike)
-    cls = FutureOption if is_future else TastytradeOption
-    if width:
-        res = list(
-            await gather(
-                *[cls.get(sesh, s) for s in [short_symbol, spread_strike.call]]  # type: ignore
+    legs = []
+    for spec, s in zip(specs, symbols):
+        size = spec.ratio * quantity
+        legs.append(
+            instruments[s].build_leg(
+                Decimal(abs(size)),
+                OrderAction.SELL_TO_OPEN if size < 0 else OrderAction.BUY_TO_OPEN,
             )
         )
-        res.sort(key=lambda x: x.strike_price)
-        legs = [
-            res[0].build_leg(
-                Decimal(abs(quantity)),
-                OrderAction.SELL_TO_OPEN if quantity < 0 else OrderAction.BUY_TO_OPEN,
-            ),
-            res[1].build_leg(
-                Decimal(abs(quantity)),
-                OrderAction.BUY_TO_OPEN if quantity < 0 else OrderAction.SELL_TO_OPEN,
-            ),
-        ]
-    else:
-        call = await cls.get(sesh, short_symbol)
-        legs = [
-            call.build_leg(
-                Decimal(abs(quantity)),
-                OrderAction.SELL_TO_OPEN if quantity < 0 else OrderAction.BUY_TO_OPEN,
-            )
-        ]
     m = 1 if quantity < 0 else -1
     order = NewOrder(
         time_in_force=OrderTimeInForce.GTC if gtc else OrderTimeInForce.DAY,
@@ -291,24 +556,18 @@ async def call(
         legs=legs,
         price=fmt(price * m),
     )
-    acc = sesh.get_account()
     try:
         data = await acc.place_order(sesh, order, dry_run=True)
     except TastytradeError as e:
         print_error(str(e))
         return
 
-    nl = (await acc.get_balances(sesh)).net_liquidating_value
+    nl = balances.net_liquidating_value
     bp = data.buying_power_effect.change_in_buying_power
     percent = abs(bp) / nl * Decimal(100)
     fees = data.fee_calculation.total_fees if data.fee_calculation else ZERO
 
-    table = Table(
-        show_header=True,
-        header_style="bold",
-        title_style="bold",
-        title="Order Review",
-    )
+    table = Table(header_style="bold", title_style="bold", title="Order Review")
     table.add_column("Quantity", justify="center")
     table.add_column("Symbol", justify="center")
     table.add_column("Strike", justify="center")
@@ -318,28 +577,23 @@ async def call(
     table.add_column("BP", justify="center")
     table.add_column("BP %", justify="center")
     table.add_column("Fees", justify="center")
-    table.add_row(
-        f"{quantity:+}",
-        symbol,
-        f"${fmt(strike)}",
-        "CALL",
-        f"{subchain.expiration_date}",
-        conditional_color(fmt(price), round=False),
-        conditional_color(bp),
-        f"{percent:.2f}%",
-        conditional_color(fees),
-    )
-    if width:
+    for i, (spec, strike, leg_dte) in enumerate(zip(specs, strikes, leg_dtes)):
         table.add_row(
-            f"{-quantity:+}",
+            f"{spec.ratio * quantity:+}",
             symbol,
-            f"${fmt(spread_strike.strike_price)}",  # type: ignore
-            "CALL",
-            f"{subchain.expiration_date}",
-            "-",
-            "-",
-            "-",
-            "-",
+            f"${fmt(strike.strike_price)}",
+            "PUT" if spec.put else "CALL",
+            f"{subchains[leg_dte].expiration_date}",
+            *(
+                (
+                    conditional_color(fmt(price), round=False),
+                    conditional_color(bp),
+                    f"{percent:.2f}%",
+                    conditional_color(fees),
+                )
+                if i == 0
+                else ("-", "-", "-", "-")
+            ),
         )
     console.print(table)
 
@@ -357,12 +611,15 @@ async def call(
         await acc.place_order(sesh, order, dry_run=False)
 
 
+option = AsyncTyper(help="Buy, sell, and analyze options.", no_args_is_help=True)
+
+
 @option.command(
-    help="Buy or sell puts with the given parameters.",
+    help="Buy or sell calls with the given parameters.",
     context_settings={"ignore_unknown_options": True},
     no_args_is_help=True,
 )
-async def put(
+async def call(
     symbol: str,
     quantity: int,
     strike: Annotated[
@@ -392,6 +649,10 @@ async def put(
     dte: Annotated[
         int | None, Option("--dte", help="Days to expiration for the option.")
     ] = None,
+    refresh: Annotated[
+        bool,
+        Option("--refresh", help="Fetch the option chain instead of using the cache."),
+    ] = False,
 ):
     if strike is not None and delta is not None:
         print_error("Must specify either delta or strike, but not both.")
@@ -402,192 +663,69 @@ async def put(
     elif delta is not None and abs(delta) > 99:
         print_error("Delta value is too high, -99 <= delta <= 99")
         return
-
-    sesh = await RenewableSession()
-    if dte is None:
-        dte = sesh.config.getint("option", "default-dte", fallback=None)
-    symbol = symbol.upper()
-    is_future = symbol[0] == "/"
-    if is_future:  # futures options
-        chain = await NestedFutureOptionChain.get(sesh, symbol)
-        subchain = choose_futures_expiration(chain, dte, weeklies)
-        ticks = subchain.tick_sizes
-    else:
-        chain = (await NestedOptionChain.get(sesh, symbol))[0]
-        subchain = choose_expiration(chain, dte, weeklies)
-        ticks = chain.tick_sizes
-    fmt = lambda x: round_to_tick_size(x, ticks)
-
-    dxfeeds = [s.put_streamer_symbol for s in subchain.strikes]
-    greeks_dict: dict[str, Greeks] = {}
-
-    if not strike:
-        with yaspin(color="green", text="Fetching greeks..."):
-            async with DXLinkStreamer(sesh) as streamer:
-                await streamer.subscribe(Greeks, dxfeeds)
-                async for greek in streamer.listen(Greeks):
-                    greeks_dict[greek.event_symbol] = greek
-                    if len(greeks_dict) == len(dxfeeds):
-                        break
-        greeks = list(greeks_dict.values())
-        selected = min(greeks, key=lambda g: abs(g.delta * 100 + Decimal(delta or 0)))
-        # set strike with the closest delta
-        strike = next(
-            s.strike_price
-            for s in subchain.strikes
-            if s.put_streamer_symbol == selected.event_symbol
-        )
-
-    strike_symbol = next(s.put for s in subchain.strikes if s.strike_price == strike)
-    if width:
-        try:
-            spread_strike = next(
-                s for s in subchain.strikes if s.strike_price == strike - width
-            )
-        except StopIteration:
-            print_error(f"Unable to locate option at strike {strike - width}!")
-            return
-        dxfeeds = [strike_symbol, spread_strike.put]
-        data = await get_market_data_by_type(
-            sesh,
-            options=dxfeeds if not is_future else None,
-            future_options=dxfeeds if is_future else None,
-        )
-        data_dict = {d.symbol: d for d in data}
-        bid = data_dict[strike_symbol].bid - data_dict[spread_strike.call].ask  # type: ignore
-        ask = data_dict[strike_symbol].ask - data_dict[spread_strike.call].bid  # type: ignore
-    else:
-        data = (
-            await get_market_data_by_type(
-                sesh,
-                future_options=[strike_symbol] if is_future else None,
-                options=[strike_symbol] if not is_future else None,
-            )
-        )[0]
-        bid = data.bid or 0
-        ask = data.ask or 0
-    mid = fmt((bid + ask) / Decimal(2))
-    console = Console()
-    if width:
-        table = Table(
-            show_header=True,
-            header_style="bold",
-            title_style="bold",
-            title=f"Quote for {symbol} put spread {subchain.expiration_date}",
-        )
-    else:
-        table = Table(
-            show_header=True,
-            header_style="bold",
-            title_style="bold",
-            title=f"Quote for {symbol} {strike}P {subchain.expiration_date}",
-        )
-    table.add_column("Bid", style="green", justify="center")
-    table.add_column("Mid", justify="center")
-    table.add_column("Ask", style="red", justify="center")
-    table.add_row(f"{fmt(bid)}", f"{fmt(mid)}", f"{fmt(ask)}")
-    console.print(table)
-
-    price = input("Please enter a limit price per quantity (default mid): ")
-    price = mid if not price else Decimal(price)
-
-    short_symbol = next(s.put for s in subchain.strikes if s.strike_price == strike)
-    cls = FutureOption if is_future else TastytradeOption
+    specs = [LegSpec(1, False, strike=strike, delta=delta)]
     if width:
-        res = list(
-            await gather(*[cls.get(sesh, s) for s in [short_symbol, spread_strike.put]])  # type: ignore
-        )
-        res.sort(key=lambda x: x.strike_price, reverse=True)
-        legs = [
-            res[0].build_leg(
-                Decimal(abs(quantity)),
-                OrderAction.SELL_TO_OPEN if quantity < 0 else OrderAction.BUY_TO_OPEN,
-            ),
-            res[1].build_leg(
-                Decimal(abs(quantity)),
-                OrderAction.BUY_TO_OPEN if quantity < 0 else OrderAction.SELL_TO_OPEN,
-            ),
-        ]
-    else:
-        put = await cls.get(sesh, short_symbol)
-        legs = [
-            put.build_leg(
-                Decimal(abs(quantity)),
-                OrderAction.SELL_TO_OPEN if quantity < 0 else OrderAction.BUY_TO_OPEN,
-            )
-        ]
-    m = 1 if quantity < 0 else -1
-    order = NewOrder(
-        time_in_force=OrderTimeInForce.GTC if gtc else OrderTimeInForce.DAY,
-        order_type=OrderType.LIMIT,
-        legs=legs,
-        price=fmt(price * m),
+        specs.append(LegSpec(-1, False, offset=Decimal(width)))
+    await enter_strategy(
+        symbol, quantity, specs, "call spread", gtc, weeklies, dte, refresh
     )
-    acc = sesh.get_account()
-
-    try:
-        data = await acc.place_order(sesh, order, dry_run=True)
-    except TastytradeError as e:
-        print_error(str(e))
-        return
 
-    nl = (await acc.get_balances(sesh)).net_liquidating_value
-    bp = data.buying_power_effect.change_in_buying_power
-    percent = abs(bp) / nl * Decimal(100)
-    fees = data.fee_calculation.total_fees if data.fee_calculation else ZERO
 
-    table = Table(
-        show_header=True,
-        header_style="bold",
-        title_style="bold",
-        title="Order Review",
-    )
-    table.add_column("Quantity", justify="center")
-    table.add_column("Symbol", justify="center")
-    table.add_column("Strike", justify="center")
-    table.add_column("Type", justify="center")
-    table.add_column("Expiration", justify="center")
-    table.add_column("Price", justify="center")
-    table.add_column("BP", justify="center")
-    table.add_column("BP %", justify="center")
-    table.add_column("Fees", justify="center")
-    table.add_row(
-        f"{quantity:+}",
-        symbol,
-        f"${fmt(strike)}",
-        "PUT",
-        f"{subchain.expiration_date}",
-        conditional_color(fmt(price), round=False),
-        conditional_color(bp),
-        f"{percent:.2f}%",
-        conditional_color(fees),
-    )
+@option.command(
+    help="Buy or sell puts with the given parameters.",
+    context_settings={"ignore_unknown_options": True},
+    no_args_is_help=True,
+)
+async def put(
+    symbol: str,
+    quantity: int,
+    strike: Annotated[
+        Decimal | None,
+        Option(
+            "--strike",
+            "-s",
+            help="The chosen strike for the option.",
+            parser=decimalify,
+        ),
+    ] = None,
+    width: Annotated[
+        int | None,
+        Option(
+            "--width", "-w", help="Turns the order into a spread with the given width."
+        ),
+    ] = None,
+    gtc: Annotated[
+        bool, Option("--gtc", help="Place a GTC order instead of a day order.")
+    ] = False,
+    delta: Annotated[
+        int | None, Option("--delta", "-d", help="The chosen delta for the option.")
+    ] = None,
+    weeklies: Annotated[
+        bool, Option("--weeklies", help="Show all expirations, not just monthlies.")
+    ] = False,
+    dte: Annotated[
+        int | None, Option("--dte", help="Days to expiration for the option.")
+    ] = None,
+    refresh: Annotated[
+        bool,
+        Option("--refresh", help="Fetch the option chain instead of using the cache."),
+    ] = False,
+):
+    if strike is not None and delta is not None:
+        print_error("Must specify either delta or strike, but not both.")
+        return
+    elif not strike and not delta:
+        print_error("Please specify either delta or strike for the option.")
+        return
+    elif delta is not None and abs(delta) > 99:
+        print_error("Delta value is too high, -99 <= delta <= 99")
+        return
+    specs = [LegSpec(1, True, strike=strike, delta=delta)]
     if width:
-        table.add_row(
-            f"{-quantity:+}",
-            symbol,
-            f"${fmt(spread_strike.strike_price)}",  # type: ignore
-            "PUT",
-            f"{subchain.expiration_date}",
-            "-",
-            "-",
-            "-",
-            "-",
-        )
-    console.print(table)
-
-    if data.warnings:
-        for warning in data.warnings:
-            print_warning(warning.message)
-    warn_percent = sesh.config.getfloat(
-        "portfolio", "bp-max-percent-per-position", fallback=None
+        specs.append(LegSpec(-1, True, offset=Decimal(-width)))
+    await enter_strategy(
+        symbol, quantity, specs, "put spread", gtc, weeklies, dte, refresh
     )
-    if warn_percent and percent > warn_percent:
-        print_warning(
-            f"Buying power usage is above per-position target of {warn_percent}%!"
-        )
-    if get_confirmation("Send order? Y/n "):
-        await acc.place_order(sesh, order, dry_run=False)
 
 
 @option.command(
@@ -636,6 +774,10 @@ async def strangle(
     dte: Annotated[
         int | None, Option("--dte", help="Days to expiration for the strangle.")
     ] = None,
+    refresh: Annotated[
+        bool,
+        Option("--refresh", help="Fetch the option chain instead of using the cache."),
+    ] = False,
 ):
     if (call is not None or put is not None) and delta is not None:
         print_error("Must specify either delta or strike, but not both.")
@@ -646,268 +788,61 @@ async def strangle(
     elif delta is not None and abs(delta) > 99:
         print_error("Delta value is too high, -99 <= delta <= 99")
         return
-
-    sesh = await RenewableSession()
-    if dte is None:
-        dte = sesh.config.getint("option", "default-dte", fallback=None)
-    symbol = symbol.upper()
-    is_future = symbol[0] == "/"
-    if is_future:  # futures options
-        chain = await NestedFutureOptionChain.get(sesh, symbol)
-        subchain = choose_futures_expiration(chain, dte, weeklies)
-        ticks = subchain.tick_sizes
-    else:
-        chain = (await NestedOptionChain.get(sesh, symbol))[0]
-        subchain = choose_expiration(chain, dte, weeklies)
-        ticks = chain.tick_sizes
-    fmt = lambda x: round_to_tick_size(x, ticks)
-
-    put_dxf = [s.put_streamer_symbol for s in subchain.strikes]
-    call_dxf = [s.call_streamer_symbol for s in subchain.strikes]
-    dxfeeds = put_dxf + call_dxf
-    greeks_dict: dict[str, Greeks] = {}
-
-    if delta is not None:
-        with yaspin(color="green", text="Fetching greeks..."):
-            async with DXLinkStreamer(sesh) as streamer:
-                await streamer.subscribe(Greeks, dxfeeds)
-                async for greek in streamer.listen(Greeks):
-                    greeks_dict[greek.event_symbol] = greek
-                    if len(greeks_dict) == len(dxfeeds):
-                        break
-        put_greeks = [v for v in greeks_dict.values() if v.event_symbol in put_dxf]
-        call_greeks = [v for v in greeks_dict.values() if v.event_symbol in call_dxf]
-
-        selected_put = min(
-            put_greeks, key=lambda g: abs(g.delta * 100 + Decimal(delta))
-        )
-        selected_call = min(
-            call_greeks, key=lambda g: abs(g.delta * 100 - Decimal(delta))
-        )
-        # set strike with the closest delta
-        put_strike = next(
-            s
-            for s in subchain.strikes
-            if s.put_streamer_symbol == selected_put.event_symbol
-        )
-        call_strike = next(
-            s
-            for s in subchain.strikes
-            if s.call_streamer_symbol == selected_call.event_symbol
-        )
-    else:
-        put_strike = next(s for s in subchain.strikes if s.strike_price == put)
-        call_strike = next(s for s in subchain.strikes if s.strike_price == call)
-
+    specs = [LegSpec(1, True, strike=put, delta=delta)]
     if width:
-        try:
-            put_spread_strike = next(
-                s
-                for s in subchain.strikes
-                if s.strike_price == put_strike.strike_price - width
-            )
-        except StopIteration:
-            print_error(
-                f"Unable to locate option at strike {put_strike.strike_price - width}!"
-            )
-            return
-        try:
-            call_spread_strike = next(
-                s
-                for s in subchain.strikes
-                if s.strike_price == call_strike.strike_price + width
-            )
-        except StopIteration:
-            print_error(
-                f"Unable to locate option at strike {call_strike.strike_price + width}!"
-            )
-            return
-
-        dxfeeds = [
-            call_strike.call,
-            put_strike.put,
-            put_spread_strike.put,
-            call_spread_strike.call,
-        ]
-        data = await get_market_data_by_type(
-            sesh,
-            options=dxfeeds if not is_future else None,
-            future_options=dxfeeds if is_future else None,
-        )
-        data_dict = {d.symbol: d for d in data}
-        bid = (
-            data_dict[call_strike.call].bid  # type: ignore
-            + data_dict[put_strike.put].bid
-            - data_dict[put_spread_strike.put].ask
-            - data_dict[call_spread_strike.call].ask
-        )
-        ask = (
-            data_dict[call_strike.call].ask  # type: ignore
-            + data_dict[put_strike.put].ask
-            - data_dict[put_spread_strike.put].bid
-            - data_dict[call_spread_strike.call].bid
-        )
-    else:
-        dxfeeds = [put_strike.put, call_strike.call]
-        data = await get_market_data_by_type(
-            sesh,
-            options=dxfeeds if not is_future else None,
-            future_options=dxfeeds if is_future else None,
-        )
-        data_dict = {d.symbol: d for d in data}
-        bid = sum([q.bid or 0 for q in data_dict.values()])
-        ask = sum([q.ask or 0 for q in data_dict.values()])
-    mid = fmt((bid + ask) / Decimal(2))
-    console = Console()
+        specs.append(LegSpec(-1, True, offset=Decimal(-width)))
+    specs.append(LegSpec(1, False, strike=call, delta=delta))
     if width:
-        table = Table(
-            show_header=True,
-            header_style="bold",
-            title_style="bold",
-            title=f"Quote for {symbol} iron condor {subchain.expiration_date}",
-        )
-    else:
-        table = Table(
-            show_header=True,
-            header_style="bold",
-            title_style="bold",
-            title=f"Quote for {symbol} {put_strike.strike_price}/{call_strike.strike_price} strangle {subchain.expiration_date}",
-        )
-    table.add_column("Bid", style="green", justify="center")
-    table.add_column("Mid", justify="center")
-    table.add_column("Ask", style="red", justify="center")
-    table.add_row(f"{fmt(bid)}", f"{fmt(mid)}", f"{fmt(ask)}")
-    console.print(table)
-
-    price = input("Please enter a limit price per quantity (default mid): ")
-    price = mid if not price else Decimal(price)
+        specs.append(LegSpec(-1, False, offset=Decimal(width)))
+    name = "iron condor" if width else "strangle"
+    await enter_strategy(symbol, quantity, specs, name, gtc, weeklies, dte, refresh)
 
-    tt_symbols = [put_strike.put, call_strike.call]
-    if width:
-        tt_symbols += [put_spread_strike.put, call_spread_strike.call]  # type: ignore
-    cls = FutureOption if is_future else TastytradeOption
-    options = list(await gather(*[cls.get(sesh, s) for s in tt_symbols]))
-    options.sort(key=lambda o: o.strike_price)
-    q = Decimal(quantity)
-    if width:
-        legs = [
-            options[0].build_leg(
-                abs(q),
-                OrderAction.BUY_TO_OPEN if quantity < 0 else OrderAction.SELL_TO_OPEN,
-            ),
-            options[1].build_leg(
-                abs(q),
-                OrderAction.SELL_TO_OPEN if quantity < 0 else OrderAction.BUY_TO_OPEN,
-            ),
-            options[2].build_leg(
-                abs(q),
-                OrderAction.SELL_TO_OPEN if quantity < 0 else OrderAction.BUY_TO_OPEN,
-            ),
-            options[3].build_leg(
-                abs(q),
-                OrderAction.BUY_TO_OPEN if quantity < 0 else OrderAction.SELL_TO_OPEN,
-            ),
-        ]
-    else:
-        legs = [
-            options[0].build_leg(
-                abs(q),
-                OrderAction.SELL_TO_OPEN if quantity < 0 else OrderAction.BUY_TO_OPEN,
-            ),
-            options[1].build_leg(
-                abs(q),
-                OrderAction.SELL_TO_OPEN if quantity < 0 else OrderAction.BUY_TO_OPEN,
-            ),
-        ]
-    m = 1 if quantity < 0 else -1
-    order = NewOrder(
-        time_in_force=OrderTimeInForce.GTC if gtc else OrderTimeInForce.DAY,
-        order_type=OrderType.LIMIT,
-        legs=legs,
-        price=price * m,
-    )
-    acc = sesh.get_account()
 
-    try:
-        data = await acc.place_order(sesh, order, dry_run=True)
-    except TastytradeError as e:
-        print_error(str(e))
+@option.command(
+    help="Buy or sell any combination of options, given as legs like -1Pd30.",
+    epilog="Each leg is an optional signed ratio, C or P, then how to pick its "
+    "strike: d followed by a delta, s followed by a strike, or an offset like "
+    "+5 from the previous leg's strike. Add @ and a number of days to put a "
+    "leg in another expiration. For example, a call butterfly is "
+    "`1Cd50 -2C+5 1C+5`, a calendar is `-1Cd50 1C+0@60` and a jade lizard is "
+    "`-1Pd30 -1Cd30 1C+5`.",
+    context_settings={"ignore_unknown_options": True},
+    no_args_is_help=True,
+)
+async def strategy(
+    symbol: str,
+    quantity: int,
+    legs: Annotated[list[str], Argument(help="The legs of the strategy.")],
+    gtc: Annotated[
+        bool, Option("--gtc", help="Place a GTC order instead of a day order.")
+    ] = False,
+    weeklies: Annotated[
+        bool, Option("--weeklies", help="Show all expirations, not just monthlies.")
+    ] = False,
+    dte: Annotated[
+        int | None, Option("--dte", help="Days to expiration for the strategy.")
+    ] = None,
+    refresh: Annotated[
+        bool,
+        Option("--refresh", help="Fetch the option chain instead of using the cache."),
+    ] = False,
+):
+    specs: list[LegSpec] = []
+    for leg in legs:
+        spec = parse_leg(leg)
+        if spec is None or not spec.ratio:
+            print_error(f"Unable to parse leg {leg}, try something like -1Pd30!")
+            return
+        if spec.delta is not None and spec.delta > 99:
+            print_error("Delta value is too high, -99 <= delta <= 99")
+            return
+        specs.append(spec)
+    if specs[0].offset is not None:
+        print_error("The first leg needs a strike or a delta!")
         return
-
-    nl = (await acc.get_balances(sesh)).net_liquidating_value
-    bp = data.buying_power_effect.change_in_buying_power
-    percent = abs(bp) / nl * Decimal(100)
-    fees = data.fee_calculation.total_fees if data.fee_calculation else ZERO
-
-    table = Table(header_style="bold", title_style="bold", title="Order Review")
-    table.add_column("Quantity", justify="center")
-    table.add_column("Symbol", justify="center")
-    table.add_column("Strike", justify="center")
-    table.add_column("Type", justify="center")
-    table.add_column("Expiration", justify="center")
-    table.add_column("Price", justify="center")
-    table.add_column("BP", justify="center")
-    table.add_column("BP %", justify="center")
-    table.add_column("Fees", justify="center")
-    table.add_row(
-        f"{quantity:+}",
-        symbol,
-        f"${fmt(put_strike.strike_price)}",
-        "PUT",
-        f"{subchain.expiration_date}",
-        conditional_color(fmt(price), round=False),
-        conditional_color(bp),
-        f"{percent:.2f}%",
-        conditional_color(fees),
-    )
-    table.add_row(
-        f"{quantity:+}",
-        symbol,
-        f"${fmt(call_strike.strike_price)}",
-        "CALL",
-        f"{subchain.expiration_date}",
-        "-",
-        "-",
-        "-",
-        "-",
-    )
-    if width:
-        table.add_row(
-            f"{-quantity:+}",
-            symbol,
-            f"${fmt(put_spread_strike.strike_price)}",  # type: ignore
-            "PUT",
-            f"{subchain.expiration_date}",
-            "-",
-            "-",
-            "-",
-            "-",
-        )
-        table.add_row(
-            f"{-quantity:+}",
-            symbol,
-            f"${fmt(call_spread_strike.strike_price)}",  # type: ignore
-            "CALL",
-            f"{subchain.expiration_date}",
-            "-",
-            "-",
-            "-",
-            "-",
-        )
-    console.print(table)
-
-    if data.warnings:
-        for warning in data.warnings:
-            print_warning(warning.message)
-    warn_percent = sesh.config.getfloat(
-        "portfolio", "bp-max-percent-per-position", fallback=None
+    await enter_strategy(
+        symbol, quantity, specs, "strategy", gtc, weeklies, dte, refresh
     )
-    if warn_percent and percent > warn_percent:
-        print_warning(
-            f"Buying power usage is above per-position target of {warn_percent}%!"
-        )
-    if get_confirmation("Send order? Y/n "):
-        await acc.place_order(sesh, order, dry_run=False)
 
 
 @option.command(help="Fetch and display an options chain.", no_args_is_help=True)
@@ -922,9 +857,21 @@ async def chain(
     dte: Annotated[
         int | None, Option("--dte", help="Days to expiration for the chain.")
     ] = None,
+    refresh: Annotated[
+        bool,
+        Option("--refresh", help="Fetch the option chain instead of using the cache."),
+    ] = False,
+    watch: Annotated[
+        bool,
+        Option("--watch", help="Keep the chain open and update it as prices change."),
+    ] = False,
+    format: FormatOption = OutputFormat.TABLE,
 ):
     sesh = await RenewableSession()
     symbol = symbol.upper()
+    if watch and format != OutputFormat.TABLE:
+        print_error("--watch only works with table output!")
+        return
 
     if dte is None:
         dte = sesh.config.getint("option", "default-dte", fallback=None)
@@ -932,110 +879,33 @@ async def chain(
         strikes = sesh.config.getint("option", "strike-count", fallback=16)
     is_future = symbol[0] == "/"
     if is_future:  # futures options
-        chain = await NestedFutureOptionChain.get(sesh, symbol)
+        chain = await get_future_option_chain(sesh, symbol, refresh)
         subchain = choose_futures_expiration(chain, dte, weeklies)
         ticks = subchain.tick_sizes
     else:
-        chain = (await NestedOptionChain.get(sesh, symbol))[0]
+        chain = await get_option_chain(sesh, symbol, refresh)
         subchain = choose_expiration(chain, dte, weeklies)
         ticks = chain.tick_sizes
     fmt = lambda x: round_to_tick_size(x, ticks)
 
-    console = Console()
-    table = Table(
-        show_header=True,
-        header_style="bold",
-        title_style="bold",
-        title=f"Options chain for {symbol} expiring {subchain.expiration_date}",
-    )
-
     show_delta = sesh.config.getboolean("option.chain", "show-delta", fallback=True)
     show_theta = sesh.config.getboolean("option.chain", "show-theta", fallback=False)
     show_oi = sesh.config.getboolean(
         "option.chain", "show-open-interest", fallback=False
     )
     show_volume = sesh.config.getboolean("option.chain", "show-volume", fallback=False)
-    if show_volume:
-        table.add_column("Volume", justify="right")
-    if show_oi:
-        table.add_column("Open Int", justify="right")
-    if show_theta:
-        table.add_column("Call \u03b8", justify="center")
-    if show_delta:
-        table.add_column("Call \u0394", justify="center")
-    table.add_column("Bid", style="green", justify="right")
-    table.add_column("Ask", style="red", justify="right")
-    table.add_column("Strike", justify="center")
-    table.add_column("Bid", style="green", justify="right")
-    table.add_column("Ask", style="red", justify="right")
-    if show_delta:
-        table.add_column("Put \u0394", justify="center")
-    if show_theta:
-        table.add_column("Put \u03b8", justify="center")
-    if show_oi:
-        table.add_column("Open Int", justify="right")
-    if show_volume:
-        table.add_column("Volume", justify="right")
+    if format != OutputFormat.TABLE:  # records always have every column
+        show_oi = show_volume = True
 
-    if is_future:  # futures options
-        future = await Future.get(sesh, subchain.underlying_symbol)  # type: ignore
-        mark = (await get_market_data_by_type(sesh, futures=[future.symbol]))[
-            0
-        ].last or ZERO
-    else:
-        equity = await Equity.get(sesh, symbol)
-        mark = (
-            await get_market_data_by_type(
-                sesh,
-                equities=[equity.symbol]
-                if equity.instrument_type == InstrumentType.EQUITY
-                else None,
-                indices=[equity.symbol]
-                if equity.instrument_type == InstrumentType.INDEX
-                else None,
-            )
-        )[0].last or ZERO
+    mark = await get_underlying_mark(sesh, symbol, subchain, is_future)
 
-    subchain.strikes.sort(key=lambda s: s.strike_price)
-    mid_index = 0
-    if strikes < len(subchain.strikes):
-        while subchain.strikes[mid_index].strike_price < mark:
-            mid_index += 1
-        half = strikes // 2
-        all_strikes = subchain.strikes[mid_index - half : mid_index + half]
-    else:
-        all_strikes = subchain.strikes
-    mid_index = 0
-    while all_strikes[mid_index].strike_price < mark:
-        mid_index += 1
+    all_strikes = StrikeIndex(subchain.strikes).window(mark, strikes)
+    mid_index = bisect_left(all_strikes, mark, key=lambda s: s.strike_price)
     dxfeeds = [s.call_streamer_symbol for s in all_strikes] + [
         s.put_streamer_symbol for s in all_strikes
     ]
 
-    with yaspin(color="green", text="Fetching quotes..."):
-        async with DXLinkStreamer(sesh) as streamer:
-            greeks_task = asyncio.create_task(listen_events(dxfeeds, Greeks, streamer))
-            quote_task = asyncio.create_task(listen_events(dxfeeds, Quote, streamer))
-            tasks = [greeks_task, quote_task]
-            if show_oi:
-                summary_task = asyncio.create_task(
-                    listen_events(dxfeeds, Summary, streamer)
-                )
-                tasks.append(summary_task)
-            if show_volume:
-                trade_task = asyncio.create_task(
-                    listen_events(dxfeeds, Trade, streamer)
-                )
-                tasks.append(trade_task)
-            await asyncio.gather(*tasks)  # wait for all tasks
-            greeks_dict = greeks_task.result()
-            quote_dict = quote_task.result()
-            if show_oi:
-                summary_dict = summary_task.result()  # type: ignore
-            if show_volume:
-                trade_dict = trade_task.result()  # type: ignore
-
-    for i, strike in enumerate(all_strikes):
+    def render_row(strike: Strike) -> list[str]:
         put = quote_dict[strike.put_streamer_symbol]
         call = quote_dict[strike.call_streamer_symbol]
         row = [
@@ -1055,19 +925,139 @@ async def chain(
             prepend.append(f"{abs(call_greek.theta):.2f}" if call_greek else "")
             row.append(f"{abs(put_greek.theta):.2f}" if put_greek else "")
         if show_oi:
-            call_summary = summary_dict[strike.call_streamer_symbol]  # type: ignore
-            put_summary = summary_dict[strike.put_streamer_symbol]  # type: ignore
+            call_summary = summary_dict[strike.call_streamer_symbol]
+            put_summary = summary_dict[strike.put_streamer_symbol]
             prepend.append(f"{call_summary.open_interest}" if call_summary else "")
             row.append(f"{put_summary.open_interest}" if put_summary else "")
         if show_volume:
-            call_trade = trade_dict[strike.call_streamer_symbol]  # type: ignore
-            put_trade = trade_dict[strike.put_streamer_symbol]  # type: ignore
+            call_trade = trade_dict[strike.call_streamer_symbol]
+            put_trade = trade_dict[strike.put_streamer_symbol]
             prepend.append(
                 f"{volfmt(call_trade.day_volume or 0)}" if call_trade else ""
             )
             row.append(f"{volfmt(put_trade.day_volume or 0)}" if put_trade else "")
 
         prepend.reverse()
-        table.add_row(*(prepend + row), end_section=(i == mid_index - 1))
+        return prepend + row
 
-    console.print(table)
+    def strike_record(strike: Strike) -> dict[str, Any]:
+        record: dict[str, Any] = {
+            "underlying_symbol": symbol,
+            "expiration_date": subchain.expiration_date,
+            "strike_price": strike.strike_price,
+        }
+        for side, streamer_symbol in (
+            ("call", strike.call_streamer_symbol),
+            ("put", strike.put_streamer_symbol),
+        ):
+            quote = quote_dict[streamer_symbol]
+            greeks = greeks_dict[streamer_symbol]
+            summary = summary_dict[streamer_symbol]
+            trade = trade_dict[streamer_symbol]
+            record |= {
+                f"{side}_symbol": streamer_symbol,
+                f"{side}_bid": quote.bid_price if quote else None,
+                f"{side}_ask": quote.ask_price if quote else None,
+                f"{side}_iv": greeks.volatility if greeks else None,
+                f"{side}_delta": greeks.delta if greeks else None,
+                f"{side}_theta": greeks.theta if greeks else None,
+                f"{side}_open_interest": summary.open_interest if summary else None,
+                f"{side}_volume": trade.day_volume if trade else None,
+            }
+        return record
+
+    def render_table(rows: list[list[str]]) -> Table:
+        table = Table(
+            show_header=True,
+            header_style="bold",
+            title_style="bold",
+            title=f"Options chain for {symbol} expiring {subchain.expiration_date}",
+        )
+        if show_volume:
+            table.add_column("Volume", justify="right")
+        if show_oi:
+            table.add_column("Open Int", justify="right")
+        if show_theta:
+            table.add_column("Call \u03b8", justify="center")
+        if show_delta:
+            table.add_column("Call \u0394", justify="center")
+        table.add_column("Bid", style="green", justify="right")
+        table.add_column("Ask", style="red", justify="right")
+        table.add_column("Strike", justify="center")
+        table.add_column("Bid", style="green", justify="right")
+        table.add_column("Ask", style="red", justify="right")
+        if show_delta:
+            table.add_column("Put \u0394", justify="center")
+        if show_theta:
+            table.add_column("Put \u03b8", justify="center")
+        if show_oi:
+            table.add_column("Open Int", justify="right")
+        if show_volume:
+            table.add_column("Volume", justify="right")
+        for i, row in enumerate(rows):
+            table.add_row(*row, end_section=(i == mid_index - 1))
+        return table
+
+    console = Console()
+    async with sesh.streamer() as streamer:
+        with spinner(format, "Fetching quotes..."):
+            wanted: dict[type[Event], list[str]] = {Greeks: dxfeeds, Quote: dxfeeds}
+            if show_oi:
+                wanted[Summary] = dxfeeds
+            if show_volume:
+                wanted[Trade] = dxfeeds
+            snapshot = await collect_events(
+                streamer,
+                wanted,
+                sesh.config.getfloat("general", "stream-timeout", fallback=3),
+            )
+        snapshot.warn_missing()
+        greeks_dict = snapshot.get(Greeks)
+        quote_dict = snapshot.get(Quote)
+        summary_dict = snapshot.get(Summary)
+        trade_dict = snapshot.get(Trade)
+
+        if format != OutputFormat.TABLE:
+            with record_writer(format) as out:
+                for strike in all_strikes:
+                    out.write(strike_record(strike))
+            return
+        with span("build rows"):
+            rows = [render_row(strike) for strike in all_strikes]
+        if not watch:
+            with span("render", "render"):
+                console.print(render_table(rows))
+            return
+
+        # events are coalesced per symbol, and only strikes that changed since
+        # the last frame are re-rendered
+        dirty: set[str] = set()
+        row_index = {s.call_streamer_symbol: i for i, s in enumerate(all_strikes)}
+        row_index |= {s.put_streamer_symbol: i for i, s in enumerate(all_strikes)}
+        streams: list[tuple[type[Event], dict[str, Any]]] = [
+            (Greeks, greeks_dict),
+            (Quote, quote_dict),
+        ]
+        if show_oi:
+            streams.append((Summary, summary_dict))
+        if show_volume:
+            streams.append((Trade, trade_dict))
+
+        async def update(event_class: type[Event], events: dict[str, Any]) -> None:
+            async for event in streamer.listen(event_class):
+                events[event.event_symbol] = event
+                dirty.add(event.event_symbol)
+
+        fps = sesh.config.getfloat("option.chain", "refresh-rate", fallback=4)
+        with Live(render_table(rows), console=console, auto_refresh=False) as live:
+            async with create_task_group() as tg:
+                for event_class, events in streams:
+                    tg.start_soon(update, event_class, events)
+                while True:
+                    await sleep(1 / fps)
+                    if not dirty:
+                        continue
+                    for i in {row_index[s] for s in dirty if s in row_index}:
+                        rows[i] = render_row(all_strikes[i])
+                    dirty.clear()
+                    live.update(render_table(rows), refresh=True)
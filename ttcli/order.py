@@ -2,56 +2,190 @@ from collections import defaultdict
 from datetime import datetime
 from decimal import Decimal
 from math import gcd
-from typing import Annotated
+from typing import Annotated, Any, Awaitable, Callable, Iterable, Iterator, TypeVar
 
+from anyio import CapacityLimiter, create_task_group, sleep
 from rich.console import Console
+from rich.live import Live
 from rich.table import Table
+from tastytrade import AlertStreamer
+from tastytrade.dxfeed import Quote
+from tastytrade.instruments import Option as TastytradeOption
+from tastytrade.instruments import TickSize
 from tastytrade.market_data import get_market_data_by_type
-from tastytrade.order import InstrumentType, NewOrder, OrderStatus, PlacedOrder
+from tastytrade.order import (
+    InstrumentType,
+    NewOrder,
+    OrderStatus,
+    OrderType,
+    PlacedOrder,
+)
 from tastytrade.utils import TastytradeError
 from typer import Option
-from yaspin import yaspin
 
+from ttcli.history import clear_orders, iter_orders, sync_orders
+from ttcli.instruments import (
+    get_cryptos,
+    get_equities,
+    get_future_options,
+    get_futures,
+    get_options,
+)
+from ttcli.output import FormatOption, OutputFormat, record_writer, spinner
 from ttcli.utils import (
     ZERO,
     AsyncTyper,
+    RateLimited,
     RenewableSession,
     conditional_color,
     conditional_quantity,
     gather,
     get_confirmation,
     print_error,
+    round_to_tick_size,
 )
 
 order = AsyncTyper(help="List, adjust, or cancel orders.", no_args_is_help=True)
 
+WORKING_STATUSES = {OrderStatus.LIVE, OrderStatus.RECEIVED}
+# order requests allowed in flight at once for batch operations
+MAX_CONCURRENCY = 4
+# rate limited requests are retried this many times, backing off from the delay
+MAX_RETRIES = 4
+RETRY_DELAY = 0.5
+# tick size for legs whose instrument has none
+PENNY = Decimal("0.01")
 
-@order.command(help="List, adjust, or cancel live orders.")
-async def live(
-    all: Annotated[
-        bool, Option("--all", help="Show orders for all accounts, not just one.")
-    ] = False,
-):
-    sesh = await RenewableSession()
-    if all:
-        orders: list[PlacedOrder] = []
-        results = await gather(*[a.get_live_orders(sesh) for a in sesh.accounts])
-        for res in results:
-            orders.extend(res)
+T = TypeVar("T")
+
+
+def order_mark(order: PlacedOrder, marks: dict[str, Decimal]) -> Decimal | None:
+    """
+    Returns the mark of the order per unit, or None if a leg has no mark yet.
+    """
+    total_price = ZERO
+    # handle ratio spreads
+    quantity = gcd(*[int(leg.quantity or 0) for leg in order.legs])
+    for leg in order.legs:
+        if leg.quantity:
+            if leg.symbol not in marks:
+                return None
+            m = 1 if "Sell" in leg.action.value else -1
+            total_price += m * marks[leg.symbol] * leg.quantity / quantity
+    return total_price
+
+
+def repriced(order: PlacedOrder, price: Decimal) -> NewOrder:
+    """
+    Returns a copy of the order at the new price, keeping the original's sign.
+    """
+    sign = -1 if (order.price or 0) < 0 else 1
+    return NewOrder(
+        time_in_force=order.time_in_force,
+        order_type=order.order_type,
+        legs=order.legs,
+        gtc_date=order.gtc_date,
+        stop_trigger=Decimal(order.stop_trigger) if order.stop_trigger else None,
+        price=sign * abs(price),
+    )
+
+
+async def with_retry(request: Callable[[], Awaitable[T]]) -> T:
+    """
+    Runs the request, backing off and trying again while it's rate limited.
+    """
+    attempt = 0
+    while True:
+        try:
+            return await request()
+        except RateLimited:
+            if attempt == MAX_RETRIES:
+                raise
+        await sleep(RETRY_DELAY * 2**attempt)
+        attempt += 1
+
+
+async def run_batch(
+    orders: list[PlacedOrder],
+    action: Callable[[PlacedOrder], Awaitable[str]],
+) -> list[tuple[PlacedOrder, str | None, str | None]]:
+    """
+    Runs the action for each order with bounded concurrency, returning each
+    order with the action's result or the error it failed with.
+    """
+    limiter = CapacityLimiter(MAX_CONCURRENCY)
+
+    async def run(o: PlacedOrder) -> tuple[PlacedOrder, str | None, str | None]:
+        async with limiter:
+            try:
+                return o, await with_retry(lambda: action(o)), None
+            except TastytradeError as e:
+                return o, None, str(e).strip()
+
+    return list(await gather(*[run(o) for o in orders]))
+
+
+def print_batch(
+    results: list[tuple[PlacedOrder, str | None, str | None]], verb: str
+) -> None:
+    console = Console()
+    table = Table(header_style="bold", title_style="bold", title="Results")
+    table.add_column("Account")
+    table.add_column("Order ID")
+    table.add_column("Symbol")
+    table.add_column("Result")
+    for o, result, error in results:
+        table.add_row(
+            o.account_number,
+            str(o.id),
+            o.underlying_symbol,
+            f"[green]{result}[/green]" if error is None else f"[red]{error}[/red]",
+        )
+    console.print(table)
+    done = sum(error is None for _, _, error in results)
+    print(f"{verb} {done} of {len(results)} orders.")
+
+
+async def select_orders(
+    sesh: RenewableSession, all: bool, symbol: str | None, account: str | None
+) -> list[PlacedOrder] | None:
+    """
+    Returns the working orders matching the filters, or None if the account
+    doesn't exist.
+    """
+    if account:
+        accounts = [a for a in sesh.accounts if a.account_number == account]
+        if not accounts:
+            print_error(f"Account {account} doesn't exist!")
+            return None
+    elif all:
+        accounts = sesh.accounts
     else:
-        acc = sesh.get_account()
-        orders = await acc.get_live_orders(sesh)
-    orders = [
+        accounts = [sesh.get_account()]
+    results = await gather(*[a.get_live_orders(sesh) for a in accounts])
+    return [
         o
-        for o in orders
-        if o.status == OrderStatus.LIVE or o.status == OrderStatus.RECEIVED
+        for res in results
+        for o in res
+        if o.status in WORKING_STATUSES
+        and (not symbol or o.underlying_symbol == symbol.upper())
     ]
-    if not orders:
-        return
+
+
+def legs_by_type(orders: Iterable[PlacedOrder]) -> dict[InstrumentType, set[str]]:
     instrument_dict: dict[InstrumentType, set[str]] = defaultdict(set)
     for o in orders:
         for leg in o.legs:
             instrument_dict[leg.instrument_type].add(leg.symbol)
+    return instrument_dict
+
+
+async def get_marks(
+    sesh: RenewableSession, orders: list[PlacedOrder]
+) -> dict[str, Decimal]:
+    instrument_dict = legs_by_type(orders)
+    if not instrument_dict:
+        return {}
     data = await get_market_data_by_type(
         sesh,
         cryptocurrencies=list(instrument_dict[InstrumentType.CRYPTOCURRENCY]) or None,
@@ -60,8 +194,78 @@ async def live(
         future_options=list(instrument_dict[InstrumentType.FUTURE_OPTION]) or None,
         options=list(instrument_dict[InstrumentType.EQUITY_OPTION]) or None,
     )
-    marks = {d.symbol: d.mark for d in data}
-    console = Console()
+    return {d.symbol: d.mark for d in data}
+
+
+async def get_streamer_symbols(
+    sesh: RenewableSession, orders: list[PlacedOrder]
+) -> dict[str, str]:
+    """
+    Maps the streamer symbol of every leg in the orders to the leg's symbol.
+    Equities and equity options are converted locally, and anything else is
+    looked up through the instrument cache.
+    """
+    instrument_dict = legs_by_type(orders)
+    res = {s: s for s in instrument_dict[InstrumentType.EQUITY]}
+    for symbol in instrument_dict[InstrumentType.EQUITY_OPTION]:
+        res[TastytradeOption.occ_to_streamer_symbol(symbol)] = symbol
+    futures, future_options, cryptos = await gather(
+        get_futures(sesh, instrument_dict[InstrumentType.FUTURE]),
+        get_future_options(sesh, instrument_dict[InstrumentType.FUTURE_OPTION]),
+        get_cryptos(sesh, instrument_dict[InstrumentType.CRYPTOCURRENCY]),
+    )
+    for instruments in (futures, future_options, cryptos):
+        res.update({i.streamer_symbol: s for s, i in instruments.items()})  # type: ignore
+    return res
+
+
+async def get_tick_sizes(
+    sesh: RenewableSession, instrument_dict: dict[InstrumentType, set[str]]
+) -> dict[str, list[TickSize]]:
+    """
+    Maps each symbol, grouped by instrument type as from `legs_by_type`, to the
+    tick sizes its price moves in. Options use their underlying's option tick
+    sizes, and symbols that can't be found are left out.
+    """
+    options, future_options, cryptos = await gather(
+        get_options(sesh, instrument_dict[InstrumentType.EQUITY_OPTION]),
+        get_future_options(sesh, instrument_dict[InstrumentType.FUTURE_OPTION]),
+        get_cryptos(sesh, instrument_dict[InstrumentType.CRYPTOCURRENCY]),
+    )
+    equities, futures = await gather(
+        get_equities(
+            sesh,
+            instrument_dict[InstrumentType.EQUITY]
+            | {o.underlying_symbol for o in options.values()},  # type: ignore
+        ),
+        get_futures(
+            sesh,
+            instrument_dict[InstrumentType.FUTURE]
+            | {o.underlying_symbol for o in future_options.values()},  # type: ignore
+        ),
+    )
+    res: dict[str, list[TickSize]] = {}
+    for s, o in options.items():
+        res[s] = equities[o.underlying_symbol].option_tick_sizes or []  # type: ignore
+    for s, o in future_options.items():
+        res[s] = futures[o.underlying_symbol].option_tick_sizes or []  # type: ignore
+    for s, e in equities.items():
+        if s in instrument_dict[InstrumentType.EQUITY]:
+            res[s] = e.tick_sizes or []
+    for s, f in futures.items():
+        if s in instrument_dict[InstrumentType.FUTURE]:
+            res[s] = f.tick_sizes or [TickSize(value=f.tick_size)]  # type: ignore
+    for s, c in cryptos.items():
+        res[s] = [TickSize(value=c.tick_size)]  # type: ignore
+    return res
+
+
+def live_orders_table(
+    orders: list[PlacedOrder],
+    marks: dict[int, Decimal | None],
+    all: bool,
+    show_status: bool = False,
+) -> Table:
     table = Table(
         show_header=True,
         header_style="bold",
@@ -76,6 +280,8 @@ async def live(
     table.add_column("Symbol")
     table.add_column("Type")
     table.add_column("TIF")
+    if show_status:
+        table.add_column("Status")
     table.add_column("Price", justify="right")
     table.add_column("Mark", justify="right")
     # leg info
@@ -83,13 +289,7 @@ async def live(
     table.add_column("Legs")
 
     for i, order in enumerate(orders):
-        total_price = ZERO
-        # handle ratio spreads
-        quantity = gcd(*[int(leg.quantity or 0) for leg in order.legs])
-        for leg in order.legs:
-            if leg.quantity:
-                m = 1 if "Sell" in leg.action.value else -1
-                total_price += m * marks[leg.symbol] * leg.quantity / quantity
+        total_price = marks[order.id]
         row = [
             str(i + 1),
             order.updated_at.strftime("%Y-%m-%d %H:%M"),
@@ -98,32 +298,174 @@ async def live(
             order.order_type.value,
             order.time_in_force.value,
             conditional_color(order.price) if order.price else "--",
-            conditional_color(total_price),
+            conditional_color(total_price) if total_price is not None else "--",
             conditional_quantity(order.legs[0].quantity or 0, order.legs[0].action),
             order.legs[0].symbol,
         ]
+        if show_status:
+            row.insert(6, order.status.value)
         if all:
             row.insert(1, order.account_number)
         table.add_row(*row, end_section=(len(order.legs) == 1))
-        for i in range(1, len(order.legs)):
-            row = [
-                "",
-                "",
-                "",
-                "",
-                "",
-                "",
-                "",
-                "",
+        for j in range(1, len(order.legs)):
+            row = [""] * (9 if show_status else 8) + [
                 conditional_quantity(
-                    order.legs[i].quantity or ZERO, order.legs[i].action
+                    order.legs[j].quantity or ZERO, order.legs[j].action
                 ),
-                order.legs[i].symbol,
+                order.legs[j].symbol,
             ]
             if all:
                 row.insert(1, "")
-            table.add_row(*row, end_section=(i == len(order.legs) - 1))
-    console.print(table)
+            table.add_row(*row, end_section=(j == len(order.legs) - 1))
+    return table
+
+
+async def watch_orders(
+    sesh: RenewableSession,
+    orders: list[PlacedOrder],
+    marks: dict[str, Decimal],
+    all: bool,
+) -> None:
+    """
+    Keeps the live orders table open. Status changes and fills come from the
+    account streamer, and marks are recomputed only for orders with a leg
+    whose quote changed.
+    """
+    accounts = sesh.accounts if all else [sesh.get_account()]
+    numbers = {a.account_number for a in accounts}
+    by_id = {o.id: o for o in orders}
+    order_marks = {o.id: order_mark(o, marks) for o in orders}
+    # leg symbol -> ids of the orders it's part of
+    dependents: dict[str, set[int]] = defaultdict(set)
+    leg_symbols: dict[str, str] = {}
+    dirty: set[int] = set()
+    changed = False
+
+    async def subscribe_legs(new_orders: list[PlacedOrder]) -> None:
+        for o in new_orders:
+            for leg in o.legs:
+                dependents[leg.symbol].add(o.id)
+        symbols = await get_streamer_symbols(sesh, new_orders)
+        new = {k: v for k, v in symbols.items() if k not in leg_symbols}
+        leg_symbols.update(new)
+        if new:
+            await streamer.subscribe(Quote, list(new))
+
+    async def update_quotes() -> None:
+        async for quote in streamer.listen(Quote):
+            if not quote.bid_price or not quote.ask_price:
+                continue
+            symbol = leg_symbols.get(quote.event_symbol)
+            if symbol is None:
+                continue
+            marks[symbol] = (quote.bid_price + quote.ask_price) / 2
+            dirty.update(dependents[symbol])
+
+    async def update_orders() -> None:
+        nonlocal changed
+        async for placed in alerts.listen(PlacedOrder):
+            if placed.account_number not in numbers:
+                continue
+            # orders that finish stay on screen with their final status
+            if placed.id not in by_id and placed.status not in WORKING_STATUSES:
+                continue
+            is_new = placed.id not in by_id
+            by_id[placed.id] = placed
+            dirty.add(placed.id)
+            changed = True
+            if is_new:
+                await subscribe_legs([placed])
+
+    def render() -> Table:
+        return live_orders_table(list(by_id.values()), order_marks, all, True)
+
+    fps = sesh.config.getfloat("order.live", "refresh-rate", fallback=2)
+    console = Console()
+    with Live(render(), console=console, auto_refresh=False) as live:
+        async with (
+            AlertStreamer(sesh) as alerts,
+            sesh.streamer() as streamer,
+            create_task_group() as tg,
+        ):
+            await alerts.subscribe_accounts(accounts)
+            tg.start_soon(update_orders)
+            tg.start_soon(update_quotes)
+            await subscribe_legs(orders)
+            while True:
+                await sleep(1 / fps)
+                if not dirty and not changed:
+                    continue
+                for order_id in dirty:
+                    order_marks[order_id] = order_mark(by_id[order_id], marks)
+                dirty.clear()
+                changed = False
+                live.update(render(), refresh=True)
+
+
+def leg_records(order: PlacedOrder, **extra: Any) -> Iterator[dict[str, Any]]:
+    """
+    Flattens an order into one record per leg for machine-readable output.
+    """
+    for i, leg in enumerate(order.legs):
+        yield {
+            "account": order.account_number,
+            "order_id": order.id,
+            "updated_at": order.updated_at,
+            "underlying_symbol": order.underlying_symbol,
+            "order_type": order.order_type,
+            "time_in_force": order.time_in_force,
+            "status": order.status,
+            "price": order.price,
+            **extra,
+            "leg": i + 1,
+            "symbol": leg.symbol,
+            "instrument_type": leg.instrument_type,
+            "action": leg.action,
+            "quantity": leg.quantity,
+        }
+
+
+@order.command(help="List, adjust, or cancel live orders.")
+async def live(
+    all: Annotated[
+        bool, Option("--all", help="Show orders for all accounts, not just one.")
+    ] = False,
+    watch: Annotated[
+        bool,
+        Option(
+            "--watch",
+            help="Keep the orders open and update them as they fill and prices change.",
+        ),
+    ] = False,
+    format: FormatOption = OutputFormat.TABLE,
+):
+    sesh = await RenewableSession()
+    if watch and format != OutputFormat.TABLE:
+        print_error("--watch only works with table output!")
+        return
+    if all:
+        orders: list[PlacedOrder] = []
+        results = await gather(*[a.get_live_orders(sesh) for a in sesh.accounts])
+        for res in results:
+            orders.extend(res)
+    else:
+        acc = sesh.get_account()
+        orders = await acc.get_live_orders(sesh)
+    orders = [o for o in orders if o.status in WORKING_STATUSES]
+    if not orders and not watch:
+        return
+    marks = await get_marks(sesh, orders)
+    if watch:
+        return await watch_orders(sesh, orders, marks, all)
+    order_marks = {o.id: order_mark(o, marks) for o in orders}
+    if format != OutputFormat.TABLE:
+        with record_writer(format) as out:
+            for o in orders:
+                for record in leg_records(o, mark=order_marks[o.id]):
+                    out.write(record)
+        return
+    console = Console()
+    console.print(live_orders_table(orders, order_marks, all))
     if not get_confirmation("Modify an order? y/N ", default=False):
         return
     if len(orders) > 1:
@@ -143,18 +485,8 @@ async def live(
         except TastytradeError as e:
             print_error(str(e))
         return
-    sign = -1 if (order.price or 0) < 0 else 1
-    # modify the order, ensuring price keeps the same sign
-    new_order = NewOrder(
-        time_in_force=order.time_in_force,
-        order_type=order.order_type,
-        legs=order.legs,
-        gtc_date=order.gtc_date,
-        stop_trigger=Decimal(order.stop_trigger) if order.stop_trigger else None,
-        price=sign * abs(Decimal(price)),
-    )
     try:
-        await acc.replace_order(sesh, order.id, new_order)
+        await acc.replace_order(sesh, order.id, repriced(order, Decimal(price)))
     except TastytradeError as e:
         print_error(str(e))
 
@@ -180,21 +512,36 @@ async def history(
     status: Annotated[
         list[OrderStatus] | None, Option("--status", help="Filter by order status.")
     ] = None,
+    refresh: Annotated[
+        bool,
+        Option(
+            "--refresh",
+            help="Download the whole history again instead of just recent changes.",
+        ),
+    ] = False,
+    format: FormatOption = OutputFormat.TABLE,
 ):
     sesh = await RenewableSession()
     acc = sesh.get_account()
-    with yaspin(color="green", text="Fetching history..."):
-        history = await acc.get_order_history(
-            sesh,
-            start_date=start_date.date() if start_date else None,
-            end_date=end_date.date() if end_date else None,
-            underlying_symbol=symbol if symbol and symbol[0] != "/" else None,
-            futures_symbol=symbol if symbol and symbol[0] == "/" else None,
-            underlying_instrument_type=type,
-            statuses=status,
-        )
-    if asc:
-        history.reverse()
+    if refresh:
+        clear_orders(acc.account_number)
+    with spinner(format, "Fetching history..."):
+        await sync_orders(sesh, acc)
+    history = iter_orders(
+        acc.account_number,
+        start_date=start_date.date() if start_date else None,
+        end_date=end_date.date() if end_date else None,
+        symbol=symbol,
+        instrument_type=type,
+        statuses=status,
+        asc=asc,
+    )
+    if format != OutputFormat.TABLE:
+        with record_writer(format) as out:
+            for o in history:
+                for record in leg_records(o):
+                    out.write(record)
+        return
     console = Console()
     table = Table(
         show_header=True,
@@ -249,3 +596,81 @@ async def history(
                 end_section=(i == len(order.legs) - 1),
             )
     console.print(table)
+
+
+AllOption = Annotated[
+    bool, Option("--all", help="Include orders in all accounts, not just one.")
+]
+SymbolOption = Annotated[
+    str | None, Option("--symbol", "-s", help="Only include this underlying symbol.")
+]
+AccountOption = Annotated[
+    str | None, Option("--account", "-a", help="Only include this account number.")
+]
+
+
+@order.command(help="Cancel many live orders at once.")
+async def cancel(
+    all: AllOption = False,
+    symbol: SymbolOption = None,
+    account: AccountOption = None,
+):
+    sesh = await RenewableSession()
+    orders = await select_orders(sesh, all, symbol, account)
+    if not orders:
+        return
+    if not get_confirmation(f"Cancel {len(orders)} orders? y/N ", default=False):
+        return
+    accounts = {a.account_number: a for a in sesh.accounts}
+
+    async def cancel_order(o: PlacedOrder) -> str:
+        await accounts[o.account_number].delete_order(sesh, o.id)
+        return "Cancelled"
+
+    print_batch(await run_batch(orders, cancel_order), "Cancelled")
+
+
+@order.command(help="Reprice many live orders at once.")
+async def reprice(
+    to_mid: Annotated[
+        bool, Option("--to-mid", help="Move each order's price to the current mid.")
+    ] = False,
+    all: AllOption = False,
+    symbol: SymbolOption = None,
+    account: AccountOption = None,
+):
+    if not to_mid:
+        print_error("Choose how to reprice the orders, e.g. --to-mid!")
+        return
+    sesh = await RenewableSession()
+    orders = await select_orders(sesh, all, symbol, account)
+    if not orders:
+        return
+    marks, ticks = await gather(
+        get_marks(sesh, orders), get_tick_sizes(sesh, legs_by_type(orders))
+    )
+    prices: dict[int, Decimal] = {}
+    skipped: list[tuple[PlacedOrder, str | None, str | None]] = []
+    for o in orders:
+        mid = order_mark(o, marks)  # type: ignore
+        if o.order_type != OrderType.LIMIT:
+            skipped.append((o, None, "Skipped, not a limit order"))
+        elif mid is None:
+            skipped.append((o, None, "Skipped, no mark available"))
+        else:
+            # spreads are priced in the ticks of their first leg
+            tick_sizes = ticks.get(o.legs[0].symbol) or [TickSize(value=PENNY)]
+            prices[o.id] = round_to_tick_size(abs(mid), tick_sizes)  # type: ignore
+    orders = [o for o in orders if o.id in prices]
+    if not orders:
+        return print_batch(skipped, "Repriced")
+    if not get_confirmation(f"Reprice {len(orders)} orders? y/N ", default=False):
+        return
+    accounts = {a.account_number: a for a in sesh.accounts}
+
+    async def reprice_order(o: PlacedOrder) -> str:
+        price = prices[o.id]
+        await accounts[o.account_number].replace_order(sesh, o.id, repriced(o, price))
+        return f"Repriced from ${abs(o.price or ZERO):.2f} to ${price:.2f}"
+
+    print_batch(await run_batch(orders, reprice_order) + skipped, "Repriced")
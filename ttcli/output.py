@@ -0,0 +1,235 @@
+import csv
+import json
+import sys
+from abc import ABC, abstractmethod
+from contextlib import nullcontext
+from datetime import date, datetime
+from decimal import Decimal, localcontext
+from enum import Enum
+from typing import Annotated, Any, ContextManager, Self
+
+from typer import Exit, Option
+from yaspin import yaspin
+
+from ttcli.utils import print_error
+
+# rows per Arrow record batch
+ARROW_BATCH_SIZE = 1024
+# digits and decimal places kept in Arrow's fixed-point columns
+DECIMAL_PRECISION = 38
+DECIMAL_SCALE = 18
+QUANTUM = Decimal(10) ** -DECIMAL_SCALE
+
+
+class OutputFormat(str, Enum):
+    TABLE = "table"
+    JSON = "json"
+    JSONL = "jsonl"
+    CSV = "csv"
+    ARROW = "arrow"
+
+
+FormatOption = Annotated[
+    OutputFormat,
+    Option(
+        "--format",
+        help="Output format. Anything but a table is streamed to stdout as raw "
+        "records, at full precision.",
+        case_sensitive=False,
+    ),
+]
+
+
+def spinner(format: OutputFormat, text: str) -> ContextManager[Any]:
+    """
+    Shows a spinner for tables only, since yaspin always draws on stdout.
+    """
+    if format == OutputFormat.TABLE:
+        return yaspin(color="green", text=text)
+    return nullcontext()
+
+
+def _json_value(value: Any) -> str:
+    if value is None:
+        return "null"
+    if isinstance(value, Decimal):
+        # written as a bare number with all of its digits
+        return str(value) if value.is_finite() else "null"
+    if isinstance(value, (datetime, date)):
+        return f'"{value.isoformat()}"'
+    if isinstance(value, Enum):
+        return _json_value(value.value)
+    return json.dumps(value)
+
+
+def _text_value(value: Any) -> str:
+    if value is None:
+        return ""
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, Enum):
+        return str(value.value)
+    return str(value)
+
+
+class RecordWriter(ABC):
+    """
+    Streams flat records to stdout as they are produced.
+    """
+
+    def __init__(self):
+        self.stream = sys.stdout
+
+    def __enter__(self) -> Self:
+        return self
+
+    def __exit__(self, *_: Any) -> None:
+        self.close()
+
+    @abstractmethod
+    def write(self, record: dict[str, Any]) -> None: ...
+
+    def close(self) -> None:
+        self.stream.flush()
+
+    def encode(self, record: dict[str, Any]) -> str:
+        fields = ", ".join(
+            f"{json.dumps(key)}: {_json_value(value)}" for key, value in record.items()
+        )
+        return f"{{{fields}}}"
+
+
+class JsonLinesWriter(RecordWriter):
+    def write(self, record: dict[str, Any]) -> None:
+        self.stream.write(self.encode(record) + "\n")
+
+
+class JsonWriter(RecordWriter):
+    def __init__(self):
+        super().__init__()
+        self.count = 0
+
+    def write(self, record: dict[str, Any]) -> None:
+        self.stream.write(("[\n" if not self.count else ",\n") + self.encode(record))
+        self.count += 1
+
+    def close(self) -> None:
+        self.stream.write("\n]\n" if self.count else "[]\n")
+        super().close()
+
+
+class CsvWriter(RecordWriter):
+    def __init__(self):
+        super().__init__()
+        self.writer: csv.DictWriter | None = None
+
+    def write(self, record: dict[str, Any]) -> None:
+        if self.writer is None:  # the header comes from the first record
+            self.writer = csv.DictWriter(
+                self.stream, fieldnames=list(record), extrasaction="ignore"
+            )
+            self.writer.writeheader()
+        self.writer.writerow({k: _text_value(v) for k, v in record.items()})
+
+
+class ArrowWriter(RecordWriter):
+    """
+    Writes an Arrow IPC stream, one record batch per ARROW_BATCH_SIZE rows. The
+    schema is inferred from the first batch, with decimals at a fixed scale so
+    later batches always fit. Whole numbers other than identifiers are written
+    as decimals too, since a later batch may hold fractions.
+    """
+
+    def __init__(self):
+        super().__init__()
+        try:
+            import pyarrow as pa  # pyright: ignore[reportMissingImports]
+        except ImportError:
+            print_error(
+                "Please install pyarrow to use --format arrow: `pip install pyarrow`"
+            )
+            raise Exit(1)
+        self.pa = pa
+        self.stream.flush()  # anything already written goes before the binary
+        self.rows: list[dict[str, Any]] = []
+        self.schema: Any = None
+        self.writer: Any = None
+
+    def infer_schema(self) -> Any:
+        pa = self.pa
+        fields = []
+        for key in self.rows[0]:
+            kinds = {type(row[key]) for row in self.rows if row.get(key) is not None}
+            if kinds and kinds <= {bool}:
+                kind = pa.bool_()
+            elif kinds and kinds <= {int} and (key == "id" or key.endswith("_id")):
+                kind = pa.int64()
+            elif float in kinds and kinds <= {int, float}:
+                kind = pa.float64()
+            elif kinds and kinds <= {int, float, Decimal}:
+                kind = pa.decimal128(DECIMAL_PRECISION, DECIMAL_SCALE)
+            elif kinds and kinds <= {datetime}:
+                aware = any(row[key].tzinfo for row in self.rows if row.get(key))
+                kind = pa.timestamp("us", tz="UTC" if aware else None)
+            elif kinds and kinds <= {date}:
+                kind = pa.date32()
+            else:
+                kind = pa.string()
+            fields.append(pa.field(key, kind))
+        return pa.schema(fields)
+
+    def convert(self, value: Any, kind: Any) -> Any:
+        pa = self.pa
+        if value is None:
+            return None
+        if kind == pa.string():
+            return _text_value(value)
+        if pa.types.is_decimal(kind):
+            # the default context's 28 digits can't hold 18 decimal places
+            # for anything over ten billion
+            with localcontext() as ctx:
+                ctx.prec = DECIMAL_PRECISION
+                return Decimal(value).quantize(QUANTUM)
+        if kind == pa.float64():
+            return float(value)
+        return value
+
+    def flush_rows(self) -> None:
+        if not self.rows:
+            return
+        if self.schema is None:
+            self.schema = self.infer_schema()
+            self.writer = self.pa.ipc.new_stream(self.stream.buffer, self.schema)
+        columns = {
+            f.name: [self.convert(row.get(f.name), f.type) for row in self.rows]
+            for f in self.schema
+        }
+        batch = self.pa.RecordBatch.from_pydict(columns, schema=self.schema)
+        self.writer.write_batch(batch)
+        self.rows = []
+
+    def write(self, record: dict[str, Any]) -> None:
+        self.rows.append(record)
+        if len(self.rows) >= ARROW_BATCH_SIZE:
+            self.flush_rows()
+
+    def close(self) -> None:
+        self.flush_rows()
+        if self.writer is not None:
+            self.writer.close()
+        self.stream.buffer.flush()
+
+
+WRITERS: dict[OutputFormat, type[RecordWriter]] = {
+    OutputFormat.JSON: JsonWriter,
+    OutputFormat.JSONL: JsonLinesWriter,
+    OutputFormat.CSV: CsvWriter,
+    OutputFormat.ARROW: ArrowWriter,
+}
+
+
+def record_writer(format: OutputFormat) -> RecordWriter:
+    """
+    Returns a writer for any format other than a table.
+    """
+    return WRITERS[format]()
@@ -5,18 +5,35 @@ from datetime import datetime, time, timedelta
 from enum import Enum
 from typing import Annotated
 
+import numpy as np
 from pygnuplot.gnuplot import Gnuplot
-from tastytrade import DXLinkStreamer
-from tastytrade.dxfeed import Candle
-from tastytrade.instruments import Cryptocurrency, Future, FutureProduct
 from tastytrade.utils import NYSE, TZ, now_in_new_york
-from typer import Option
+from typer import Argument, Option
 from yaspin import yaspin
 
-from ttcli.utils import AsyncTyper, RenewableSession, print_error
+from ttcli.candles import (
+    INTRADAY_WIDTHS,
+    downsample,
+    fetch_many_candles,
+    local_seconds,
+    resample,
+)
+from ttcli.instruments import (
+    get_active_futures,
+    get_crypto,
+    get_equities,
+    get_future,
+    get_future_product,
+)
+from ttcli.utils import (
+    AsyncTyper,
+    RenewableSession,
+    gather,
+    print_error,
+    print_warning,
+)
 
 plot = AsyncTyper(help="Plot candle charts for any symbol.", no_args_is_help=True)
-fmt = "%Y-%m-%d %H:%M:%S"
 
 
 class CandleType(str, Enum):
@@ -50,51 +67,164 @@ def get_start_time(width: CandleType) -> datetime:
     return datetime.combine(start_day, time(9, 30), TZ)
 
 
-def gnuplot(sesh: RenewableSession, symbol: str, candles: list[str]) -> None:
+async def get_candles(
+    sesh: RenewableSession, symbols: list[str], width: CandleType
+) -> dict[str, np.ndarray]:
+    """
+    Returns candles of the given width for each streamer symbol. Every intraday
+    width is built from one stored history of minute candles, and every wider
+    one from a stored history of daily candles, so changing widths never
+    streams the same history again. Daily candles are only streamed back as far
+    as the width needs, but up to ten years of them are kept.
+    """
+    start_time = get_start_time(width)
+    timeout = sesh.config.getfloat("general", "stream-timeout", fallback=3)
+    if width.value in INTRADAY_WIDTHS:
+        history = await fetch_many_candles(
+            sesh, symbols, CandleType.MINUTE.value, start_time, timeout=timeout
+        )
+    else:
+        history = await fetch_many_candles(
+            sesh,
+            symbols,
+            CandleType.DAY.value,
+            start_time,
+            get_start_time(CandleType.YEAR),
+            timeout,
+        )
+    return {
+        symbol: resample(candles, width.value) for symbol, candles in history.items()
+    }
+
+
+def start_gnuplot(sesh: RenewableSession) -> Gnuplot | None:
+    """
+    Opens gnuplot with the terminal, font and axes shared by every chart.
+    """
     if not shutil.which("gnuplot"):
         print_error(
             "Please install gnuplot on your system to use the plot module: "
             "[link=http://www.gnuplot.info]http://www.gnuplot.info[/link]"
         )
-        return
+        return None
     gnu = Gnuplot()
-    tmp = tempfile.NamedTemporaryFile(delete=False)
-    with open(tmp.name, "w") as f:
-        f.write("\n".join(candles))
-    first = candles[0].split(",")[0]
-    last = candles[-1].split(",")[0]
-    first_dt = datetime.strptime(first, fmt)
-    last_dt = datetime.strptime(last, fmt)
-    total_time = last_dt - first_dt
-    boxwidth = int(total_time.total_seconds() / len(candles) * 0.5)
-    padding = timedelta(seconds=boxwidth)
-    first_padded = (first_dt - padding).strftime(fmt)
-    last_padded = (last_dt + padding).strftime(fmt)
     font = sesh.config.get("plot", "font", fallback="Courier New")
     font_size = sesh.config.getint("plot", "font-size", fallback=11)
     gnu.set(
         terminal=f"kittycairo transparent font '{font},{font_size}'",
         xdata="time",
-        timefmt=f'"{fmt}"',
-        xrange=f'["{first_padded}":"{last_padded}"]',
-        yrange="[*:*]",
-        datafile='separator ","',
-        palette="defined (-1 '#D32F2F', 1 '#26BE81')",
-        cbrange="[-1:1]",
-        style="fill solid noborder",
-        boxwidth=f"{boxwidth} absolute",
-        title=f'"{symbol}" textcolor rgb "white"',
         border="3 lc rgb 'white'",
         xtics="nomirror rotate by -45 textcolor rgb 'white' scale 0",
         ytics="nomirror textcolor rgb 'white' scale 0",
     )
-    gnu.unset("colorbox")
-    os.system("clear")
-    gnu.plot(
-        f"'{tmp.name}' using (strptime('{fmt}', strcol(1))):2:4:3:5:($5 < $2 ? -1 : 1) with candlesticks palette notitle"
+    return gnu
+
+
+def max_candles(sesh: RenewableSession) -> int:
+    # there's no use drawing more candles than the terminal is wide
+    count = sesh.config.getint("plot", "max-candles", fallback=0)
+    return count or shutil.get_terminal_size().columns
+
+
+def write_feed(*columns: np.ndarray) -> str:
+    """
+    Writes the columns to a temporary file of doubles, which gnuplot reads
+    straight in with no parsing, and returns its path.
+    """
+    with tempfile.NamedTemporaryFile(delete=False) as f:
+        try:
+            np.column_stack(columns).astype("<f8").tofile(f)
+        except BaseException:
+            os.unlink(f.name)
+            raise
+    return f.name
+
+
+def gnuplot(sesh: RenewableSession, symbol: str, candles: np.ndarray) -> None:
+    if not len(candles):
+        print_error(f"No candles found for {symbol}!")
+        return
+    gnu = start_gnuplot(sesh)
+    if gnu is None:
+        return
+    candles = downsample(candles, max_candles(sesh))
+    # gnuplot shows times as they are, so they're given in New York time
+    times = local_seconds(candles["time"])
+    feed = write_feed(
+        times, candles["open"], candles["high"], candles["low"], candles["close"]
     )
-    _ = input()
-    os.system("clear")
+    boxwidth = max(int((times[-1] - times[0]) / len(candles) * 0.5), 1)
+    try:
+        gnu.set(
+            xrange=f"[{times[0] - boxwidth}:{times[-1] + boxwidth}]",
+            yrange="[*:*]",
+            palette="defined (-1 '#D32F2F', 1 '#26BE81')",
+            cbrange="[-1:1]",
+            style="fill solid noborder",
+            boxwidth=f"{boxwidth} absolute",
+            title=f'"{symbol}" textcolor rgb "white"',
+        )
+        gnu.unset("colorbox")
+        os.system("clear")
+        gnu.plot(
+            f"'{feed}' binary format='%float64%float64%float64%float64%float64' "
+            "using 1:2:4:3:5:($5 < $2 ? -1 : 1) with candlesticks palette notitle"
+        )
+        _ = input()
+        os.system("clear")
+    finally:
+        os.unlink(feed)
+
+
+def gnuplot_compare(
+    sesh: RenewableSession, series: dict[str, np.ndarray], split: bool
+) -> None:
+    """
+    Plots each symbol's closes as the percent change since its first candle,
+    either overlaid on one chart or stacked in charts of their own.
+    """
+    for symbol in [s for s, candles in series.items() if not len(candles)]:
+        print_warning(f"No candles found for {symbol}, skipping.")
+        del series[symbol]
+    if not series:
+        print_error("No candles found for any symbol!")
+        return
+    gnu = start_gnuplot(sesh)
+    if gnu is None:
+        return
+    feeds = {}
+    start, end = float("inf"), float("-inf")
+    try:
+        for symbol, candles in series.items():
+            candles = downsample(candles, max_candles(sesh))
+            times = local_seconds(candles["time"])
+            start, end = min(start, times[0]), max(end, times[-1])
+            change = (candles["close"] / candles["close"][0] - 1) * 100
+            feeds[symbol] = write_feed(times, change)
+        gnu.set(
+            xrange=f"[{start}:{end}]",
+            yrange="[*:*]",
+            format="y '%g%%'",
+            key="top left textcolor rgb 'white'",
+        )
+        lines = [
+            f"'{feed}' binary format='%float64%float64' using 1:2 "
+            f"with lines lw 2 title '{symbol}'"
+            for symbol, feed in feeds.items()
+        ]
+        os.system("clear")
+        if split:
+            gnu.set(f"multiplot layout {len(lines)},1")
+            for line in lines:
+                gnu.plot(line)
+            gnu.unset("multiplot")
+        else:
+            gnu.plot(*lines)
+        _ = input()
+        os.system("clear")
+    finally:
+        for feed in feeds.values():
+            os.unlink(feed)
 
 
 @plot.command(help="Plot candle chart for the given symbol.", no_args_is_help=True)
@@ -105,24 +235,9 @@ async def stock(
     ] = CandleType.HALF_HOUR,
 ):
     sesh = await RenewableSession()
-    candles: list[str] = []
-    start_time = get_start_time(width)
-    ts = round(start_time.timestamp() * 1000)
     with yaspin(color="green", text="Fetching candles..."):
-        async with DXLinkStreamer(sesh) as streamer:
-            await streamer.subscribe_candle([symbol], width.value, start_time)
-            async for candle in streamer.listen(Candle):
-                if candle.close:
-                    date_str = datetime.strftime(
-                        datetime.fromtimestamp(candle.time / 1000, TZ), fmt
-                    )
-                    candles.append(
-                        f"{date_str},{candle.open},{candle.high},{candle.low},{candle.close}",
-                    )
-                if candle.time == ts:
-                    break
-    candles.sort()
-    gnuplot(sesh, symbol, candles)
+        candles = await get_candles(sesh, [symbol], width)
+    gnuplot(sesh, symbol, candles[symbol])
 
 
 @plot.command(help="Plot candle chart for the given symbol.", no_args_is_help=True)
@@ -138,29 +253,12 @@ async def crypto(
         symbol += "/USD"
     elif "/" not in symbol:
         symbol = symbol.split("USD")[0] + "/USD"
-    crypto = await Cryptocurrency.get(sesh, symbol)
-    candles: list[str] = []
-    start_time = get_start_time(width)
-    ts = round(start_time.timestamp() * 1000)
+    crypto = await get_crypto(sesh, symbol)
     if not crypto.streamer_symbol:
         raise Exception("Missing streamer symbol for instrument!")
     with yaspin(color="green", text="Fetching candles..."):
-        async with DXLinkStreamer(sesh) as streamer:
-            await streamer.subscribe_candle(
-                [crypto.streamer_symbol], width.value, start_time
-            )
-            async for candle in streamer.listen(Candle):
-                if candle.close:
-                    date_str = datetime.strftime(
-                        datetime.fromtimestamp(candle.time / 1000, TZ), fmt
-                    )
-                    candles.append(
-                        f"{date_str},{candle.open},{candle.high},{candle.low},{candle.close}",
-                    )
-                if candle.time == ts:
-                    break
-    candles.sort()
-    gnuplot(sesh, crypto.symbol, candles)
+        candles = await get_candles(sesh, [crypto.streamer_symbol], width)
+    gnuplot(sesh, crypto.symbol, candles[crypto.streamer_symbol])
 
 
 @plot.command(help="Plot candle chart for the given symbol.", no_args_is_help=True)
@@ -175,30 +273,74 @@ async def future(
     if symbol[0] != "/":
         symbol = "/" + symbol
     if not any(c.isdigit() for c in symbol):
-        product = await FutureProduct.get(sesh, symbol)
+        product = await get_future_product(sesh, symbol)
         _fmt = ",".join([f" {m.name} ({m.value})" for m in product.active_months])
         print_error(
             f"Please enter the full futures symbol!\nCurrent active months:{_fmt}"
         )
         return
-    future = await Future.get(sesh, symbol)
-    candles: list[str] = []
-    start_time = get_start_time(width)
-    ts = round(start_time.timestamp() * 1000)
+    future = await get_future(sesh, symbol)
+    with yaspin(color="green", text="Fetching candles..."):
+        candles = await get_candles(sesh, [future.streamer_symbol], width)
+    gnuplot(sesh, future.symbol, candles[future.streamer_symbol])
+
+
+async def get_streamer_symbol(
+    sesh: RenewableSession, symbol: str
+) -> tuple[str, str] | None:
+    """
+    Returns the display and streamer symbols for a stock, a cryptocurrency like
+    BTC/USD, or a future. A future's root, like /ES, means its active month.
+    """
+    symbol = symbol.upper()
+    if symbol[0] == "/":
+        if any(c.isdigit() for c in symbol):
+            future = await get_future(sesh, symbol)
+        else:
+            active = await get_active_futures(sesh, [symbol])
+            if symbol not in active:
+                print_error(f"No active contract found for {symbol}!")
+                return None
+            future = active[symbol]
+        return future.symbol, future.streamer_symbol
+    if "/" in symbol:
+        crypto = await get_crypto(sesh, symbol)
+        if not crypto.streamer_symbol:
+            print_error(f"Missing streamer symbol for {symbol}!")
+            return None
+        return crypto.symbol, crypto.streamer_symbol
+    equities = await get_equities(sesh, [symbol])
+    if symbol not in equities:
+        print_error(f"Unknown symbol {symbol}!")
+        return None
+    return symbol, equities[symbol].streamer_symbol
+
+
+@plot.command(
+    help="Compare the performance of several symbols on one chart.",
+    no_args_is_help=True,
+)
+async def compare(
+    symbols: Annotated[
+        list[str],
+        Argument(help="Stocks, cryptocurrencies like BTC/USD, or futures like /ES."),
+    ],
+    width: Annotated[
+        CandleType, Option("--width", "-w", help="Interval of time for each candle.")
+    ] = CandleType.HALF_HOUR,
+    split: Annotated[
+        bool,
+        Option("--split", help="Give each symbol a chart of its own, stacked."),
+    ] = False,
+):
+    sesh = await RenewableSession()
+    # look the stocks up together, so each symbol finds its own in the store
+    await get_equities(sesh, [s.upper() for s in symbols if "/" not in s])
+    resolved = await gather(*[get_streamer_symbol(sesh, s) for s in symbols])
+    if None in resolved:
+        return
+    names = {streamer: name for name, streamer in filter(None, resolved)}
     with yaspin(color="green", text="Fetching candles..."):
-        async with DXLinkStreamer(sesh) as streamer:
-            await streamer.subscribe_candle(
-                [future.streamer_symbol], width.value, start_time
-            )
-            async for candle in streamer.listen(Candle):
-                if candle.close:
-                    date_str = datetime.strftime(
-                        datetime.fromtimestamp(candle.time / 1000, TZ), fmt
-                    )
-                    candles.append(
-                        f"{date_str},{candle.open},{candle.high},{candle.low},{candle.close}",
-                    )
-                if candle.time == ts:
-                    break
-    candles.sort()
-    gnuplot(sesh, future.symbol, candles)
+        # every symbol streams over the same connection
+        candles = await get_candles(sesh, list(names), width)
+    gnuplot_compare(sesh, {names[s]: c for s, c in candles.items()}, split)
@@ -1,20 +1,16 @@
 from collections import defaultdict
 from datetime import date, datetime
 from decimal import Decimal
-from typing import Annotated
+from typing import Annotated, Any
 
+from anyio import create_task_group, sleep
 from rich.console import Console
+from rich.live import Live
 from rich.table import Table
-from tastytrade import DXLinkStreamer
-from tastytrade.account import CurrentPosition, EmptyDict
-from tastytrade.dxfeed import Greeks
-from tastytrade.instruments import (
-    Cryptocurrency,
-    Equity,
-    Future,
-    FutureOption,
-    TickSize,
-)
+from rich.text import Text
+from tastytrade.account import CurrentPosition, EmptyDict, Transaction
+from tastytrade.dxfeed import Greeks, Quote
+from tastytrade.instruments import Cryptocurrency, Future, TickSize
 from tastytrade.instruments import Option as TastytradeOption
 from tastytrade.market_data import get_market_data_by_type
 from tastytrade.metrics import MarketMetricInfo, get_market_metrics
@@ -28,21 +24,46 @@ from tastytrade.order import (
 )
 from tastytrade.utils import TastytradeError, today_in_new_york
 from typer import Option
-from yaspin import yaspin
 
+from ttcli.history import (
+    PAGE_SIZE,
+    clear_transactions,
+    iter_transactions,
+    sync_transactions,
+)
+from ttcli.instruments import (
+    get_cryptos,
+    get_equities,
+    get_future_options,
+    get_futures,
+    get_options,
+)
+from ttcli.output import (
+    FormatOption,
+    OutputFormat,
+    record_writer,
+    spinner,
+)
+from ttcli.trace import span
 from ttcli.utils import (
     ZERO,
     AsyncTyper,
     RenewableSession,
+    cancel_on_interrupt,
+    collect_events,
     conditional_color,
     gather,
     get_confirmation,
-    listen_events,
     print_error,
     print_warning,
     round_to_tick_size,
 )
 
+# table cells, totals, instrument and raw record for a single position
+PositionRow = tuple[
+    list[str], dict[str, Decimal], TradeableTastytradeData, dict[str, Any]
+]
+
 portfolio = AsyncTyper(
     help="View positions and stats for your portfolio.", no_args_is_help=True
 )
@@ -66,14 +87,19 @@ def get_indicators(today: date, metrics: MarketMetricInfo) -> str:
 @portfolio.command(help="View/close your current positions.")
 async def positions(
     all: Annotated[bool, Option(help="Show positions for all accounts.")] = False,
+    watch: Annotated[
+        bool,
+        Option("--watch", help="Keep the table open and update it as prices change."),
+    ] = False,
+    format: FormatOption = OutputFormat.TABLE,
 ):
+    if watch and format != OutputFormat.TABLE:
+        print_error("--watch only works with table output!")
+        return
     sesh = await RenewableSession()
     console = Console()
-    table = Table(header_style="bold", title_style="bold", title="Positions")
-    table.add_column("#", justify="left")
     today = today_in_new_york()
     if all:
-        table.add_column("Account", justify="left")
         positions: list[CurrentPosition] = []
         account_dict = {a.account_number: a.nickname for a in sesh.accounts}
         results = await gather(
@@ -89,27 +115,27 @@ async def positions(
     options_symbols = [
         p.symbol for p in positions if p.instrument_type == InstrumentType.EQUITY_OPTION
     ]
-    options = await gather(*[TastytradeOption.get(sesh, s) for s in options_symbols])
-    options_dict = {o.symbol: o for o in options}
     future_options_symbols = [
         p.symbol for p in positions if p.instrument_type == InstrumentType.FUTURE_OPTION
     ]
-    future_options = await gather(
-        *[FutureOption.get(sesh, s) for s in future_options_symbols]
+    options_dict, future_options_dict = await gather(
+        get_options(sesh, options_symbols),
+        get_future_options(sesh, future_options_symbols),
     )
-    future_options_dict = {fo.symbol: fo for fo in future_options}
+    options = list(options_dict.values())
+    future_options = list(future_options_dict.values())
     futures_symbols = [
         p.symbol for p in positions if p.instrument_type == InstrumentType.FUTURE
     ] + [fo.underlying_symbol for fo in future_options]
-    futures = await Future.get(sesh, futures_symbols) if futures_symbols else []
-    futures_dict = {f.symbol: f for f in futures}
+    futures_dict = await get_futures(sesh, futures_symbols)
+    futures = list(futures_dict.values())
     crypto_symbols = [
         p.symbol
         for p in positions
         if p.instrument_type == InstrumentType.CRYPTOCURRENCY
     ]
-    cryptos = await Cryptocurrency.get(sesh, crypto_symbols) if crypto_symbols else []
-    crypto_dict = {c.symbol: c for c in cryptos}
+    crypto_dict = await get_cryptos(sesh, crypto_symbols)
+    cryptos = list(crypto_dict.values())
     greeks_symbols = [o.streamer_symbol for o in options] + [
         fo.streamer_symbol for fo in future_options
     ]
@@ -118,8 +144,7 @@ async def positions(
         + [o.underlying_symbol for o in options]
         + ["SPY"]
     )
-    equities = await Equity.get(sesh, equity_symbols)
-    equity_dict = {e.symbol: e for e in equities}
+    equity_dict = await get_equities(sesh, equity_symbols)
     all_symbols = (
         list(
             set(
@@ -133,9 +158,15 @@ async def positions(
     )
     all_symbols = [s for s in all_symbols if s]
     if greeks_symbols:
-        with yaspin(color="green", text="Fetching greeks..."):
-            async with DXLinkStreamer(sesh) as streamer:
-                greeks_dict = await listen_events(greeks_symbols, Greeks, streamer)
+        with spinner(format, "Fetching greeks..."):
+            async with sesh.streamer() as streamer:
+                snapshot = await collect_events(
+                    streamer,
+                    {Greeks: greeks_symbols},
+                    sesh.config.getfloat("general", "stream-timeout", fallback=3),
+                )
+        snapshot.warn_missing()
+        greeks_dict = snapshot.get(Greeks)
     else:
         greeks_dict: dict[str, Greeks | None] = {}
     data = await get_market_data_by_type(
@@ -148,7 +179,7 @@ async def positions(
     )
     data_dict = {d.symbol: d for d in data}
     prev_close = lambda s: data_dict[s].prev_close or ZERO
-    spy = data_dict["SPY"].last or ZERO
+    last = {d.symbol: d.last or ZERO for d in data}
     tt_symbols = set(pos.symbol for pos in positions)
     tt_symbols.update(set(o.underlying_symbol for o in options))
     tt_symbols.update(set(o.underlying_symbol for o in future_options))
@@ -173,27 +204,8 @@ async def positions(
     table_show_gamma = sesh.config.getboolean(
         "portfolio.positions", "show-gamma", fallback=False
     )
-    table.add_column("Symbol", justify="left")
-    table.add_column("Qty", justify="right")
-    table.add_column("Day P/L", justify="right")
-    table.add_column("Total P/L", justify="right")
-    if table_show_mark:
-        table.add_column("Mark Price", justify="right")
-    if table_show_trade:
-        table.add_column("Trade Price", justify="right")
-    table.add_column("IV Rank", justify="right")
-    if table_show_delta:
-        table.add_column("Delta", justify="right")
-    if table_show_theta:
-        table.add_column("Theta", justify="right")
-    if table_show_gamma:
-        table.add_column("Gamma", justify="right")
-    table.add_column("\u03b2 Delta", justify="right")
-    table.add_column("Net Liq", justify="right")
-    table.add_column("Indicators", justify="center")
-    sums = defaultdict(lambda: ZERO)
-    closing: list[TradeableTastytradeData] = []
-    for i, pos in enumerate(positions):
+
+    def position_row(i: int, pos: CurrentPosition) -> PositionRow | None:
         row = [f"{i + 1}"]
         mark = pos.mark or ZERO
         mark_price = pos.mark_price or ZERO
@@ -201,11 +213,11 @@ async def positions(
         if all:
             row.append(account_dict[pos.account_number])  # type: ignore
         net_liq = Decimal(mark * m)
-        pnl_day = 0
+        pnl_day = ZERO
         # instrument-specific calculations
         if pos.instrument_type == InstrumentType.EQUITY_OPTION:
             o = options_dict[pos.symbol]
-            closing.append(o)
+            instrument = o
             # BWD = beta * stock price * delta / index price
             greek = greeks_dict[o.streamer_symbol]
             delta = greek.delta * 100 * m if greek else None
@@ -213,10 +225,10 @@ async def positions(
             gamma = greek.gamma * 100 * m if greek else None
             metrics = metrics_dict[o.underlying_symbol]
             ticks = equity_dict[o.underlying_symbol].option_tick_sizes or []
-            beta = metrics.beta or 0
-            underlying_price = data_dict[o.underlying_symbol].last or ZERO
-            bwd = beta * underlying_price * delta / spy if delta else None
-            ivr = (metrics.tos_implied_volatility_index_rank or 0) * 100
+            beta = metrics.beta or ZERO
+            underlying_price = last[o.underlying_symbol]
+            beta_dollars = beta * underlying_price * delta if delta else None
+            ivr = (metrics.tos_implied_volatility_index_rank or ZERO) * 100
             indicators = get_indicators(today, metrics)
             trade_price = pos.average_open_price
             pnl = (mark_price - trade_price) * m * pos.multiplier * pos.quantity
@@ -224,7 +236,7 @@ async def positions(
             pnl_day = day_change * pos.quantity * pos.multiplier * m
         elif pos.instrument_type == InstrumentType.FUTURE_OPTION:
             o = future_options_dict[pos.symbol]
-            closing.append(o)
+            instrument = o
             greek = greeks_dict[o.streamer_symbol]
             delta = greek.delta * 100 * m if greek else None
             theta = greek.theta * 100 * m if greek else None
@@ -234,55 +246,55 @@ async def positions(
             ticks = f.option_tick_sizes or []
             metrics = metrics_dict[o.root_symbol]
             indicators = get_indicators(today, metrics)
-            bwd = (
-                (prev_close(f.symbol) * metrics.beta * delta / spy)
+            beta_dollars = (
+                prev_close(f.symbol) * metrics.beta * delta
                 if metrics.beta and delta
                 else None
             )
-            ivr = (metrics.tos_implied_volatility_index_rank or 0) * 100
+            ivr = (metrics.tos_implied_volatility_index_rank or ZERO) * 100
             trade_price = pos.average_open_price
             pnl = (mark_price - trade_price) * m * pos.multiplier * pos.quantity
             day_change = mark_price - prev_close(o.symbol)
             pnl_day = day_change * pos.quantity * pos.multiplier * m
         elif pos.instrument_type == InstrumentType.EQUITY:
-            theta = 0
-            gamma = 0
+            theta = ZERO
+            gamma = ZERO
             delta = pos.quantity * m
             # BWD = beta * stock price * delta / index price
             metrics = metrics_dict[pos.symbol]
             e = equity_dict[pos.symbol]
             ticks = e.tick_sizes or []
-            closing.append(e)
-            beta = metrics.beta or 0
+            instrument = e
+            beta = metrics.beta or ZERO
             indicators = get_indicators(today, metrics)
-            bwd = beta * mark_price * delta / spy
-            ivr = (metrics.tos_implied_volatility_index_rank or 0) * 100
+            beta_dollars = beta * mark_price * delta
+            ivr = (metrics.tos_implied_volatility_index_rank or ZERO) * 100
             pnl = (mark_price - pos.average_open_price) * pos.quantity * m
             trade_price = pos.average_open_price
             day_change = mark_price - prev_close(pos.symbol)
             pnl_day = day_change * pos.quantity * m
         elif pos.instrument_type == InstrumentType.FUTURE:
-            theta = 0
-            gamma = 0
+            theta = ZERO
+            gamma = ZERO
             delta = pos.quantity * m * 100
             f = futures_dict[pos.symbol]
             ticks = f.tick_sizes or []
-            closing.append(f)
+            instrument = f
             # BWD = beta * stock price * delta / index price
             metrics = metrics_dict[f.future_product.root_symbol]  # type: ignore
             indicators = get_indicators(today, metrics)
-            bwd = (metrics.beta * mark_price * delta / spy) if metrics.beta else None
-            ivr = (metrics.tw_implied_volatility_index_rank or 0) * 100
+            beta_dollars = metrics.beta * mark_price * delta if metrics.beta else None
+            ivr = (metrics.tw_implied_volatility_index_rank or ZERO) * 100
             trade_price = pos.average_open_price
             pnl = (mark_price - trade_price) * pos.quantity * m * f.notional_multiplier
             day_change = mark_price - prev_close(f.symbol)
             pnl_day = day_change * pos.quantity * f.notional_multiplier * m
             net_liq = pnl_day
         elif pos.instrument_type == InstrumentType.CRYPTOCURRENCY:
-            theta = 0
-            gamma = 0
-            delta = 0
-            bwd = 0
+            theta = ZERO
+            gamma = ZERO
+            delta = ZERO
+            beta_dollars = ZERO
             ivr = None
             pnl = (mark_price - pos.average_open_price) * pos.quantity * m
             trade_price = pos.average_open_price
@@ -290,20 +302,15 @@ async def positions(
             pos.quantity = round(pos.quantity, 2)
             c = crypto_dict[pos.symbol]
             ticks = [TickSize(value=c.tick_size)]
-            closing.append(c)
+            instrument = c
             day_change = mark_price - prev_close(c.symbol)
             pnl_day = day_change * pos.quantity * pos.multiplier * m
         else:
-            print_warning(
-                f"Skipping {pos.symbol}, unknown instrument type {pos.instrument_type}!"
-            )
-            continue
+            return None
         if pos.created_at.date() == today:
             pnl_day = pnl
-        sums["pnl"] += pnl
-        sums["pnl_day"] += pnl_day
-        sums["bwd"] += bwd or 0
-        sums["net_liq"] += net_liq
+        # the index price is applied last, so SPY moving only rescales this
+        bwd = beta_dollars / last["SPY"] if beta_dollars is not None else None
         row.extend(
             [
                 pos.symbol,
@@ -330,34 +337,175 @@ async def positions(
                 indicators,
             ]
         )
-        table.add_row(*row, end_section=(i == len(positions) - 1))
-    # summary
-    final_row = [""]
-    if all:
-        final_row.append("")
-    final_row.extend(
-        ["", "", conditional_color(sums["pnl_day"]), conditional_color(sums["pnl"])]
-    )
-    if table_show_mark:
-        final_row.append("")
-    if table_show_trade:
-        final_row.append("")
-    final_row.append("")
-    if table_show_delta:
-        final_row.append("")
-    if table_show_theta:
-        final_row.append("")
-    if table_show_gamma:
+        values = {
+            "pnl": pnl,
+            "pnl_day": pnl_day,
+            "beta_dollars": beta_dollars or ZERO,
+            "net_liq": net_liq,
+        }
+        record = {
+            "account": pos.account_number,
+            "symbol": pos.symbol,
+            "underlying_symbol": pos.underlying_symbol,
+            "instrument_type": pos.instrument_type,
+            "quantity": pos.quantity * m,
+            "mark_price": mark_price,
+            "trade_price": trade_price,
+            "day_pnl": pnl_day,
+            "total_pnl": pnl,
+            "iv_rank": ivr,
+            "delta": delta,
+            "theta": theta,
+            "gamma": gamma,
+            "beta_delta": bwd,
+            "net_liq": net_liq,
+            "indicators": Text.from_markup(indicators).plain,
+        }
+        return row, values, instrument, record
+
+    def render_table() -> Table:
+        table = Table(header_style="bold", title_style="bold", title="Positions")
+        table.add_column("#", justify="left")
+        if all:
+            table.add_column("Account", justify="left")
+        table.add_column("Symbol", justify="left")
+        table.add_column("Qty", justify="right")
+        table.add_column("Day P/L", justify="right")
+        table.add_column("Total P/L", justify="right")
+        if table_show_mark:
+            table.add_column("Mark Price", justify="right")
+        if table_show_trade:
+            table.add_column("Trade Price", justify="right")
+        table.add_column("IV Rank", justify="right")
+        if table_show_delta:
+            table.add_column("Delta", justify="right")
+        if table_show_theta:
+            table.add_column("Theta", justify="right")
+        if table_show_gamma:
+            table.add_column("Gamma", justify="right")
+        table.add_column("\u03b2 Delta", justify="right")
+        table.add_column("Net Liq", justify="right")
+        table.add_column("Indicators", justify="center")
+        for i, (row, values, *_) in rows.items():
+            if row[-3]:  # beta weighted delta, at the current SPY price
+                row = [
+                    *row[:-3],
+                    f"{values['beta_dollars'] / last['SPY']:.2f}",
+                    *row[-2:],
+                ]
+            table.add_row(*row, end_section=(i == len(positions) - 1))
+        # summary
+        final_row = [""]
+        if all:
+            final_row.append("")
+        final_row.extend(
+            ["", "", conditional_color(sums["pnl_day"]), conditional_color(sums["pnl"])]
+        )
+        if table_show_mark:
+            final_row.append("")
+        if table_show_trade:
+            final_row.append("")
         final_row.append("")
-    final_row.extend([f"{sums['bwd']:.2f}", conditional_color(sums["net_liq"]), ""])
-    table.add_row(*final_row)
-    console.print(table)
+        if table_show_delta:
+            final_row.append("")
+        if table_show_theta:
+            final_row.append("")
+        if table_show_gamma:
+            final_row.append("")
+        bwd = sums["beta_dollars"] / last["SPY"]
+        final_row.extend([f"{bwd:.2f}", conditional_color(sums["net_liq"]), ""])
+        table.add_row(*final_row)
+        return table
+
+    rows: dict[int, PositionRow] = {}
+    sums = defaultdict(lambda: ZERO)
+    closing: list[TradeableTastytradeData] = []
+    with span("build rows"):
+        for i, pos in enumerate(positions):
+            result = position_row(i, pos)
+            if result is None:
+                print_warning(
+                    f"Skipping {pos.symbol}, unknown instrument type {pos.instrument_type}!"
+                )
+                continue
+            rows[i] = result
+            closing.append(result[2])
+            for key, value in result[1].items():
+                sums[key] += value
+    if format != OutputFormat.TABLE:
+        with record_writer(format) as out:
+            for result in rows.values():
+                out.write(result[3])
+        return
+    if watch:
+        # rows are recomputed only when one of their inputs changes, and the
+        # totals are adjusted by the difference rather than summed again
+        dirty: set[int] = set()
+        held: dict[str, list[int]] = defaultdict(list)
+        underlyings: dict[str, str] = {}
+        dependents: dict[str, set[int]] = defaultdict(set)
+        for i, (_, _, instrument, _) in rows.items():
+            held[instrument.streamer_symbol].append(i)  # type: ignore
+            dependents[instrument.streamer_symbol].add(i)  # type: ignore
+            if isinstance(instrument, TastytradeOption):
+                underlying = equity_dict[instrument.underlying_symbol]
+                underlyings[underlying.streamer_symbol] = underlying.symbol  # type: ignore
+                dependents[underlying.streamer_symbol].add(i)  # type: ignore
+        # beta weighted deltas are rescaled to SPY's price at render time
+        underlyings["SPY"] = "SPY"
+        spy_changed = False
+
+        async def update_quotes() -> None:
+            nonlocal spy_changed
+            async for quote in streamer.listen(Quote):
+                if not quote.bid_price or not quote.ask_price:
+                    continue
+                mid = (quote.bid_price + quote.ask_price) / 2
+                for i in held.get(quote.event_symbol, []):
+                    pos = positions[i]
+                    pos.mark_price = mid
+                    pos.mark = mid * pos.quantity * pos.multiplier
+                if quote.event_symbol in underlyings:
+                    last[underlyings[quote.event_symbol]] = mid
+                    spy_changed |= quote.event_symbol == "SPY"
+                dirty.update(dependents.get(quote.event_symbol, ()))
+
+        async def update_greeks() -> None:
+            async for greeks in streamer.listen(Greeks):
+                greeks_dict[greeks.event_symbol] = greeks
+                dirty.update(dependents.get(greeks.event_symbol, ()))
+
+        fps = sesh.config.getfloat("portfolio.positions", "refresh-rate", fallback=2)
+        with Live(render_table(), console=console, auto_refresh=False) as live:
+            async with sesh.streamer() as streamer, create_task_group() as tg:
+                # Ctrl-C stops watching and carries on to the summary below
+                tg.start_soon(cancel_on_interrupt, tg.cancel_scope)
+                await streamer.subscribe(Quote, list({*dependents, "SPY"}))
+                tg.start_soon(update_quotes)
+                if greeks_symbols:
+                    await streamer.subscribe(Greeks, greeks_symbols)
+                    tg.start_soon(update_greeks)
+                while True:
+                    await sleep(1 / fps)
+                    if not dirty and not spy_changed:
+                        continue
+                    for i in dirty:
+                        result = position_row(i, positions[i])
+                        for key, value in result[1].items():  # type: ignore
+                            sums[key] += value - rows[i][1][key]
+                        rows[i] = result  # type: ignore
+                    dirty.clear()
+                    spy_changed = False
+                    live.update(render_table(), refresh=True)
+    else:
+        with span("render", "render"):
+            console.print(render_table())
     if not all:
         delta_target = sesh.config.getint(
             "portfolio", "delta-target", fallback=0
         )  # delta neutral
         delta_variation = sesh.config.getint("portfolio", "delta-variation", fallback=5)
-        delta_diff = delta_target - sums["bwd"]
+        delta_diff = delta_target - sums["beta_dollars"] / last["SPY"]
         if abs(delta_diff) > delta_variation:
             print_warning(
                 f"Portfolio beta weight misses target of {delta_target} substantially!"
@@ -450,6 +598,15 @@ async def positions(
         await account.place_order(sesh, order, dry_run=False)
 
 
+def transaction_fees(txn: Transaction) -> Decimal:
+    return (
+        (txn.commission or ZERO)
+        + (txn.clearing_fees or ZERO)
+        + (txn.regulatory_fees or ZERO)
+        + (txn.proprietary_index_option_fees or ZERO)
+    )
+
+
 @portfolio.command(help="View your previous positions.")
 async def history(
     start_date: Annotated[
@@ -468,42 +625,83 @@ async def history(
     asc: Annotated[
         bool, Option(help="Sort by ascending time instead of descending.")
     ] = False,
+    refresh: Annotated[
+        bool,
+        Option(
+            "--refresh",
+            help="Download the whole history again instead of just new transactions.",
+        ),
+    ] = False,
+    format: FormatOption = OutputFormat.TABLE,
 ):
     sesh = await RenewableSession()
     acc = sesh.get_account()
-    with yaspin(color="green", text="Fetching history..."):
-        history = await acc.get_history(
-            sesh,
-            sort="Asc" if asc else "Desc",
-            start_date=start_date.date() if start_date else None,
-            end_date=end_date.date() if end_date else None,
-            underlying_symbol=symbol if symbol and symbol[0] != "/" else None,
-            futures_symbol=symbol if symbol and symbol[0] == "/" else None,
-            instrument_type=type,
-        )
-    console = Console()
-    table = Table(
-        show_header=True,
-        header_style="bold",
-        title_style="bold",
-        title=f"Transaction list for account {acc.nickname} ({acc.account_number})",
+    if refresh:
+        clear_transactions(acc.account_number)
+    with spinner(format, "Fetching history..."):
+        await sync_transactions(sesh, acc)
+    history = iter_transactions(
+        acc.account_number,
+        start_date=start_date.date() if start_date else None,
+        end_date=end_date.date() if end_date else None,
+        symbol=symbol,
+        instrument_type=type,
+        asc=asc,
     )
-    table.add_column("Date/Time")
-    table.add_column("Root Symbol")
-    table.add_column("Txn Type")
-    table.add_column("Description")
-    table.add_column("Gross P/L", justify="right")
-    table.add_column("Fees", style="red", justify="right")
-    table.add_column("Net P/L", justify="right")
-    last_id = history[-1].id
+    if format != OutputFormat.TABLE:
+        with record_writer(format) as out:
+            for txn in history:
+                out.write(
+                    {
+                        "id": txn.id,
+                        "executed_at": txn.executed_at,
+                        "underlying_symbol": txn.underlying_symbol,
+                        "symbol": txn.symbol,
+                        "instrument_type": txn.instrument_type,
+                        "transaction_type": txn.transaction_type,
+                        "transaction_sub_type": txn.transaction_sub_type,
+                        "action": txn.action,
+                        "quantity": txn.quantity,
+                        "price": txn.price,
+                        "description": txn.description,
+                        "value": txn.value,
+                        "fees": transaction_fees(txn),
+                        "net_value": txn.net_value,
+                    }
+                )
+        return
+    console = Console()
+
+    def history_table(first: bool) -> Table:
+        # rows are printed a page at a time, so every page gets the same
+        # fixed layout and only the first one has a title and header
+        table = Table(
+            show_header=first,
+            show_edge=False,
+            expand=True,
+            header_style="bold",
+            title_style="bold",
+            title=f"Transaction list for account {acc.nickname} "
+            f"({acc.account_number})"
+            if first
+            else None,
+        )
+        table.add_column("Date/Time", width=16, no_wrap=True)
+        table.add_column("Root Symbol", width=11)
+        table.add_column("Txn Type", width=18)
+        table.add_column("Description", ratio=1)
+        table.add_column("Gross P/L", width=12, justify="right")
+        table.add_column("Fees", width=10, style="red", justify="right")
+        table.add_column("Net P/L", width=12, justify="right")
+        return table
+
     totals = defaultdict(lambda: ZERO)
+    table = history_table(True)
     for txn in history:
-        fees = (
-            (txn.commission or ZERO)
-            + (txn.clearing_fees or ZERO)
-            + (txn.regulatory_fees or ZERO)
-            + (txn.proprietary_index_option_fees or ZERO)
-        )
+        if table.row_count == PAGE_SIZE:
+            console.print(table)
+            table = history_table(False)
+        fees = transaction_fees(txn)
         totals["fees"] += fees
         totals["gross"] += txn.value
         totals["net"] += txn.net_value
@@ -516,10 +714,12 @@ async def history(
                 conditional_color(txn.value),
                 f"-${fees:.2f}",
                 conditional_color(txn.net_value),
-            ],
-            end_section=(txn.id == last_id),
+            ]
         )
+    if not totals:
+        return
     # add last row
+    table.rows[-1].end_section = True
     table.add_row(
         *[
             "",
@@ -535,7 +735,7 @@ async def history(
 
 
 @portfolio.command(help="View margin usage by position for an account.")
-async def margin():
+async def margin(format: FormatOption = OutputFormat.TABLE):
     sesh = await RenewableSession()
     acc = sesh.get_account()
     margin = await acc.get_margin_requirements(sesh)
@@ -561,11 +761,22 @@ async def margin():
         .split(",")
     )
     margin_usage = ZERO
+    records: list[dict[str, Any]] = []
     for i, entry in enumerate(margin.groups):
         if isinstance(entry, EmptyDict):
             continue
         bp = -entry.buying_power
         bp_percent = abs(float(bp / margin.margin_equity * 100))
+        records.append(
+            {
+                "symbol": entry.code,
+                "description": entry.description,
+                "underlying_type": entry.underlying_type,
+                "used_bp": bp,
+                "bp_percent": abs(bp / margin.margin_equity * 100),
+                "ignored": entry.code in ignore_symbols,
+            }
+        )
         if entry.code not in ignore_symbols:
             margin_usage += entry.buying_power
             if abs(bp_percent) > max_percent and entry.underlying_type != "Equity":
@@ -592,7 +803,12 @@ async def margin():
         ]
     )
     data = (await get_market_data_by_type(sesh, indices=["VIX"]))[0]
-    console.print(table)
+    if format == OutputFormat.TABLE:
+        console.print(table)
+    else:
+        with record_writer(format) as out:
+            for record in records:
+                out.write(record)
     bp_variation = sesh.config.getint(
         "portfolio", "bp-target-percent-variation", fallback=10
     )
@@ -626,7 +842,7 @@ def get_margin_rate(margin_usage: Decimal) -> Decimal:
 
 
 @portfolio.command(help="View current balances for an account.")
-async def balance():
+async def balance(format: FormatOption = OutputFormat.TABLE):
     sesh = await RenewableSession()
     acc = sesh.get_account()
     balances = await acc.get_balances(sesh)
@@ -643,16 +859,29 @@ async def balance():
     table.add_column("Used BP", justify="right")
     table.add_column("BP %", justify="right")
     bp_percent = balances.maintenance_requirement / balances.margin_equity * 100
-    table.add_row(
-        *[
-            conditional_color(balances.cash_balance),
-            conditional_color(balances.net_liquidating_value),
-            conditional_color(balances.derivative_buying_power),
-            conditional_color(-balances.maintenance_requirement),
-            f"{bp_percent:.1f}%",
-        ]
-    )
-    console.print(table)
+    if format == OutputFormat.TABLE:
+        table.add_row(
+            *[
+                conditional_color(balances.cash_balance),
+                conditional_color(balances.net_liquidating_value),
+                conditional_color(balances.derivative_buying_power),
+                conditional_color(-balances.maintenance_requirement),
+                f"{bp_percent:.1f}%",
+            ]
+        )
+        console.print(table)
+    else:
+        with record_writer(format) as out:
+            out.write(
+                {
+                    "account": acc.account_number,
+                    "cash": balances.cash_balance,
+                    "net_liq": balances.net_liquidating_value,
+                    "free_bp": balances.derivative_buying_power,
+                    "used_bp": -balances.maintenance_requirement,
+                    "bp_percent": bp_percent,
+                }
+            )
     if balances.cash_balance < 0:
         interest = get_margin_rate(balances.cash_balance) / 360 * balances.cash_balance
         print_warning(
@@ -0,0 +1,75 @@
+from bisect import bisect_left
+from decimal import Decimal
+from typing import Mapping
+
+from tastytrade.dxfeed import Greeks
+from tastytrade.instruments import Strike
+
+
+class StrikeIndex:
+    """
+    Sorted view over the strikes of a single expiration, with constant time
+    lookups by price or streamer symbol and binary searches by price or delta.
+    """
+
+    def __init__(self, strikes: list[Strike]):
+        self.strikes = sorted(strikes, key=lambda s: s.strike_price)
+        self.prices = [s.strike_price for s in self.strikes]
+        self.by_price = {s.strike_price: s for s in self.strikes}
+        self.by_call = {s.call_streamer_symbol: s for s in self.strikes}
+        self.by_put = {s.put_streamer_symbol: s for s in self.strikes}
+
+    def get(self, price: Decimal) -> Strike | None:
+        """
+        Returns the strike at exactly this price, if there is one.
+        """
+        return self.by_price.get(price)
+
+    def atm(self, price: Decimal) -> int:
+        """
+        Returns the index of the first strike at or above the given price.
+        """
+        return bisect_left(self.prices, price)
+
+    def nearest(self, price: Decimal) -> Strike:
+        """
+        Returns the strike closest to the given price.
+        """
+        i = self.atm(price)
+        if i == len(self.prices):
+            return self.strikes[-1]
+        if i > 0 and price - self.prices[i - 1] <= self.prices[i] - price:
+            return self.strikes[i - 1]
+        return self.strikes[i]
+
+    def window(self, price: Decimal, count: int) -> list[Strike]:
+        """
+        Returns up to `count` strikes centered around the given price.
+        """
+        if count >= len(self.strikes):
+            return self.strikes
+        start = min(max(self.atm(price) - count // 2, 0), len(self.strikes) - count)
+        return self.strikes[start : start + count]
+
+    def nearest_delta(
+        self, greeks: Mapping[str, Greeks | None], delta: Decimal, put: bool = False
+    ) -> Strike | None:
+        """
+        Returns the strike whose call (or put) delta is closest to the given
+        delta, expressed as a positive percentage like 30. Strikes without
+        greeks are skipped.
+        """
+        symbol = (
+            (lambda s: s.put_streamer_symbol)
+            if put
+            else lambda s: s.call_streamer_symbol
+        )
+        known = [s for s in self.strikes if greeks.get(symbol(s))]
+        if not known:
+            return None
+        # deltas fall as strikes rise, for both calls and puts
+        key = lambda s: -greeks[symbol(s)].delta * 100  # type: ignore
+        target = delta if put else -delta
+        i = bisect_left(known, target, key=key)
+        candidates = known[max(i - 1, 0) : i + 1]
+        return min(candidates, key=lambda s: abs(key(s) - target))
@@ -0,0 +1,148 @@
+import asyncio
+import json
+import os
+from collections import defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from time import perf_counter
+from typing import Iterator, NamedTuple
+
+from httpx import AsyncBaseTransport, Request, Response
+
+
+class Span(NamedTuple):
+    name: str
+    category: str
+    start: float
+    end: float
+    task: int
+
+
+class Tracer:
+    """
+    Collects timed spans for a single command run. Spans from concurrent tasks
+    are kept apart, so a Chrome trace shows them on separate rows.
+    """
+
+    def __init__(self):
+        self.spans: list[Span] = []
+        self.start = perf_counter()
+        self.end = self.start
+        self._tasks: dict[int, int] = {}
+
+    def task_id(self) -> int:
+        try:
+            task = asyncio.current_task()
+        except RuntimeError:  # no running loop
+            task = None
+        if task is None:
+            return 0
+        return self._tasks.setdefault(id(task), len(self._tasks) + 1)
+
+    def print_breakdown(self) -> None:
+        # imported here so untraced runs don't pay for it
+        from rich.console import Console
+        from rich.table import Table
+
+        wall = self.end - self.start
+        totals: dict[tuple[str, str], list[float]] = defaultdict(list)
+        for s in self.spans:
+            totals[(s.category, s.name)].append(s.end - s.start)
+        table = Table(
+            header_style="bold",
+            title_style="bold",
+            title=f"Profile ({wall * 1000:.0f}ms total, nested spans overlap)",
+        )
+        table.add_column("Category")
+        table.add_column("Span")
+        table.add_column("Calls", justify="right")
+        table.add_column("Total", justify="right")
+        table.add_column("Max", justify="right")
+        table.add_column("% wall", justify="right")
+        for (category, name), times in sorted(
+            totals.items(), key=lambda item: -sum(item[1])
+        ):
+            total = sum(times)
+            table.add_row(
+                category,
+                name,
+                str(len(times)),
+                f"{total * 1000:.1f}ms",
+                f"{max(times) * 1000:.1f}ms",
+                f"{100 * total / wall:.0f}%" if wall else "",
+            )
+        Console(stderr=True).print(table)
+
+    def write_chrome_trace(self, path: str) -> None:
+        """
+        Writes the spans in Chrome's trace event format, which can be opened
+        in chrome://tracing or https://ui.perfetto.dev.
+        """
+        pid = os.getpid()
+        events = [
+            {
+                "name": s.name,
+                "cat": s.category,
+                "ph": "X",
+                "ts": (s.start - self.start) * 1e6,
+                "dur": (s.end - s.start) * 1e6,
+                "pid": pid,
+                "tid": s.task,
+            }
+            for s in self.spans
+        ]
+        with open(path, "w") as f:
+            json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f)
+
+
+_tracer: ContextVar[Tracer | None] = ContextVar("tracer", default=None)
+
+
+def tracing() -> bool:
+    return _tracer.get() is not None
+
+
+@contextmanager
+def start_tracing() -> Iterator[Tracer]:
+    tracer = Tracer()
+    token = _tracer.set(tracer)
+    try:
+        yield tracer
+    finally:
+        _tracer.reset(token)
+
+
+@contextmanager
+def span(name: str, category: str = "compute") -> Iterator[None]:
+    """
+    Times the enclosed block if the command is being profiled.
+    """
+    tracer = _tracer.get()
+    if tracer is None:
+        yield
+        return
+    task = tracer.task_id()
+    start = perf_counter()
+    try:
+        yield
+    finally:
+        tracer.spans.append(Span(name, category, start, perf_counter(), task))
+
+
+class TracingTransport(AsyncBaseTransport):
+    """
+    httpx transport that records a span for each request, including the time
+    taken to read the response body.
+    """
+
+    def __init__(self, transport: AsyncBaseTransport):
+        self.transport = transport
+
+    async def handle_async_request(self, request: Request) -> Response:
+        with span(f"{request.method} {request.url.path}", "http"):
+            response = await self.transport.handle_async_request(request)
+            await response.aread()
+        return response
+
+    async def aclose(self) -> None:
+        await self.transport.aclose()
@@ -1,24 +1,47 @@
-from decimal import Decimal
-from typing import Annotated
+import csv
+import re
+from collections import defaultdict
+from decimal import Decimal, InvalidOperation
+from math import gcd
+from pathlib import Path
+from typing import Annotated, Any, NamedTuple
 
+from anyio import CapacityLimiter
 from rich.console import Console
 from rich.table import Table
-from tastytrade.instruments import Cryptocurrency, Equity, Future, FutureProduct
-from tastytrade.market_data import get_market_data_by_type
+from tastytrade.instruments import TickSize
+from tastytrade.market_data import MarketData, get_market_data_by_type
 from tastytrade.order import (
+    InstrumentType,
     NewOrder,
     OrderAction,
     OrderTimeInForce,
     OrderType,
+    PlacedOrderResponse,
 )
 from tastytrade.utils import TastytradeError
 from typer import Argument, Option
 
+from ttcli.instruments import (
+    get_crypto,
+    get_cryptos,
+    get_equities,
+    get_equity,
+    get_future,
+    get_future_options,
+    get_future_product,
+    get_futures,
+    get_options,
+)
+from ttcli.order import MAX_CONCURRENCY, PENNY, get_tick_sizes, with_retry
 from ttcli.utils import (
+    ZERO,
     AsyncTyper,
     RenewableSession,
+    batched,
     conditional_color,
     decimalify,
+    gather,
     get_confirmation,
     print_error,
     print_warning,
@@ -30,6 +53,208 @@ trade = AsyncTyper(
     help="Buy or sell stocks/ETFs, crypto, and futures.", no_args_is_help=True
 )
 
+# OCC option symbols, with or without the padding after the root
+OCC_RE = re.compile(r"^([A-Z0-9]{1,6})\s*(\d{6}[CP]\d{8})$")
+# the API's limit on symbols per market data request
+QUOTE_CHUNK_SIZE = 100
+TRUTHY = {"1", "true", "yes", "y"}
+
+
+class TicketLeg(NamedTuple):
+    symbol: str
+    instrument_type: InstrumentType
+    quantity: Decimal
+    close: bool
+
+
+class Ticket(NamedTuple):
+    name: str
+    legs: list[TicketLeg]
+    price: Decimal | None
+    # whether the price is a credit, or None to infer it from the legs
+    credit: bool | None
+    gtc: bool
+
+
+def parse_symbol(symbol: str) -> tuple[str, InstrumentType]:
+    """
+    Normalizes a ticket symbol and infers its instrument type from its format.
+    """
+    symbol = symbol.strip().upper()
+    if symbol.startswith("./"):
+        return symbol, InstrumentType.FUTURE_OPTION
+    if symbol.startswith("/"):
+        return symbol, InstrumentType.FUTURE
+    if "/" in symbol:
+        return symbol, InstrumentType.CRYPTOCURRENCY
+    if match := OCC_RE.match(symbol):
+        return f"{match.group(1):<6}{match.group(2)}", InstrumentType.EQUITY_OPTION
+    return symbol, InstrumentType.EQUITY
+
+
+def read_tickets(path: Path) -> list[Ticket] | None:
+    """
+    Reads orders from a CSV ticket file, or returns None if it's invalid. Rows
+    sharing a value in the `order` column become the legs of a single order.
+    """
+    with open(path, newline="") as f:
+        reader = csv.DictReader(f)
+        reader.fieldnames = [c.strip().lower() for c in reader.fieldnames or []]
+        if not {"symbol", "quantity"} <= set(reader.fieldnames):
+            print_error("The ticket file needs `symbol` and `quantity` columns!")
+            return None
+        rows = list(reader)
+    groups: dict[str, list[tuple[int, dict[str, str]]]] = defaultdict(list)
+    for line, row in enumerate(rows, start=2):
+        row = {k: (v or "").strip() for k, v in row.items() if k}
+        groups[row.get("order") or f"line {line}"].append((line, row))
+    tickets: list[Ticket] = []
+    for name, group in groups.items():
+        legs: list[TicketLeg] = []
+        prices: set[Decimal] = set()
+        sides: set[str] = set()
+        for line, row in group:
+            try:
+                quantity = Decimal(row["quantity"])
+                if row.get("price"):
+                    prices.add(abs(Decimal(row["price"])))
+            except InvalidOperation:
+                print_error(f"Invalid quantity or price on line {line}!")
+                return None
+            symbol, instrument_type = parse_symbol(row["symbol"])
+            action = row.get("action", "").lower()
+            if instrument_type == InstrumentType.CRYPTOCURRENCY and quantity < 0:
+                # crypto can't be sold short, so a sell always closes
+                if action == "open":
+                    print_error(f"Line {line} sells crypto, which can't be opened!")
+                    return None
+                action = "close"
+            action = action or "open"
+            if not quantity or action not in ("open", "close"):
+                print_error(
+                    f"Line {line} needs a non-zero quantity and an action of "
+                    "`open` or `close`!"
+                )
+                return None
+            if side := row.get("side", "").lower():
+                if side not in ("debit", "credit"):
+                    print_error(f"Line {line} needs a side of `debit` or `credit`!")
+                    return None
+                sides.add(side)
+            legs.append(TicketLeg(symbol, instrument_type, quantity, action == "close"))
+        if len(prices) > 1:
+            print_error(f"Order {name} has more than one price!")
+            return None
+        if len(sides) > 1:
+            print_error(f"Order {name} has more than one side!")
+            return None
+        tickets.append(
+            Ticket(
+                name,
+                legs,
+                prices.pop() if prices else None,
+                sides.pop() == "credit" if sides else None,
+                any(row.get("gtc", "").lower() in TRUTHY for _, row in group),
+            )
+        )
+    return tickets
+
+
+async def get_quotes(
+    sesh: RenewableSession, symbols: dict[InstrumentType, set[str]]
+) -> dict[str, MarketData]:
+    """
+    Fetches quotes for symbols of any type, splitting them across requests to
+    stay within the API's limit.
+    """
+    pairs = [(t, s) for t, group in symbols.items() for s in group]
+
+    async def fetch(chunk: list[tuple[InstrumentType, str]]) -> list[MarketData]:
+        by_type: dict[InstrumentType, list[str]] = defaultdict(list)
+        for t, s in chunk:
+            by_type[t].append(s)
+        return await get_market_data_by_type(
+            sesh,
+            cryptocurrencies=by_type[InstrumentType.CRYPTOCURRENCY] or None,
+            equities=by_type[InstrumentType.EQUITY] or None,
+            futures=by_type[InstrumentType.FUTURE] or None,
+            future_options=by_type[InstrumentType.FUTURE_OPTION] or None,
+            options=by_type[InstrumentType.EQUITY_OPTION] or None,
+        )
+
+    results = await gather(*[fetch(c) for c in batched(pairs, QUOTE_CHUNK_SIZE)])
+    return {d.symbol: d for res in results for d in res}
+
+
+def build_order(
+    ticket: Ticket,
+    instruments: dict[str, Any],
+    ticks: dict[str, list[TickSize]],
+    quotes: dict[str, MarketData],
+) -> NewOrder | str:
+    """
+    Builds the order for a ticket, priced at the mid unless the ticket has a
+    price, or returns why it can't be built. Mids are rounded to the tick size
+    of the first leg, and crypto orders are always GTC.
+    """
+    legs = []
+    mid = ZERO
+    quantities = [leg.quantity for leg in ticket.legs]
+    # the price is per unit of the order, which handles ratio spreads
+    if all(q == int(q) for q in quantities):
+        unit = Decimal(gcd(*[int(q) for q in quantities]))
+    else:
+        unit = min(abs(q) for q in quantities)
+    for leg in ticket.legs:
+        instrument = instruments.get(leg.symbol)
+        if instrument is None:
+            return f"Unknown symbol {leg.symbol}"
+        if leg.instrument_type == InstrumentType.FUTURE:
+            action = OrderAction.SELL if leg.quantity < 0 else OrderAction.BUY
+        elif leg.close:
+            action = (
+                OrderAction.SELL_TO_CLOSE
+                if leg.quantity < 0
+                else OrderAction.BUY_TO_CLOSE
+            )
+        else:
+            action = (
+                OrderAction.SELL_TO_OPEN
+                if leg.quantity < 0
+                else OrderAction.BUY_TO_OPEN
+            )
+        legs.append(instrument.build_leg(abs(leg.quantity), action))
+        quote = quotes.get(leg.symbol)
+        if ticket.price is None and (not quote or not quote.bid or not quote.ask):
+            return f"No quote for {leg.symbol}"
+        if quote and quote.bid and quote.ask:
+            m = 1 if leg.quantity < 0 else -1
+            mid += m * (quote.bid + quote.ask) / 2 * abs(leg.quantity) / unit
+    # credits are positive. a given price takes the ticket's side, or the
+    # direction of the legs when they're all buys or all sells
+    if ticket.price is not None:
+        credit = ticket.credit
+        if credit is None and len({leg.quantity < 0 for leg in ticket.legs}) == 1:
+            credit = ticket.legs[0].quantity < 0
+        if credit is None:
+            return "Mixed legs need a side of `debit` or `credit`"
+        price = ticket.price if credit else -ticket.price
+    else:
+        tick_sizes = ticks.get(ticket.legs[0].symbol) or [TickSize(value=PENNY)]
+        rounded = round_to_tick_size(abs(mid), tick_sizes)
+        price = rounded if mid >= 0 else -rounded
+    crypto = any(
+        leg.instrument_type == InstrumentType.CRYPTOCURRENCY for leg in ticket.legs
+    )
+    return NewOrder(
+        time_in_force=OrderTimeInForce.GTC
+        if ticket.gtc or crypto
+        else OrderTimeInForce.DAY,
+        order_type=OrderType.LIMIT,
+        legs=legs,
+        price=price,
+    )
+
 
 @trade.command(
     help="Buy or sell stocks/ETFs.",
@@ -45,7 +270,7 @@ async def stock(
 ):
     sesh = await RenewableSession()
     symbol = symbol.upper()
-    equity = await Equity.get(sesh, symbol)
+    equity = await get_equity(sesh, symbol)
     fmt = lambda x: round_to_tick_size(x, equity.tick_sizes or [])
 
     data = (await get_market_data_by_type(sesh, equities=[symbol]))[0]
@@ -138,8 +363,7 @@ async def crypto(
         symbol += "/USD"
     elif "/" not in symbol:
         symbol = symbol.split("USD")[0] + "/USD"
-    symbol = symbol.replace("/", "%2F")
-    crypto = await Cryptocurrency.get(sesh, symbol)
+    crypto = await get_crypto(sesh, symbol)
     fmt = lambda x: round_to_width(x, crypto.tick_size)
 
     data = (await get_market_data_by_type(sesh, cryptocurrencies=[crypto.symbol]))[0]
@@ -237,13 +461,13 @@ async def future(
     sesh = await RenewableSession()
     symbol = symbol.upper()
     if not any(c.isdigit() for c in symbol):
-        product = await FutureProduct.get(sesh, symbol)
+        product = await get_future_product(sesh, symbol)
         fmt = ",".join([f" {m.name} ({m.value})" for m in product.active_months])
         print_error(
             f"Please enter the full futures symbol!\nCurrent active months:{fmt}"
         )
         return
-    future = await Future.get(sesh, symbol)
+    future = await get_future(sesh, symbol)
     fmt = lambda x: round_to_width(x, future.tick_size)
 
     data = (await get_market_data_by_type(sesh, futures=[future.symbol]))[0]
@@ -328,3 +552,165 @@ async def future(
         )
     if get_confirmation("Send order? Y/n "):
         await acc.place_order(sesh, order, dry_run=False)
+
+
+@trade.command(
+    help="Review and place many orders at once from a CSV ticket file.",
+    epilog="The file needs `symbol` and `quantity` columns, with negative "
+    "quantities for sells. Optional columns are `order` (rows with the same "
+    "value become legs of one order), `action` (`open` or `close`), `price` "
+    "(per unit, defaulting to the mid), `side` (`debit` or `credit`, needed "
+    "with a price when an order both buys and sells) and `gtc`. Crypto orders "
+    "are always GTC, and crypto sells always close. Options are given by their "
+    "OCC or futures option symbol.",
+    no_args_is_help=True,
+)
+async def batch(
+    path: Annotated[
+        Path,
+        Argument(help="The ticket file to read.", exists=True, dir_okay=False),
+    ],
+    yes: Annotated[
+        bool,
+        Option("--yes", "-y", help="Send the orders without asking for confirmation."),
+    ] = False,
+):
+    tickets = read_tickets(path)
+    if not tickets:
+        return
+    symbols: dict[InstrumentType, set[str]] = defaultdict(set)
+    for ticket in tickets:
+        for leg in ticket.legs:
+            symbols[leg.instrument_type].add(leg.symbol)
+    sesh = await RenewableSession()
+    acc = sesh.get_account()
+
+    # instruments, quotes and balances don't depend on each other
+    async def get_instruments() -> dict[str, Any]:
+        resolved = await gather(
+            get_equities(sesh, symbols[InstrumentType.EQUITY]),
+            get_options(sesh, symbols[InstrumentType.EQUITY_OPTION]),
+            get_futures(sesh, symbols[InstrumentType.FUTURE]),
+            get_future_options(sesh, symbols[InstrumentType.FUTURE_OPTION]),
+            get_cryptos(sesh, symbols[InstrumentType.CRYPTOCURRENCY]),
+        )
+        return {s: i for res in resolved for s, i in res.items()}
+
+    instruments, quotes, balances = await gather(
+        get_instruments(), get_quotes(sesh, symbols), acc.get_balances(sesh)
+    )
+    # the instruments are in the store now, so this only adds the underlyings
+    ticks = await get_tick_sizes(sesh, symbols)
+    orders = {
+        t.name: build_order(t, instruments, ticks, quotes)  # type: ignore
+        for t in tickets
+    }
+    limiter = CapacityLimiter(MAX_CONCURRENCY)
+
+    async def dry_run(order: NewOrder | str) -> PlacedOrderResponse | str:
+        if isinstance(order, str):
+            return order
+        async with limiter:
+            try:
+                res = await with_retry(lambda: acc.place_order(sesh, order))
+            except TastytradeError as e:
+                return str(e).strip()
+        if res.errors:
+            return "; ".join(str(e) for e in res.errors)
+        return res
+
+    results = dict(zip(orders, await gather(*[dry_run(o) for o in orders.values()])))
+
+    nl = balances.net_liquidating_value  # type: ignore
+    warn_percent = sesh.config.getfloat(
+        "portfolio", "bp-max-percent-per-position", fallback=None
+    )
+    console = Console()
+    table = Table(
+        show_header=True,
+        header_style="bold",
+        title_style="bold",
+        title="Order Review",
+    )
+    table.add_column("Order", justify="center")
+    table.add_column("Legs")
+    table.add_column("Price", justify="center")
+    table.add_column("BP", justify="center")
+    table.add_column("BP %", justify="center")
+    table.add_column("Fees", justify="center")
+    total_bp = total_fees = ZERO
+    for ticket in tickets:
+        legs = "\n".join(
+            f"{leg.quantity:+} {leg.symbol}{' (close)' if leg.close else ''}"
+            for leg in ticket.legs
+        )
+        res = results[ticket.name]
+        if isinstance(res, str):
+            table.add_row(ticket.name, legs, f"[red]{res}[/red]", "-", "-", "-")
+            continue
+        bp = res.buying_power_effect.change_in_buying_power
+        percent = abs(bp) / nl * Decimal(100)
+        fees = res.fee_calculation.total_fees if res.fee_calculation else ZERO
+        total_bp += bp
+        total_fees += fees
+        table.add_row(
+            ticket.name,
+            legs,
+            conditional_color(res.order.price or ZERO, round=False),
+            conditional_color(bp),
+            f"{percent:.2f}%",
+            conditional_color(fees),
+        )
+        for warning in res.warnings or []:
+            print_warning(f"Order {ticket.name}: {warning.message}")
+        if warn_percent and percent > warn_percent:
+            print_warning(
+                f"Order {ticket.name}: buying power usage is above per-position "
+                f"target of {warn_percent}%!"
+            )
+    table.add_section()
+    table.add_row(
+        "Total",
+        "",
+        "",
+        conditional_color(total_bp),
+        f"{abs(total_bp) / nl * Decimal(100):.2f}%",
+        conditional_color(total_fees),
+    )
+    console.print(table)
+
+    valid = {
+        name: o
+        for name, o in orders.items()
+        if isinstance(o, NewOrder) and not isinstance(results[name], str)
+    }
+    if not valid:
+        print_error("None of the orders passed review!")
+        return
+    if not yes and not get_confirmation(f"Send {len(valid)} orders? Y/n "):
+        return
+
+    async def place(order: NewOrder) -> tuple[int | None, str | None]:
+        async with limiter:
+            try:
+                res = await with_retry(
+                    lambda: acc.place_order(sesh, order, dry_run=False)
+                )
+            except TastytradeError as e:
+                return None, str(e).strip()
+        return res.order.id, None
+
+    placed = await gather(*[place(o) for o in valid.values()])
+    table = Table(header_style="bold", title_style="bold", title="Results")
+    table.add_column("Order", justify="center")
+    table.add_column("Result")
+    for name, (order_id, error) in zip(valid, placed):
+        table.add_row(
+            name,
+            f"[green]Placed order {order_id}[/green]"
+            if error is None
+            else f"[red]{error}[/red]",
+        )
+    console.print(table)
+    done = sum(error is None for _, error in placed)
+    print(f"Placed {done} of {len(valid)} orders.")
@@ -3,35 +3,64 @@ import inspect
 import json
 import os
 import pickle
+import signal
+import sys
 from collections import defaultdict
 from configparser import ConfigParser
 from datetime import date
 from decimal import Decimal
 from functools import partial, wraps
-from typing import Any, Awaitable, Callable, Self, Type, TypeVar
-
-from anyio import create_task_group, move_on_after
+from itertools import islice
+from time import perf_counter, time
+from typing import (
+    Annotated,
+    Any,
+    AsyncIterator,
+    Awaitable,
+    Callable,
+    Iterable,
+    Mapping,
+    Self,
+    Type,
+    TypeVar,
+)
+
+from anyio import (
+    CancelScope,
+    connect_unix,
+    create_task_group,
+    move_on_after,
+    open_signal_receiver,
+)
+from anyio.abc import SocketStream
+from anyio.streams.buffered import BufferedByteReceiveStream
+from httpx import AsyncBaseTransport, AsyncClient, Request, Response
 from rich import print as rich_print
 from tastytrade import Account, DXLinkStreamer, Session
+from tastytrade.dxfeed import Event
 from tastytrade.instruments import TickSize
 from tastytrade.order import OrderAction
 from tastytrade.streamer import U
-from typer import Typer
+from tastytrade.utils import TastytradeError
+from typer import Option, Typer
 
-from ttcli import CUSTOM_CONFIG_PATH, TOKEN_PATH, VERSION, logger
+from ttcli import DAEMON_PATH, TOKEN_PATH, VERSION, config_path, logger
+from ttcli.trace import TracingTransport, span, start_tracing, tracing
 
 ZERO = Decimal(0)
 CONTEXT_SETTINGS = {"help_option_names": ["-h", "--help"]}
 
-config_path = os.path.join(os.path.expanduser("~"), CUSTOM_CONFIG_PATH)
+daemon_path = os.path.join(os.path.expanduser("~"), DAEMON_PATH)
+# large enough for the nested option chain of an index like SPX
+MAX_MESSAGE_SIZE = 2**26
 
 
 def print_error(msg: str):
-    rich_print(f"[bold red]Error: {msg}[/bold red]")
+    rich_print(f"[bold red]Error: {msg}[/bold red]", file=sys.stderr)
 
 
 def print_warning(msg: str):
-    rich_print(f"[light_coral]Warning: {msg}[/light_coral]")
+    rich_print(f"[light_coral]Warning: {msg}[/light_coral]", file=sys.stderr)
 
 
 def decimalify(val: str) -> Decimal:
@@ -42,6 +71,18 @@ def is_monthly(day: date) -> bool:
     return day.weekday() == 4 and 15 <= day.day <= 21
 
 
+def get_choice(prompt: str) -> int | None:
+    """
+    Reads a menu number, prompting on stderr so records piped from stdout
+    stay clean. Returns None if nothing valid was entered.
+    """
+    print(prompt, end="", file=sys.stderr, flush=True)
+    try:
+        return int(input())
+    except ValueError:
+        return None
+
+
 def get_confirmation(prompt: str, default: bool = True) -> bool:
     while True:
         answer = input(prompt).lower()
@@ -53,17 +94,205 @@ def get_confirmation(prompt: str, default: bool = True) -> bool:
             return False
 
 
-async def listen_events(
-    dxfeeds: list[str], event_class: Type[U], streamer: DXLinkStreamer
-) -> dict[str, U | None]:
-    event_dict: dict[str, U | None] = defaultdict(lambda: None)
-    await streamer.subscribe(event_class, dxfeeds)
-    with move_on_after(3):
-        async for event in streamer.listen(event_class):
-            event_dict[event.event_symbol] = event
-            if len(event_dict) == len(dxfeeds):
-                break
-    return event_dict
+class DaemonConnection:
+    """
+    A connection to the session daemon, exchanging newline-delimited JSON.
+    """
+
+    def __init__(self, stream: SocketStream):
+        self.stream = stream
+        self.reader = BufferedByteReceiveStream(stream)
+
+    @classmethod
+    async def open(cls) -> Self:
+        return cls(await connect_unix(daemon_path))
+
+    async def __aenter__(self) -> Self:
+        return self
+
+    async def __aexit__(self, *_: Any) -> None:
+        await self.stream.aclose()
+
+    async def send(self, message: dict[str, Any]) -> None:
+        await self.stream.send(json.dumps(message).encode() + b"\n")
+
+    async def receive(self) -> dict[str, Any]:
+        return json.loads(await self.reader.receive_until(b"\n", MAX_MESSAGE_SIZE))
+
+
+async def ping_daemon() -> dict[str, Any] | None:
+    """
+    Returns the daemon's status if it's running and responsive, otherwise None.
+    """
+    if not os.path.exists(daemon_path):
+        return None
+    with move_on_after(1):
+        try:
+            async with await DaemonConnection.open() as conn:
+                await conn.send({"op": "ping"})
+                return await conn.receive()
+        except (OSError, ValueError):
+            pass
+    return None
+
+
+class RateLimited(TastytradeError):
+    """
+    Raised for responses with a 429 status, which were rejected before being
+    processed and so are always safe to send again.
+    """
+
+    def __init__(self, response: Response):
+        super().__init__(f"Rate limited: {response.text}")
+        self.response = response
+
+
+class RateLimitTransport(AsyncBaseTransport):
+    """
+    httpx transport that raises :class:`RateLimited` for 429 responses, since
+    the API's error messages don't include the status.
+    """
+
+    def __init__(self, transport: AsyncBaseTransport):
+        self.transport = transport
+
+    async def handle_async_request(self, request: Request) -> Response:
+        response = await self.transport.handle_async_request(request)
+        if response.status_code == 429:
+            await response.aread()
+            raise RateLimited(response)
+        return response
+
+    async def aclose(self) -> None:
+        await self.transport.aclose()
+
+
+class DaemonTransport(AsyncBaseTransport):
+    """
+    httpx transport that sends requests through the daemon's warm session.
+    """
+
+    async def handle_async_request(self, request: Request) -> Response:
+        async with await DaemonConnection.open() as conn:
+            await conn.send(
+                {
+                    "op": "request",
+                    "method": request.method,
+                    "path": request.url.raw_path.decode(),
+                    "body": (await request.aread()).decode(),
+                }
+            )
+            res = await conn.receive()
+        return Response(
+            res["status"],
+            headers=res["headers"],
+            content=res["body"].encode(),
+            request=request,
+        )
+
+
+class DaemonStreamer:
+    """
+    Stand-in for :class:`DXLinkStreamer` that reuses the daemon's live
+    connection and subscriptions. Events the daemon has already seen are
+    replayed immediately.
+    """
+
+    def __init__(self):
+        self._symbols: dict[str, list[str]] = defaultdict(list)
+
+    async def __aenter__(self) -> Self:
+        return self
+
+    async def __aexit__(self, *_: Any) -> None:
+        pass
+
+    async def subscribe(self, event_class: Type[Event], symbols: Iterable[str]) -> None:
+        self._symbols[event_class.__name__].extend(symbols)
+
+    async def listen(self, event_class: Type[U]) -> AsyncIterator[U]:
+        async with await DaemonConnection.open() as conn:
+            await conn.send(
+                {
+                    "op": "listen",
+                    "event": event_class.__name__,
+                    "symbols": self._symbols[event_class.__name__],
+                }
+            )
+            while True:
+                yield event_class.model_validate(await conn.receive())
+
+
+class EventSnapshot:
+    """
+    The first event received for each requested (event type, symbol) pair,
+    along with the pairs that never arrived before the deadline.
+    """
+
+    def __init__(self, wanted: Mapping[Type[Event], Iterable[str]]):
+        self.events: dict[Type[Event], dict[str, Event]] = {cls: {} for cls in wanted}
+        self.missing: dict[Type[Event], set[str]] = {
+            cls: set(symbols) for cls, symbols in wanted.items()
+        }
+
+    def get(self, event_class: Type[U]) -> dict[str, U | None]:
+        res: dict[str, U | None] = defaultdict(lambda: None)
+        res.update(self.events.get(event_class, {}))  # type: ignore
+        return res
+
+    def warn_missing(self) -> None:
+        for cls, symbols in self.missing.items():
+            if symbols:
+                names = sorted(symbols)
+                more = f" and {len(names) - 5} more" if len(names) > 5 else ""
+                print_warning(
+                    f"No {cls.__name__} data received for {', '.join(names[:5])}{more}."
+                )
+
+
+async def cancel_on_interrupt(scope: CancelScope) -> None:
+    """
+    Cancels the scope on Ctrl-C instead of exiting, so a watch mode can hand
+    over to whatever comes after it.
+    """
+    if sys.platform == "win32":  # no signal handlers, so Ctrl-C just exits
+        return
+    with open_signal_receiver(signal.SIGINT) as signals:
+        async for _ in signals:
+            scope.cancel()
+            return
+
+
+async def collect_events(
+    streamer: DXLinkStreamer | DaemonStreamer,
+    wanted: Mapping[Type[Event], Iterable[str]],
+    timeout: float = 3,
+) -> EventSnapshot:
+    """
+    Subscribes to several event types at once and returns as soon as an event
+    has arrived for every requested symbol, or when the timeout is reached.
+    """
+    snapshot = EventSnapshot(wanted)
+
+    async def listen(event_class: Type[Event]) -> None:
+        events = snapshot.events[event_class]
+        pending = snapshot.missing[event_class]
+        with span(f"wait {event_class.__name__}", "stream"):
+            async for event in streamer.listen(event_class):
+                if event.event_symbol in pending:
+                    events[event.event_symbol] = event
+                    pending.remove(event.event_symbol)
+                    if not pending:
+                        return
+
+    with move_on_after(timeout):
+        async with create_task_group() as tg:
+            for event_class, symbols in snapshot.missing.items():
+                if symbols:
+                    with span(f"subscribe {event_class.__name__}", "stream"):
+                        await streamer.subscribe(event_class, list(symbols))
+                    tg.start_soon(listen, event_class)
+    return snapshot
 
 
 def conditional_color(value: Decimal, dollars: bool = True, round: bool = True) -> str:
@@ -93,15 +322,67 @@ def round_to_tick_size(price: Decimal, ticks: list[TickSize]) -> Decimal:
     return price
 
 
+PROFILE_PARAMETERS = [
+    inspect.Parameter(
+        "profile",
+        inspect.Parameter.KEYWORD_ONLY,
+        default=False,
+        annotation=Annotated[
+            bool,
+            Option(
+                "--profile",
+                help="Print a breakdown of where time was spent.",
+                rich_help_panel="Profiling",
+            ),
+        ],
+    ),
+    inspect.Parameter(
+        "profile_trace",
+        inspect.Parameter.KEYWORD_ONLY,
+        default=None,
+        annotation=Annotated[
+            str | None,
+            Option(
+                "--profile-trace",
+                help="Write a Chrome trace of the command to this file.",
+                metavar="FILE",
+                show_default=False,
+                rich_help_panel="Profiling",
+            ),
+        ],
+    ),
+]
+
+
 class AsyncTyper(Typer):
     @staticmethod
     def maybe_run_async(decorator: Callable, func: Callable) -> Any:
         if inspect.iscoroutinefunction(func):
 
             @wraps(func)
-            def runner(*args: Any, **kwargs: Any) -> Any:
-                return asyncio.run(func(*args, **kwargs))
-
+            def runner(
+                *args: Any,
+                profile: bool = False,
+                profile_trace: str | None = None,
+                **kwargs: Any,
+            ) -> Any:
+                if not profile and not profile_trace:
+                    return asyncio.run(func(*args, **kwargs))
+                with start_tracing() as tracer:
+                    try:
+                        return asyncio.run(func(*args, **kwargs))
+                    finally:
+                        tracer.end = perf_counter()
+                        if profile:
+                            tracer.print_breakdown()
+                        if profile_trace:
+                            tracer.write_chrome_trace(profile_trace)
+
+            # every command gets the profiling options on top of its own
+            sig = inspect.signature(func)
+            runner.__signature__ = sig.replace(  # type: ignore
+                parameters=[*sig.parameters.values(), *PROFILE_PARAMETERS]
+            )
             decorator(runner)
         else:
             decorator(func)
@@ -124,15 +405,25 @@ class RenewableSession(Session):
         refresh = self.config.get("general", "refresh_token", fallback=None)
         secret = self.config.get("general", "client_secret", fallback=None)
         super().__init__(secret, refresh)
+        # whether requests are forwarded to the session daemon
+        self.forwarded = False
+        self.detect_rate_limits()
+        self.trace_requests()
 
     async def __ainit__(self) -> Self:
+        forward = await ping_daemon() is not None
         # try to load token
         token_path = os.path.join(os.path.expanduser("~"), f"{TOKEN_PATH}.v{VERSION}")
         if os.path.exists(token_path):
             with open(token_path, "rb") as f:
                 data = pickle.load(f)
                 logger.debug("Logged in with cached session.")
-                return self.deserialize(data)
+                self = self.deserialize(data)
+                if forward:
+                    self.forward()
+                return self
+        if forward:
+            self.forward()
         # either the token expired or doesn't exist
         accounts = await Account.get(self)
         self.accounts = [acc for acc in accounts if not acc.is_closed]
@@ -145,13 +436,63 @@ class RenewableSession(Session):
         return self
 
     def __await__(self):
-        return self.__ainit__().__await__()
+        return self.__aload__().__await__()
+
+    async def __aload__(self) -> Self:
+        with span("load session", "session"):
+            return await self.__ainit__()
+
+    def forward(self) -> None:
+        """
+        Send all requests through the session daemon, which handles auth.
+        """
+        headers = self._client.headers
+        self._client = AsyncClient(
+            base_url="http://ttcli", headers=headers, transport=DaemonTransport()
+        )
+        self.forwarded = True
+        self.detect_rate_limits()
+        self.trace_requests()
+        logger.debug("Forwarding requests to session daemon.")
+
+    def detect_rate_limits(self) -> None:
+        """
+        Raise :class:`RateLimited` for 429 responses so they can be retried.
+        """
+        self._client._transport = RateLimitTransport(self._client._transport)
+
+    def trace_requests(self) -> None:
+        """
+        Time every request when the command is being profiled.
+        """
+        if tracing():
+            transport = self._client._transport
+            self._client._transport = TracingTransport(transport)
+
+    async def refresh(self, force: bool = False) -> None:
+        if not self.forwarded:
+            return await super().refresh(force)
+        # requests are authed by the daemon, but websockets like the alert
+        # streamer send the token themselves, so borrow the daemon's
+        if force or time() >= self.session_expiration - 60:
+            async with await DaemonConnection.open() as conn:
+                await conn.send({"op": "token"})
+                res = await conn.receive()
+            self.session_token = res["session_token"]
+            self.session_expiration = res["session_expiration"]
+
+    def streamer(self) -> DXLinkStreamer | DaemonStreamer:
+        """
+        Returns a streamer for snapshots, reusing the daemon's if it's running.
+        """
+        return DaemonStreamer() if self.forwarded else DXLinkStreamer(self)
 
     def serialize(self) -> str:
         attrs = self.__dict__.copy()
         del attrs["_client"]
         del attrs["_lock"]
         del attrs["config"]
+        del attrs["forwarded"]
         attrs["accounts"] = [a.model_dump(mode="json") for a in self.accounts]
         return json.dumps(attrs)
 
@@ -185,18 +526,17 @@ class RenewableSession(Session):
             if i == 0:
                 print(
                     f"{i + 1}) {self.accounts[i].account_number} "
-                    f"{self.accounts[i].nickname} (default)"
+                    f"{self.accounts[i].nickname} (default)",
+                    file=sys.stderr,
                 )
             else:
                 print(
-                    f"{i + 1}) {self.accounts[i].account_number} {self.accounts[i].nickname}"
+                    f"{i + 1}) {self.accounts[i].account_number} {self.accounts[i].nickname}",
+                    file=sys.stderr,
                 )
         choice = 0
         while choice not in range(1, len(self.accounts) + 1):
-            try:
-                raw = input("Please choose an account: ")
-                choice = int(raw)
-            except ValueError:
+            if (choice := get_choice("Please choose an account: ")) is None:
                 return self.accounts[0]
         return self.accounts[choice - 1]
 
@@ -222,6 +562,12 @@ async def gather(*awaitables: Awaitable[T]) -> tuple[T, ...]:
     return tuple(results)
 
 
+def batched(iterable: Iterable[Any], n: int):
+    it = iter(iterable)
+    while batch := list(islice(it, n)):
+        yield batch
+
+
 def volfmt(n: int | float) -> str:
     if n >= 1e9:
         return f"{n / 1e9:.1f}B"
@@ -1,22 +1,39 @@
+import sys
 from collections import defaultdict
 from datetime import datetime
 from decimal import Decimal
-from itertools import islice
-from typing import Annotated, Any, Iterable
+from typing import Annotated, Any
 
+from anyio import CapacityLimiter
 from rich.console import Console
 from rich.table import Table
-from tastytrade.instruments import FutureMonthCode, FutureProduct
+from tastytrade.instruments import FutureMonthCode
 from tastytrade.market_data import MarketData, get_market_data_by_type
 from tastytrade.metrics import MarketMetricInfo, get_market_metrics
 from tastytrade.order import InstrumentType
 from tastytrade.utils import today_in_new_york
 from tastytrade.watchlists import PrivateWatchlist, PublicWatchlist
 from typer import Option
-from yaspin import yaspin
 
+from ttcli.instruments import get_future_products
+from ttcli.output import FormatOption, OutputFormat, record_writer, spinner
 from ttcli.portfolio import get_indicators
-from ttcli.utils import ZERO, AsyncTyper, RenewableSession, conditional_color, volfmt
+from ttcli.utils import (
+    ZERO,
+    AsyncTyper,
+    RenewableSession,
+    batched,
+    conditional_color,
+    gather,
+    get_choice,
+    volfmt,
+)
+
+# the market data endpoint takes at most this many symbols per request, and
+# metrics are requested in the same batches
+BATCH_SIZE = 100
+# number of requests allowed in flight at once
+MAX_CONCURRENCY = 4
 
 watchlist = AsyncTyper(
     help="Show prices and metrics for symbols in a watchlist.", no_args_is_help=True
@@ -33,14 +50,71 @@ def infer_futures_postfix(active_code: FutureMonthCode) -> str:
     return f"{active_code.value}{year % 10}"
 
 
-def batched(iterable: Iterable[Any], n: int):
-    it = iter(iterable)
-    while batch := list(islice(it, n)):
-        yield batch
+def watchlist_record(
+    symbol: str, item: MarketData, metric: MarketMetricInfo
+) -> dict[str, Any]:
+    return {
+        "symbol": symbol,
+        "last": item.last,
+        "change": item.last - item.prev_close
+        if item.last and item.prev_close
+        else None,
+        "iv_rank": metric.implied_volatility_index_rank,
+        "volume": item.volume,
+        "beta": metric.beta,
+        "dividend_yield": metric.dividend_yield,
+    }
+
+
+def write_watchlist(
+    format: OutputFormat,
+    data_dict: dict[str, MarketData],
+    metrics_dict: dict[str, MarketMetricInfo],
+) -> None:
+    with record_writer(format) as out:
+        for key in sorted(data_dict):
+            out.write(watchlist_record(key, data_dict[key], metrics_dict[key]))
+
+
+async def fetch_watchlist(
+    sesh: RenewableSession, all_symbols: list[tuple[str, str]]
+) -> tuple[dict[str, MarketData], dict[str, MarketMetricInfo]]:
+    """
+    Fetches market data and metrics for (type, symbol) pairs in batches. The
+    batches run concurrently, and each batch's metrics are fetched alongside
+    its market data rather than after all of it.
+    """
+    limiter = CapacityLimiter(MAX_CONCURRENCY)
+    data_dict: dict[str, MarketData] = {}
+    metrics_dict: dict[str, MarketMetricInfo] = defaultdict(
+        lambda: MarketMetricInfo(symbol="", market_cap=ZERO, updated_at=datetime.now())
+    )
+
+    async def fetch_data(batch: list[tuple[str, str]]) -> None:
+        async with limiter:
+            data = await get_market_data_by_type(
+                sesh,
+                cryptocurrencies=[s for t, s in batch if t == "crypto"],
+                equities=[s for t, s in batch if t == "equity"],
+                futures=[s for t, s in batch if t == "future"],
+                indices=[s for t, s in batch if t == "index"],
+            )
+        data_dict.update({d.symbol: d for d in data})
+
+    async def fetch_metrics(batch: list[tuple[str, str]]) -> None:
+        async with limiter:
+            metrics = await get_market_metrics(sesh, [s for _, s in batch])
+        metrics_dict.update({m.symbol: m for m in metrics})
+
+    batches = [list(batch) for batch in batched(all_symbols, BATCH_SIZE)]
+    await gather(
+        *[fetch(batch) for batch in batches for fetch in (fetch_data, fetch_metrics)]
+    )
+    return data_dict, metrics_dict
 
 
 @watchlist.command(help="Show prices and metrics for symbols in a public watchlist.")
-async def public():
+async def public(format: FormatOption = OutputFormat.TABLE):
     sesh = await RenewableSession()
     watchlists = await PublicWatchlist.get(sesh)
     watchlists.sort(key=lambda w: w.name)
@@ -48,16 +122,13 @@ async def public():
     chosen = watchlists[0]
     for i, wl in enumerate(watchlists):
         if wl.name == "tasty default":
-            print(f"{i + 1}) {wl.name} (default)")
+            print(f"{i + 1}) {wl.name} (default)", file=sys.stderr)
             chosen = wl
         else:
-            print(f"{i + 1}) {wl.name}")
+            print(f"{i + 1}) {wl.name}", file=sys.stderr)
     choice = 0
     while choice not in range(1, len(watchlists) + 1):
-        try:
-            raw = input("Choose a watchlist: ")
-            choice = int(raw)
-        except ValueError:
+        if (choice := get_choice("Choose a watchlist: ")) is None:
             break
     else:
         chosen = watchlists[choice - 1]
@@ -89,9 +160,7 @@ async def public():
         for s in chosen.watchlist_entries
         if s["instrument-type"] == InstrumentType.FUTURE
     }
-    products = [
-        fp for fp in await FutureProduct.get(sesh) if fp.root_symbol in future_symbols
-    ]
+    products = (await get_future_products(sesh, future_symbols)).values()
     futures = [
         p.root_symbol + infer_futures_postfix(p.active_months[0]) for p in products
     ]
@@ -110,23 +179,10 @@ async def public():
         + [("equity", e) for e in equities]
         + [("crypto", c) for c in cryptos]
     )
-    with yaspin(color="green", text="Fetching metrics..."):
-        data_dict: dict[str, MarketData] = {}
-        for batch in batched(all_symbols, 100):
-            data = await get_market_data_by_type(
-                sesh,
-                cryptocurrencies=[s for t, s in batch if t == "crypto"],
-                equities=[s for t, s in batch if t == "equity"],
-                futures=[s for t, s in batch if t == "future"],
-            )
-            data_dict.update({d.symbol: d for d in data})
-        metrics = await get_market_metrics(sesh, list(data_dict.keys()))
-        metrics_dict = defaultdict(
-            lambda: MarketMetricInfo(
-                symbol="", market_cap=ZERO, updated_at=datetime.now()
-            )
-        )
-        metrics_dict.update({m.symbol: m for m in metrics})
+    with spinner(format, "Fetching metrics..."):
+        data_dict, metrics_dict = await fetch_watchlist(sesh, all_symbols)
+    if format != OutputFormat.TABLE:
+        return write_watchlist(format, data_dict, metrics_dict)
     for key in sorted(data_dict):
         item = data_dict[key]
         metric = metrics_dict[key]
@@ -156,7 +212,7 @@ async def public():
 
 
 @watchlist.command(help="Show prices and metrics for symbols in a private watchlist.")
-async def private():
+async def private(format: FormatOption = OutputFormat.TABLE):
     sesh = await RenewableSession()
     watchlists = await PrivateWatchlist.get(sesh)
     watchlists.sort(key=lambda w: w.name)
@@ -165,16 +221,13 @@ async def private():
     if len(watchlists) > 1:
         for i, wl in enumerate(watchlists):
             if wl == chosen:
-                print(f"{i + 1}) {wl.name} (default)")
+                print(f"{i + 1}) {wl.name} (default)", file=sys.stderr)
                 chosen = wl
             else:
-                print(f"{i + 1}) {wl.name}")
+                print(f"{i + 1}) {wl.name}", file=sys.stderr)
         choice = 0
         while choice not in range(1, len(watchlists) + 1):
-            try:
-                raw = input("Choose a watchlist: ")
-                choice = int(raw)
-            except ValueError:
+            if (choice := get_choice("Choose a watchlist: ")) is None:
                 break
         else:
             chosen = watchlists[choice - 1]
@@ -206,9 +259,7 @@ async def private():
         for s in chosen.watchlist_entries
         if s["instrument-type"] == InstrumentType.FUTURE
     }
-    products = [
-        fp for fp in await FutureProduct.get(sesh) if fp.root_symbol in future_symbols
-    ]
+    products = (await get_future_products(sesh, future_symbols)).values()
     futures = [
         p.root_symbol + infer_futures_postfix(p.active_months[0]) for p in products
     ]
@@ -233,24 +284,10 @@ async def private():
         + [("crypto", c) for c in cryptos]
         + [("index", i) for i in indices]
     )
-    with yaspin(color="green", text="Fetching metrics..."):
-        data_dict: dict[str, MarketData] = {}
-        for batch in batched(all_symbols, 100):
-            data = await get_market_data_by_type(
-                sesh,
-                cryptocurrencies=[s for t, s in batch if t == "crypto"],
-                equities=[s for t, s in batch if t == "equity"],
-                futures=[s for t, s in batch if t == "future"],
-                indices=[s for t, s in batch if t == "index"],
-            )
-            data_dict.update({d.symbol: d for d in data})
-        metrics = await get_market_metrics(sesh, list(data_dict.keys()))
-        metrics_dict = defaultdict(
-            lambda: MarketMetricInfo(
-                symbol="", market_cap=ZERO, updated_at=datetime.now()
-            )
-        )
-        metrics_dict.update({m.symbol: m for m in metrics})
+    with spinner(format, "Fetching metrics..."):
+        data_dict, metrics_dict = await fetch_watchlist(sesh, all_symbols)
+    if format != OutputFormat.TABLE:
+        return write_watchlist(format, data_dict, metrics_dict)
     for key in sorted(data_dict):
         item = data_dict[key]
         metric = metrics_dict[key]